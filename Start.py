@@ -1,20 +1,80 @@
-"""Run this to start the simulation."""
+"""Run this to start the simulation.
 
+Without arguments the run is set up interactively, with arguments they are
+parsed by modules.cli (see python Start.py --help).
+"""
+
+import os
+import sys
 from time import perf_counter
 
+import modules.cli
 import modules.generate_simulations
+from modules.checkpoint import Checkpoint
+
+CHECKPOINT_PATH = os.path.join(".", "data.checkpoint.json")
+# seconds between the progress records printed to stderr
+PROGRESS_INTERVAL = 30.0
+# single process runs with a seed can be kept here, and served again without
+# simulating (see generate_simulations.open_run_cache)
+CACHE_DIR = os.path.join(".", "run_cache")
 
 
 def main() -> None:
     """Start the program."""
-    nr_hands = int(input("Number of hands to simulate (rows): \n-> "))
+    saved = Checkpoint.load(CHECKPOINT_PATH)
+    if saved is not None:
+        print(
+            "Resuming interrupted run "
+            + f"({saved.tables_done}/{saved.table_quantity} tables done)"
+        )
+        nr_hands, nr_workers, seed = saved.table_quantity * 4, 1, saved.seed
+        engine, stream, deal_replays = saved.engine, True, saved.deal_replays
+        formats = saved.formats
+        cached = False
+        if formats is None:
+            formats = ["csv"] if saved.output.endswith(".csv") else ["results"]
+    else:
+        nr_hands = int(input("Number of hands to simulate (rows): \n-> "))
+        nr_workers = int(input("Number of worker processes (blank for 1): \n-> ") or 1)
+        seed_text = input("Seed (blank for random): \n-> ")
+        seed = int(seed_text) if seed_text else None
+        engine = "object"
+        formats = input(
+            "Output formats among results, csv and pickle (blank for results): \n-> "
+        ).split() or ["results"]
+        stream = input("Stream to disk with checkpoints? (y/N): \n-> ") == "y"
+        deal_replays = 1
+        # only ask for runs that can use the cache, the others would print a note
+        cached = (
+            seed is not None
+            and nr_workers == 1
+            and not stream
+            and input(f"Keep the run in {CACHE_DIR} to serve it again? (y/N): \n-> ")
+            == "y"
+        )
 
     start = perf_counter()
-    hands_qtd = modules.generate_simulations.main(nr_hands)
+    hands_qtd = modules.generate_simulations.main(
+        nr_hands,
+        nr_workers,
+        seed,
+        engine,
+        stream,
+        CHECKPOINT_PATH,
+        formats=formats,
+        deal_replays=deal_replays,
+        progress_path="-",
+        progress_interval=PROGRESS_INTERVAL,
+        cache_dir=CACHE_DIR if cached else None,
+    )
     elapsed = perf_counter() - start
     print(f"Elapsed time (seconds): {elapsed:.2f}")
     print(f"Hands per second: {hands_qtd//elapsed}")
 
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:]:
+        modules.cli.main()
+    else:
+        main()
@@ -0,0 +1,310 @@
+"""Times every stage of a simulation run and compares it with a JSON baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_stages --save      # write the baseline
+    python -m benchmarks.bench_stages             # compare with the baseline
+
+The exit code is 1 when a stage got slower than the tolerance allows.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from modules.classes import batch_engine
+from modules.classes.base_classes import Game, Table
+from modules.classes.batch_deck import BatchDealer
+from modules.generate_simulations import ENGINE_PLAYERS, build_players, prepare_engine
+from modules.results_file import ResultsWriter
+from modules.writers import CsvStreamWriter, to_dataframe
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = (10_000, 50_000)
+DEFAULT_ENGINES = ("object", "table", "batch")
+
+# stages faster than this are too noisy to be compared
+MIN_COMPARED_SECONDS = 0.005
+
+Timings = Dict[str, float]
+Stats = Dict[str, Sequence]
+T = TypeVar("T")
+
+
+def timed(timings: Timings, stage: str, method: Callable[..., T]) -> Callable[..., T]:
+    """Wrap a method, adding the seconds of every call to a stage.
+
+    Args:
+        timings (Timings): seconds per stage
+        stage (str): key of timings
+        method (Callable[..., T]): bound method to time
+
+    Returns:
+        Callable[..., T]: the timed method
+    """
+
+    def timed_method(*args: object) -> T:
+        start = perf_counter()
+        try:
+            return method(*args)
+        finally:
+            timings[stage] += perf_counter() - start
+
+    return timed_method
+
+
+def time_object_engine(
+    table_quantity: int, engine: str, seed: int
+) -> Tuple[Timings, Stats]:
+    """Time the stages of Table.get_winner, table by table.
+
+    The real Table.get_winner runs every table, with its stages wrapped in
+    timers on the Table instance.
+
+    Args:
+        table_quantity (int): number of tables
+        engine (str): key of ENGINE_PLAYERS
+        seed (int): deck seed
+
+    Returns:
+        Tuple[Timings, Stats]: seconds spent shuffling (Table.reset), dealing
+        (Table.distribute_cards), resolving rounds (Table.play_rounds) and
+        registering (Table.register_scores and Game.regsiter_scores), and the
+        table_stats columns
+    """
+    players, team1, team2 = build_players(ENGINE_PLAYERS[engine])
+    game = Game(table_quantity, players, team1, team2, seed=seed, lazy=True)
+    game.table_stats = game.empty_stats(table_quantity * len(players))
+    table = Table(game)
+    timings = dict.fromkeys(("shuffle", "deal", "rounds", "register"), 0.0)
+
+    # instance attributes shadow the methods called by get_winner
+    table.distribute_cards = timed(timings, "deal", table.distribute_cards)
+    table.play_rounds = timed(timings, "rounds", table.play_rounds)
+    table.register_scores = timed(timings, "register", table.register_scores)
+    reset = timed(timings, "shuffle", table.reset)
+    regsiter_scores = timed(timings, "register", game.regsiter_scores)
+
+    for table_idx in range(table_quantity):
+        if table_idx:
+            reset()
+        _, game.players = table.get_winner(game.players, team1, team2)
+        regsiter_scores(table.stats)
+
+    return timings, game.table_stats
+
+
+def time_batch_engine(table_quantity: int, seed: int) -> Tuple[Timings, Stats]:
+    """Time the stages of the vectorized engine.
+
+    Args:
+        table_quantity (int): number of tables
+        seed (int): dealer seed
+
+    Returns:
+        Tuple[Timings, Stats]: seconds spent dealing, resolving rounds and
+        building table_stats, and the table_stats columns
+    """
+    start = perf_counter()
+    hands, _ = BatchDealer(seed).deal(table_quantity)
+    playing = perf_counter()
+    winner = batch_engine.resolve_tables(hands)
+    registering = perf_counter()
+    table_stats = batch_engine.build_table_stats(hands, winner)
+    stop = perf_counter()
+
+    return {
+        "deal": playing - start,
+        "rounds": registering - playing,
+        "register": stop - registering,
+    }, table_stats
+
+
+def time_exports(table_stats: Stats, directory: str) -> Timings:
+    """Time the results file, the DataFrame construction and every exporter.
+
+    Args:
+        table_stats (Stats): table_stats columns
+        directory (str): where the exported files are written
+
+    Returns:
+        Timings: seconds spent on each export stage
+    """
+    start = perf_counter()
+    with ResultsWriter(os.path.join(directory, "data.results")) as writer:
+        writer.write(table_stats)
+    building = perf_counter()
+    df = to_dataframe(table_stats)
+    pickling = perf_counter()
+    df.to_pickle(os.path.join(directory, "data.pickle"))
+    writing = perf_counter()
+    with CsvStreamWriter(os.path.join(directory, "data.csv")) as writer:
+        writer.write(table_stats)
+    stop = perf_counter()
+
+    return {
+        "export_results": building - start,
+        "dataframe": pickling - building,
+        "export_pickle": writing - pickling,
+        "export_csv": stop - writing,
+    }
+
+
+def run_once(table_quantity: int, engine: str, seed: int, directory: str) -> Timings:
+    """Time every stage of one run.
+
+    Args:
+        table_quantity (int): number of tables
+        engine (str): "object", "table" or "batch"
+        seed (int): seed of the run
+        directory (str): where the exported files are written
+
+    Returns:
+        Timings: seconds per stage
+    """
+    prepare_engine(engine)
+    if engine == "batch":
+        timings, table_stats = time_batch_engine(table_quantity, seed)
+    else:
+        timings, table_stats = time_object_engine(table_quantity, engine, seed)
+
+    timings.update(time_exports(table_stats, directory))
+    return timings
+
+
+def run_suite(
+    sizes: Sequence[int], engines: Sequence[str], repeat: int, seed: int = 0
+) -> Timings:
+    """Time every stage for each engine and size, keeping the best repeat.
+
+    Args:
+        sizes (Sequence[int]): numbers of tables
+        engines (Sequence[str]): engines to time
+        repeat (int): runs per engine and size
+        seed (int, optional): seed of every run. Defaults to 0.
+
+    Returns:
+        Timings: seconds keyed by "engine/size/stage"
+    """
+    results: Timings = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for engine in engines:
+            for size in sizes:
+                for _ in range(repeat):
+                    for stage, seconds in run_once(
+                        size, engine, seed, directory
+                    ).items():
+                        key = f"{engine}/{size}/{stage}"
+                        results[key] = min(seconds, results.get(key, seconds))
+
+    return results
+
+
+def compare(current: Timings, baseline: Timings, tolerance: float) -> List[str]:
+    """List the stages that got slower than the baseline allows.
+
+    Args:
+        current (Timings): new timings
+        baseline (Timings): saved timings
+        tolerance (float): allowed slowdown (0.1 means 10%)
+
+    Returns:
+        List[str]: one line per regression
+    """
+    regressions = []
+    for key, seconds in current.items():
+        reference = baseline.get(key)
+        if reference is None or reference < MIN_COMPARED_SECONDS:
+            continue
+        if seconds > reference * (1 + tolerance):
+            regressions.append(
+                f"{key}: {reference:.4f}s -> {seconds:.4f}s "
+                f"(+{seconds / reference - 1:.0%})"
+            )
+
+    return regressions
+
+
+def print_timings(current: Timings, baseline: Optional[Timings]) -> None:
+    """Print a table of the timings, next to the baseline when there is one.
+
+    Args:
+        current (Timings): new timings
+        baseline (Optional[Timings]): saved timings
+    """
+    for key, seconds in current.items():
+        line = f"{key:<32}{seconds:>10.4f}s"
+        if baseline and baseline.get(key):
+            line += f"{seconds / baseline[key]:>8.2f}x baseline"
+        print(line)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line.
+
+    Args:
+        argv (Optional[List[str]], optional): arguments. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--engines", nargs="+", default=DEFAULT_ENGINES, choices=DEFAULT_ENGINES
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument(
+        "--save", action="store_true", help="overwrite the baseline with this run"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the suite, then save or compare the baseline.
+
+    Args:
+        argv (Optional[List[str]], optional): arguments. Defaults to sys.argv.
+
+    Returns:
+        int: exit code (1 if a stage regressed)
+    """
+    args = parse_args(argv)
+    current = run_suite(args.sizes, args.engines, args.repeat)
+
+    baseline: Optional[Timings] = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)["timings"]
+
+    print_timings(current, baseline)
+
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump(
+                {"python": platform.python_version(), "timings": current},
+                file,
+                indent=2,
+            )
+        print(f"Baseline saved to '{args.baseline}'")
+        return 0
+
+    if baseline is None:
+        print("No baseline to compare with, run with --save first")
+        return 0
+
+    regressions = compare(current, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
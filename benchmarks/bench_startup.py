@@ -0,0 +1,110 @@
+"""Checks that the command line starts fast and without NumPy or pandas.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget 0.05
+
+Cold start is the time to import modules.cli, and to run a tiny simulation
+with the results and CSV writers, above the time of a bare interpreter. The
+exit code is 1 when either goes over the budget or imports a heavy module.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from typing import List, Optional
+
+# seconds allowed above a bare interpreter
+DEFAULT_BUDGET = 0.08
+HEAVY_MODULES = ("numpy", "pandas")
+
+# fails (exit code 1) if the CLI pulls a heavy module at import
+IMPORT_CHECK = (
+    "import sys, modules.cli; "
+    + f"sys.exit(any(name in sys.modules for name in {HEAVY_MODULES!r}))"
+)
+RUN_CHECK = (
+    "import sys, modules.cli; "
+    + "modules.cli.main(['4', '--seed', '1', '--formats', 'results', 'csv']); "
+    + f"sys.exit(any(name in sys.modules for name in {HEAVY_MODULES!r}))"
+)
+
+
+def time_command(code: str, repeat: int, cwd: str) -> float:
+    """Best wall time of a fresh interpreter running some code.
+
+    Args:
+        code (str): code passed to python -c
+        repeat (int): number of runs
+        cwd (str): working directory of the runs
+
+    Returns:
+        float: seconds of the fastest run
+    """
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-c", code], cwd=cwd, env=env, stdout=subprocess.DEVNULL
+        )
+        best = min(best, perf_counter() - start)
+        if process.returncode:
+            raise RuntimeError(f"imported one of {HEAVY_MODULES}: {code}")
+    return best
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line.
+
+    Args:
+        argv (Optional[List[str]], optional): arguments. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET)
+    parser.add_argument("--repeat", type=int, default=10)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Time the cold start and compare it with the budget.
+
+    Args:
+        argv (Optional[List[str]], optional): arguments. Defaults to sys.argv.
+
+    Returns:
+        int: exit code (1 if over budget or a heavy module was imported)
+    """
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            bare = time_command("pass", args.repeat, directory)
+            timings = {
+                "import": time_command(IMPORT_CHECK, args.repeat, directory) - bare,
+                "run": time_command(RUN_CHECK, args.repeat, directory) - bare,
+            }
+        except RuntimeError as error:
+            print(f"FAILED {error}")
+            return 1
+
+    print(f"{'interpreter':<16}{bare:>10.4f}s")
+    over = False
+    for stage, seconds in timings.items():
+        over |= seconds > args.budget
+        print(f"{stage:<16}{seconds:>10.4f}s{seconds / args.budget:>8.2f}x budget")
+
+    if over:
+        print(f"OVER BUDGET ({args.budget:.3f}s)")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
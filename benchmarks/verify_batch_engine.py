@@ -0,0 +1,96 @@
+"""Checks that the vectorized engine gives the same rows as the Game classes.
+
+Run from the repository root:
+
+    python -m benchmarks.verify_batch_engine
+    python -m benchmarks.verify_batch_engine --tables 100000 --seed 3
+
+Both engines play the same dealt tables, the Game classes through a deck that
+replays the batch dealer's shuffles. The exit code is 1 when a row differs.
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+import numpy as np
+
+from modules.classes.base_classes import Game
+from modules.classes.batch_deck import BatchDealer
+from modules.classes.batch_engine import build_table_stats, resolve_tables
+from modules.classes.deck import Deck
+from modules.generate_simulations import build_players
+
+
+class ReplayDeck(Deck):
+    """Deck that deals pre-shuffled tables instead of shuffling."""
+
+    def __init__(self, dealt: np.ndarray) -> None:
+        super().__init__()
+        self.dealt: List[List[int]] = dealt.tolist()
+        self.next_table = 0
+
+    def shuffle_cards(self) -> None:
+        """Load the next dealt table (cards are popped from the end)."""
+        row = self.dealt[self.next_table]
+        self.next_table += 1
+        self.cards = [self.bkp_cards[idx] for idx in reversed(row)]
+
+
+def count_mismatches(table_quantity: int, seed: Optional[int] = None) -> int:
+    """Differential check of the vectorized engine against Game.
+
+    Args:
+        table_quantity (int): number of tables to compare
+        seed (Optional[int], optional): seed for the dealer. Defaults to None.
+
+    Returns:
+        int: number of rows where both engines disagree
+    """
+    dealer = BatchDealer(seed)
+    dealt = dealer.deal_indexes(table_quantity)
+    hands, _ = dealer.hands_from_indexes(dealt)
+    batch_stats = build_table_stats(hands, resolve_tables(hands))
+
+    players, team1, team2 = build_players()
+    game = Game(table_quantity, players, team1, team2, deck=ReplayDeck(dealt))
+
+    mismatches = np.zeros(table_quantity * len(players), dtype=bool)
+    for column, values in batch_stats.items():
+        mismatches |= np.asarray(game.table_stats[column]) != values
+
+    return int(mismatches.sum())
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line.
+
+    Args:
+        argv (Optional[List[str]], optional): arguments. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Compare both engines on the same tables.
+
+    Args:
+        argv (Optional[List[str]], optional): arguments. Defaults to sys.argv.
+
+    Returns:
+        int: exit code (1 if a row differs)
+    """
+    args = parse_args(argv)
+    mismatches = count_mismatches(args.tables, args.seed)
+    print(f"{mismatches} of {args.tables * 4} rows differ")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Adaptive runs that stop once every hand's win rate is precise enough.
+
+python -m modules.adaptive --target-width 0.02 --seed 7
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from modules.aggregates import HANDS, VALUE_LIMIT, WeightedHandAggregate
+from modules.classes import batch_engine
+from modules.classes.batch_deck import BatchDealer
+
+# tables holding a hand that is still short of the target, and the others
+STRATA = ("needed", "done")
+
+StratumReport = Dict[str, float]
+
+
+def table_hands(hands: np.ndarray) -> np.ndarray:
+    """Hand bucket of every seat.
+
+    Args:
+        hands (np.ndarray): (N, 4, 3) sorted hand values in seat order
+
+    Returns:
+        np.ndarray: (N, 4) bucket indexes, as used by the aggregates
+    """
+    lowest, middle, highest = hands.astype(np.intp).transpose(2, 0, 1)
+    return (highest * VALUE_LIMIT + middle) * VALUE_LIMIT + lowest
+
+
+def run_adaptive(
+    target_width: float = 0.02,
+    seed: Optional[int] = None,
+    batch_tables: int = 100_000,
+    max_tables: int = 10_000_000,
+    min_games: int = 100,
+    min_fraction: float = 0.05,
+    z: float = 1.96,
+) -> Tuple[WeightedHandAggregate, List[StratumReport]]:
+    """Simulate batches until every dealt hand reaches the target precision.
+
+    Every batch deals batch_tables tables. Tables holding a hand that is still
+    short of the target are all simulated, the others only min_fraction of the
+    time. Rows are weighted by the inverse of their table's sampling
+    probability, so rare hands are oversampled without biasing the win rates.
+
+    Args:
+        target_width (float, optional): widest confidence interval allowed.
+        Defaults to 0.02.
+        seed (Optional[int], optional): seed for the dealer. Defaults to None.
+        batch_tables (int, optional): tables dealt per batch. Defaults to 100_000.
+        max_tables (int, optional): stop after dealing this many tables even if
+        some hands are short of the target. Defaults to 10_000_000.
+        min_games (int, optional): rows a hand needs before its interval is
+        trusted. Defaults to 100.
+        min_fraction (float, optional): fraction simulated from tables whose
+        hands are done. Defaults to 0.05.
+        z (float, optional): z score of the interval. Defaults to 1.96 (95%).
+
+    Returns:
+        Tuple[WeightedHandAggregate, List[StratumReport]]: weighted sums and the
+        fraction and weight used for both strata of every batch
+    """
+    dealer = BatchDealer(seed)
+    aggregate = WeightedHandAggregate()
+    dealt = np.zeros(HANDS, dtype=bool)
+    # every hand is needed until the first batch is simulated
+    unfinished = np.ones(HANDS, dtype=bool)
+    fractions = np.array([1.0, min_fraction])
+    report: List[StratumReport] = []
+
+    for batch, start in enumerate(range(0, max_tables, batch_tables)):
+        hands, _ = dealer.deal(min(batch_tables, max_tables - start))
+        buckets = table_hands(hands)
+        strata = np.where(unfinished[buckets].any(axis=1), 0, 1)
+        keep = dealer.rng.random(len(hands)) < fractions[strata]
+
+        kept = hands[keep]
+        stats = batch_engine.build_table_stats(kept, batch_engine.resolve_tables(kept))
+        aggregate.add_columns(stats, np.repeat(1 / fractions[strata[keep]], 4))
+        dealt[buckets] = True
+
+        for stratum, name in enumerate(STRATA):
+            report.append(
+                {
+                    "batch": batch,
+                    "stratum": name,
+                    "dealt": int((strata == stratum).sum()),
+                    "simulated": int((strata[keep] == stratum).sum()),
+                    "fraction": float(fractions[stratum]),
+                    "weight": float(1 / fractions[stratum]),
+                }
+            )
+
+        estimates = aggregate.estimates(z)
+        unfinished = dealt & (
+            (aggregate.games < min_games) | ~(2 * estimates["margin"] <= target_width)
+        )
+        if not unfinished.any():
+            break
+
+    return aggregate, report
+
+
+def main(
+    target_width: float = 0.02,
+    seed: Optional[int] = None,
+    max_tables: int = 10_000_000,
+    min_fraction: float = 0.05,
+) -> int:
+    """Run an adaptive simulation and save the weighted win rates.
+
+    Writes data_summary.csv and the sampling weights to data.weights.json.
+
+    Args:
+        target_width (float, optional): widest confidence interval allowed.
+        Defaults to 0.02.
+        seed (Optional[int], optional): seed for the dealer. Defaults to None.
+        max_tables (int, optional): most tables to deal. Defaults to 10_000_000.
+        min_fraction (float, optional): fraction simulated from tables whose
+        hands are done. Defaults to 0.05.
+
+    Returns:
+        int: number of hands simulated
+    """
+    aggregate, report = run_adaptive(
+        target_width, seed, max_tables=max_tables, min_fraction=min_fraction
+    )
+    aggregate.save_summary(os.path.join(".", "data_summary.csv"))
+    with open(os.path.join(".", "data.weights.json"), "w") as file:
+        json.dump(report, file, indent=1)
+
+    games = int(aggregate.games.sum())
+    dealt = sum(row["dealt"] for row in report) * 4
+    print(f"Number of hands generated: {games} (of {dealt} dealt)")
+    print("Win rates saved to 'data_summary.csv', weights to 'data.weights.json'")
+    return games
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line.
+
+    Args:
+        argv (Optional[Sequence[str]], optional): arguments. Defaults to
+        sys.argv.
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Simulate until every hand's win rate is precise enough."
+    )
+    parser.add_argument(
+        "--target-width",
+        type=float,
+        default=0.02,
+        help="widest confidence interval allowed",
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--max-tables", type=int, default=10_000_000)
+    parser.add_argument(
+        "--min-fraction",
+        type=float,
+        default=0.05,
+        help="fraction simulated from tables whose hands are done",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.target_width, args.seed, args.max_tables, args.min_fraction)
@@ -0,0 +1,315 @@
+"""Running win/draw/loss counts per hand, instead of one row per hand."""
+
+import csv
+import json
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from modules.classes.deck import Deck
+
+_deck = Deck()
+# card values go from 1 to the highest manilha
+VALUE_LIMIT = _deck.max_value + max(_deck.card_suits) + 1
+
+# counts are kept in result code order (RESULT_LOSS, RESULT_DRAW, RESULT_WIN)
+RESULTS = 3
+HANDS = VALUE_LIMIT**3
+
+SUMMARY_COLUMNS = (
+    "highest_card",
+    "middle_card",
+    "lowest_card",
+    "games",
+    "wins",
+    "draws",
+    "losses",
+    "win_rate",
+    "ci_low",
+    "ci_high",
+)
+
+WEIGHTED_SUMMARY_COLUMNS = (
+    "highest_card",
+    "middle_card",
+    "lowest_card",
+    "games",
+    "effective_games",
+    "win_rate",
+    "ci_low",
+    "ci_high",
+)
+
+
+class HandAggregate:
+    """Dense count of results per (highest, middle, lowest) hand.
+
+    Memory only depends on the number of possible hands, and aggregates of
+    separate runs can be merged.
+    """
+
+    def __init__(self) -> None:
+        self.counts = np.zeros((HANDS, RESULTS), dtype=np.int64)
+
+    def add_columns(self, columns: Dict[str, Sequence]) -> None:
+        """Count the rows of table_stats columns.
+
+        Args:
+            columns (Dict[str, Sequence]): int8 table_stats columns (array or
+            NumPy), like the chunks of iter_chunks
+        """
+        hand, result = hand_indexes(columns)
+        self.counts += np.bincount(
+            hand * RESULTS + result, minlength=self.counts.size
+        ).reshape(self.counts.shape)
+
+    def merge(self, other: "HandAggregate") -> "HandAggregate":
+        """Add the counts of another aggregate.
+
+        Args:
+            other (HandAggregate): aggregate of another run or shard
+
+        Returns:
+            HandAggregate: self
+        """
+        self.counts += other.counts
+        return self
+
+    @property
+    def games(self) -> int:
+        """Number of counted rows."""
+        return int(self.counts.sum())
+
+    def summary(self, z: float = 1.96) -> List[Dict[str, float]]:
+        """Win rate of every hand that was dealt, with a confidence interval.
+
+        The win rate is the mean result (draws count as half a win, like the
+        result column) and the interval is the normal approximation.
+
+        Args:
+            z (float, optional): z score of the interval. Defaults to 1.96 (95%).
+
+        Returns:
+            List[Dict[str, float]]: one row per hand, keyed by SUMMARY_COLUMNS
+        """
+        rows = []
+        for hand in np.flatnonzero(self.counts.sum(axis=1)):
+            losses, draws, wins = self.counts[hand].tolist()
+            games = losses + draws + wins
+            win_rate = (wins + draws / 2) / games
+            variance = (wins + draws / 4) / games - win_rate**2
+            margin = z * math.sqrt(max(variance, 0.0) / games)
+
+            highest, middle, lowest = hand_values(hand)
+            rows.append(
+                dict(
+                    zip(
+                        SUMMARY_COLUMNS,
+                        (highest, middle, lowest, games, wins, draws, losses)
+                        + (win_rate, win_rate - margin, win_rate + margin),
+                    )
+                )
+            )
+
+        return rows
+
+    def save_summary(self, path: str, z: float = 1.96) -> None:
+        """Write the summary table as CSV.
+
+        Args:
+            path (str): output path
+            z (float, optional): z score of the interval. Defaults to 1.96 (95%).
+        """
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, SUMMARY_COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.summary(z))
+
+    def save(self, path: str) -> None:
+        """Write the counts of every dealt hand as JSON, to merge them later.
+
+        Args:
+            path (str): output path
+        """
+        counts = {
+            str(hand): self.counts[hand].tolist()
+            for hand in np.flatnonzero(self.counts.sum(axis=1))
+        }
+        with open(path, "w") as file:
+            json.dump({"value_limit": VALUE_LIMIT, "counts": counts}, file)
+
+    @staticmethod
+    def load(path: str) -> "HandAggregate":
+        """Read counts written by save.
+
+        Args:
+            path (str): aggregate path
+
+        Returns:
+            HandAggregate: loaded aggregate
+        """
+        with open(path) as file:
+            data = json.load(file)
+        if data["value_limit"] != VALUE_LIMIT:
+            raise ValueError(f"{path} was saved with another deck")
+
+        aggregate = HandAggregate()
+        for hand, counts in data["counts"].items():
+            aggregate.counts[int(hand)] = counts
+        return aggregate
+
+
+class WeightedHandAggregate:
+    """Weighted sums of results per hand, for tables sampled unevenly.
+
+    Each row counts with the inverse of its table's sampling probability, so
+    the win rates stay unbiased when rare hands are oversampled.
+    """
+
+    def __init__(self) -> None:
+        self.games = np.zeros(HANDS, dtype=np.int64)
+        self.weights = np.zeros(HANDS)
+        self.weights_squared = np.zeros(HANDS)
+        self.scores = np.zeros(HANDS)
+        self.scores_squared = np.zeros(HANDS)
+
+    def add_columns(
+        self, columns: Dict[str, Sequence], weights: Optional[np.ndarray] = None
+    ) -> None:
+        """Add the rows of table_stats columns.
+
+        Args:
+            columns (Dict[str, Sequence]): int8 table_stats columns
+            weights (Optional[np.ndarray], optional): weight of every row.
+            Defaults to None (all ones).
+        """
+        hand, result = hand_indexes(columns)
+        if weights is None:
+            weights = np.ones(len(hand))
+        score = result / 2
+
+        self.games += np.bincount(hand, minlength=HANDS)
+        for total, values in (
+            (self.weights, weights),
+            (self.weights_squared, weights**2),
+            (self.scores, weights * score),
+            (self.scores_squared, weights * score**2),
+        ):
+            total += np.bincount(hand, values, minlength=HANDS)
+
+    def merge(self, other: "WeightedHandAggregate") -> "WeightedHandAggregate":
+        """Add the sums of another aggregate.
+
+        Args:
+            other (WeightedHandAggregate): aggregate of another run or shard
+
+        Returns:
+            WeightedHandAggregate: self
+        """
+        self.games += other.games
+        self.weights += other.weights
+        self.weights_squared += other.weights_squared
+        self.scores += other.scores
+        self.scores_squared += other.scores_squared
+        return self
+
+    def estimates(self, z: float = 1.96) -> Dict[str, np.ndarray]:
+        """Weighted win rate of every hand and its confidence interval.
+
+        The interval uses the weighted variance and Kish's effective sample
+        size, so oversampled rows do not look more precise than they are.
+
+        Args:
+            z (float, optional): z score of the interval. Defaults to 1.96 (95%).
+
+        Returns:
+            Dict[str, np.ndarray]: win_rate, margin and effective_games per hand
+            (NaN for hands that were never sampled)
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            win_rate = self.scores / self.weights
+            variance = np.maximum(self.scores_squared / self.weights - win_rate**2, 0)
+            effective_games = self.weights**2 / self.weights_squared
+            margin = z * np.sqrt(variance / effective_games)
+
+        return {
+            "win_rate": win_rate,
+            "margin": margin,
+            "effective_games": effective_games,
+        }
+
+    def summary(self, z: float = 1.96) -> List[Dict[str, float]]:
+        """Weighted win rate of every sampled hand.
+
+        Args:
+            z (float, optional): z score of the interval. Defaults to 1.96 (95%).
+
+        Returns:
+            List[Dict[str, float]]: one row per hand, keyed by
+            WEIGHTED_SUMMARY_COLUMNS
+        """
+        estimates = self.estimates(z)
+        rows = []
+        for hand in np.flatnonzero(self.games):
+            win_rate = float(estimates["win_rate"][hand])
+            margin = float(estimates["margin"][hand])
+            rows.append(
+                dict(
+                    zip(
+                        WEIGHTED_SUMMARY_COLUMNS,
+                        hand_values(hand)
+                        + (
+                            int(self.games[hand]),
+                            float(estimates["effective_games"][hand]),
+                            win_rate,
+                            win_rate - margin,
+                            win_rate + margin,
+                        ),
+                    )
+                )
+            )
+
+        return rows
+
+    def save_summary(self, path: str, z: float = 1.96) -> None:
+        """Write the summary table as CSV.
+
+        Args:
+            path (str): output path
+            z (float, optional): z score of the interval. Defaults to 1.96 (95%).
+        """
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, WEIGHTED_SUMMARY_COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.summary(z))
+
+
+def hand_indexes(columns: Dict[str, Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+    """Bucket of every row and its result code.
+
+    Args:
+        columns (Dict[str, Sequence]): int8 table_stats columns (array or NumPy)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: hand buckets and result codes
+    """
+    highest, middle, lowest, result = (
+        np.asarray(columns[column], dtype=np.intp)
+        for column in ("highest_card", "middle_card", "lowest_card", "result")
+    )
+    return (highest * VALUE_LIMIT + middle) * VALUE_LIMIT + lowest, result
+
+
+def hand_values(hand: int) -> Tuple[int, int, int]:
+    """Card values of a hand bucket.
+
+    Args:
+        hand (int): bucket index
+
+    Returns:
+        Tuple[int, int, int]: highest, middle and lowest card values
+    """
+    rest, lowest = divmod(int(hand), VALUE_LIMIT)
+    highest, middle = divmod(rest, VALUE_LIMIT)
+    return highest, middle, lowest
@@ -0,0 +1,156 @@
+"""Checkpoints that let an interrupted streaming run continue where it stopped."""
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from modules.results_file import ResultsWriter
+from modules.writers import CsvStreamWriter
+
+# random.Random state (nested tuples) or NumPy bit generator state (dict)
+RngState = Union[Tuple, List, Dict, int, None]
+StreamWriter = Union[CsvStreamWriter, ResultsWriter]
+
+
+@dataclass
+class Checkpoint:
+    """Progress of a streaming run, saved after every flushed chunk."""
+
+    seed: Optional[int]
+    table_quantity: int
+    engine: str
+    chunk_size: int
+    # streamed file (runs saved before binary outputs always wrote data.csv)
+    output: str = "data.csv"
+    # tables playing each deal (see Game.deal_replays)
+    deal_replays: int = 1
+    # outputs converted from the streamed file at the end (None for the
+    # streamed file only)
+    formats: Optional[List[str]] = None
+
+    tables_done: int = 0
+    rows_flushed: int = 0
+    bytes_flushed: Optional[int] = None
+    rng_state: RngState = None
+
+    def matches(self, other: "Checkpoint") -> bool:
+        """Check if both checkpoints describe the same run.
+
+        Args:
+            other (Checkpoint): checkpoint of the requested run
+
+        Returns:
+            bool: True if the run parameters are the same
+        """
+        return (
+            self.seed,
+            self.table_quantity,
+            self.engine,
+            self.chunk_size,
+            self.output,
+            self.deal_replays,
+        ) == (
+            other.seed,
+            other.table_quantity,
+            other.engine,
+            other.chunk_size,
+            other.output,
+            other.deal_replays,
+        )
+
+    def save(self, path: str) -> None:
+        """Atomically write the checkpoint as JSON.
+
+        Args:
+            path (str): checkpoint path
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(asdict(self), file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: str) -> Optional["Checkpoint"]:
+        """Read a checkpoint, if there is one.
+
+        Args:
+            path (str): checkpoint path
+
+        Returns:
+            Optional[Checkpoint]: saved checkpoint (None if missing)
+        """
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as file:
+            return Checkpoint(**json.load(file))
+
+
+class CheckpointedWriter:
+    """Writes chunks of a streaming run, saving a checkpoint after each one.
+
+    Every chunk comes with the RNG state of the run right after it, so the
+    checkpoint can be saved from a background writer while the simulation
+    moves on.
+    """
+
+    def __init__(
+        self, writer: StreamWriter, progress: Checkpoint, path: Optional[str]
+    ) -> None:
+        self.writer = writer
+        self.progress = progress
+        self.path = path
+
+    def write(self, item: Tuple[Dict[str, Sequence], RngState]) -> None:
+        """Append a chunk and checkpoint the run up to it.
+
+        Args:
+            item (Tuple[Dict[str, Sequence], RngState]): table_stats columns and
+            the JSON friendly RNG state after them
+        """
+        chunk, rng_state = item
+        self.writer.write(chunk)
+        if self.path is None:
+            return
+
+        progress = self.progress
+        progress.bytes_flushed = self.writer.flush()
+        progress.tables_done += (self.writer.rows - progress.rows_flushed) // 4
+        progress.rows_flushed = self.writer.rows
+        progress.rng_state = rng_state
+        progress.save(self.path)
+
+    def close(self) -> None:
+        """Close the writer."""
+        self.writer.close()
+
+
+def state_to_json(state: RngState) -> RngState:
+    """Make a random.Random state JSON friendly (tuples become lists).
+
+    Args:
+        state (RngState): Random.getstate() output or a NumPy bit generator state
+
+    Returns:
+        RngState: JSON serializable state
+    """
+    if isinstance(state, tuple):
+        return [state_to_json(item) for item in state]
+    return state
+
+
+def state_from_json(state: RngState) -> RngState:
+    """Undo state_to_json for a random.Random state.
+
+    Args:
+        state (RngState): state loaded from JSON
+
+    Returns:
+        RngState: state accepted by Random.setstate
+    """
+    if isinstance(state, list):
+        return tuple(state_from_json(item) for item in state)
+    return state
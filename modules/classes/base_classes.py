@@ -2,16 +2,42 @@
 
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass
-from typing import Dict, List, Tuple, Union
+from itertools import islice
+from operator import attrgetter
+from random import Random
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
 
 from modules.classes.deck import Card, Deck
+from modules.classes.outcome_cache import DRAW, OutcomeCache
+from modules.classes.profiler import Profiler
+
+if TYPE_CHECKING:
+    from modules.classes.trace import TraceRecorder
+
+STATS_COLUMNS = ("highest_card", "middle_card", "lowest_card", "result")
+# int64 column added when deals are replayed: index of the shuffled deal
+GROUP_COLUMN = "rotation_group"
+GROUPED_COLUMNS = STATS_COLUMNS + (GROUP_COLUMN,)
+# array typecode of each column, "b" (int8) unless listed
+TYPECODES = {GROUP_COLUMN: "q"}
+# seat rotations of a replayed deal
+ROTATIONS = 4
+
+# codes stored in the "result" column (exports decode them as code / 2)
+RESULT_LOSS, RESULT_DRAW, RESULT_WIN = 0, 1, 2
+
+card_value = attrgetter("value")
 
 
 @dataclass
 class Play:
     """Player move."""
 
+    __slots__ = ("player", "card_value")
+
     player: Player
     card_value: int
 
@@ -25,6 +51,24 @@ class Player:
         self.partner: Player = None
         self.team: Team = None
 
+        # one reusable Play per hand size left after the move (see make_play)
+        self.play_pool: List[Play] = [Play(self, 0) for _ in range(3)]
+
+    def make_play(self, card_value: int) -> Play:
+        """Return the pooled Play of this move, after the card left the hand.
+
+        Each pooled Play is used at most once per table.
+
+        Args:
+            card_value (int): value of the card played
+
+        Returns:
+            Play: player move
+        """
+        play = self.play_pool[len(self.hand)]
+        play.card_value = card_value
+        return play
+
     def _wrap_choose_play(
         self, round_plays: List[Play], table: Table, enemy_team: Team
     ) -> Play:
@@ -103,6 +147,21 @@ class Round:
         self.team1 = team1
         self.team2 = team2
 
+        # running state, updated after every play
+        # highest_play: first play with the highest value
+        # max_players: every player who played the highest value
+        # max_scorers: round winners so far (more than one if draw)
+        self.highest_play: Optional[Play] = None
+        self.max_players: List[Player] = []
+        self.max_scorers: List[Player] = []
+
+    def reset(self) -> None:
+        """Clear the round so it can be played again."""
+        self.plays.clear()
+        self.highest_play = None
+        self.max_players.clear()
+        self.max_scorers.clear()
+
     def get_winner(self, players: List[Player], table: Table) -> List[Player]:
         """Iterates through players and decides round winner.
 
@@ -111,26 +170,92 @@ class Round:
             table (Table): game in which the round belongs
 
         Returns:
-            List[Player]: list of winners (more than one if draw)
+            List[Player]: list of winners (more than one if draw), reused by the
+            next round
         """
-        player_max_scorer: List[Player] = []
-        player_max_score = 0
-        for idx_player in range(0, len(players)):
+        self.reset()
+        plays = self.plays
+        table_plays = table.table_plays
+        max_players = self.max_players
+        max_scorers = self.max_scorers
+        max_score = 0
+        choose_play = self.choose_play
+
+        enemy_team = players[-1].team
+        for player in players:
 
-            player = players[idx_player]
-            enemy_team = players[idx_player - 1].team
-            play = player._wrap_choose_play(self.plays, table, enemy_team)
-            self.plays.append(play)
-            table.table_plays.append(play)
+            play = choose_play(player, plays, table, enemy_team)
+            plays.append(play)
+            table_plays.append(play)
 
             score = play.card_value
-            if score > player_max_score:
-                player_max_scorer = [player]
-                player_max_score = score
-            elif score == player_max_score and player_max_scorer[0] != player.partner:
-                player_max_scorer = player_max_scorer + [player]
-        # print("-" * 10)
-        return player_max_scorer
+            if score > max_score:
+                self.highest_play = play
+                max_score = score
+                max_players.clear()
+                max_players.append(player)
+                max_scorers.clear()
+                max_scorers.append(player)
+            elif score == max_score:
+                max_players.append(player)
+                if max_scorers[0] is not player.partner:
+                    max_scorers.append(player)
+
+            enemy_team = player.team
+
+        return max_scorers
+
+    # hook called by get_winner for every decision, as
+    # choose_play(player, plays, table, enemy_team). Player._wrap_choose_play
+    # itself, so the plain round pays no extra call (see ProfiledRound)
+    choose_play = staticmethod(Player._wrap_choose_play)
+
+
+class ProfiledRound(Round):
+    """Round that times itself and every player decision.
+
+    Only used for the tables sampled by a Profiler, so Round.get_winner stays
+    free of timers.
+    """
+
+    def __init__(self, team1: Team, team2: Team, profiler: Profiler) -> None:
+        super().__init__(team1, team2)
+        self.profiler = profiler
+
+    def get_winner(self, players: List[Player], table: Table) -> List[Player]:
+        """Round.get_winner, timing the whole round.
+
+        Args:
+            players (List[Player]): players list
+            table (Table): game in which the round belongs
+
+        Returns:
+            List[Player]: list of winners (more than one if draw), reused by the
+            next round
+        """
+        start = perf_counter()
+        max_scorers = super().get_winner(players, table)
+        self.profiler.add("round", perf_counter() - start)
+        return max_scorers
+
+    def choose_play(
+        self, player: Player, plays: List[Play], table: Table, enemy_team: Team
+    ) -> Play:
+        """Hook of Round.get_winner, timing the decision.
+
+        Args:
+            player (Player): player whose turn it is
+            plays (List[Play]): plays of the round so far
+            table (Table): game in which the round belongs
+            enemy_team (Team): team of the previous player
+
+        Returns:
+            Play: chosen card
+        """
+        choosing = perf_counter()
+        play = player._wrap_choose_play(plays, table, enemy_team)
+        self.profiler.add("choose_play", perf_counter() - choosing)
+        return play
 
 
 class Table:
@@ -138,43 +263,80 @@ class Table:
 
     def __init__(self, game: Game, table_value: int = 1) -> None:
 
-        # preparing the deck
-        game.deck.collect_cards()
-        game.deck.shuffle_cards()
-
         # extending some game definitions...
         self.deck: Deck = game.deck
 
         self.game = game
 
-        # determined at "distribute_cards"
-        self.manilha: int = 0
-        self.vira: int = 0
-
-        # determined at get_winner func
-        self.table_value: int = table_value
+        # reused by the three rounds
+        self.round = Round(game.team1, game.team2)
+        # swapped in for the tables sampled by the game profiler
+        self.profiled_round: Optional[Round] = None
+        if game.profiler is not None:
+            self.profiled_round = ProfiledRound(game.team1, game.team2, game.profiler)
 
         # Added along rounds
         self.table_plays: List[Play] = []
 
-        # rows for the attribute table_stats in Game class
-        # key is player name, value is his stats
-        self.stats: Dict[str, Dict[str, int]] = {
+        # seat order and hands of the current deal, kept while it is replayed
+        self.deal_players: List[Player] = []
+        self.deal_hands: List[List[Card]] = []
+        self.replay: int = 0
+
+        # one reusable stats row per player
+        self.player_stats: Dict[str, Dict[str, int]] = {
             player.name: {
                 "highest_card": 0,
                 "middle_card": 0,
                 "lowest_card": 0,
-                "result": 0,
+                "result": RESULT_LOSS,
             }
             for player in game.players
         }
 
+        self.reset(table_value)
+
+    def reset(self, table_value: int = 1, replay: int = 0) -> None:
+        """Prepare the deck and clear the table for a new deal.
+
+        Args:
+            table_value (int, optional): The points that the winners get. Defaults to 1.
+            replay (int, optional): replays of the last deal so far (see
+            replay_cards), 0 to shuffle a new deal. Defaults to 0.
+        """
+        self.replay = replay
+        if not replay:
+            # preparing the deck
+            self.deck.collect_cards()
+            self.deck.shuffle_cards()
+
+            # determined at "distribute_cards"
+            self.manilha: int = 0
+            self.vira: int = 0
+
+        # determined at get_winner func
+        self.table_value: int = table_value
+
+        self.table_plays.clear()
+
+        # rows for the attribute table_stats in Game class, in seat order
+        # key is player name, value is his stats
+        self.stats: Dict[str, Dict[str, int]] = {}
+        for player in self.game.players:
+            player_registry = self.player_stats[player.name]
+            player_registry["result"] = RESULT_LOSS
+            self.stats[player.name] = player_registry
+
     def distribute_cards(self, players: List[Player]) -> None:
         """Distribute cards among players.
 
         Args:
             players (List[Player]): players participating
         """
+        if self.replay:
+            self.replay_cards()
+            return
+
         self.vira = self.deck.cards.pop().value
 
         # manilha is the next
@@ -186,16 +348,41 @@ class Table:
         for p in players:
             self.setup_player(p)
 
+        if self.game.deal_replays > 1:
+            self.deal_players = list(players)
+            self.deal_hands = [p.hand.copy() for p in players]
+
+    def replay_cards(self) -> None:
+        """Give the players the hands of the last deal again.
+
+        Hands stay with their players while the game rotates the seats, so
+        the first ROTATIONS replays play every hand from every seat. The
+        next ones give each player the hand of the player after them in the
+        deal, which belongs to the other team.
+        """
+        shift = self.replay // ROTATIONS
+        seats = len(self.deal_players)
+        for idx, player in enumerate(self.deal_players):
+            hand = self.deal_hands[(idx + shift) % seats]
+            player.hand.extend(hand)
+            self.register_player_initial_data(hand, player.name)
+
     def setup_player(self, player: Player) -> None:
-        for _ in range(3):
-            card = self.deck.cards.pop()
-            if card.value == self.manilha:
-                card = Card(card.suit, self.deck.max_value + card.suit)
-            player.hand.append(card)
-        ordered_cards = sorted(player.hand, key=lambda c: c.value)
-        player.hand = ordered_cards
+        """Deal three cards to the player, remapping the manilhas.
 
-        self.register_player_initial_data(ordered_cards, player.name)
+        Args:
+            player (Player): player receiving the cards
+        """
+        cards = self.deck.cards
+        manilha = self.manilha
+        hand = player.hand
+        for card in (cards.pop(), cards.pop(), cards.pop()):
+            if card.value == manilha:
+                card = self.deck.manilha_cards[card.suit]
+            hand.append(card)
+        hand.sort(key=card_value)
+
+        self.register_player_initial_data(hand, player.name)
 
     def register_player_initial_data(
         self, ordered_cards: List[Card], player_name: str
@@ -232,11 +419,11 @@ class Table:
         # Draw case
         if winner_team is None:
             for j in self.game.players:
-                self.stats[j.name]["result"] = 0.5
+                self.stats[j.name]["result"] = RESULT_DRAW
             return
 
         for player in winner_team.players:
-            self.stats[player.name]["result"] = 1
+            self.stats[player.name]["result"] = RESULT_WIN
 
     def reorder_players_after_round(self, round_winners: List[Player]) -> None:
         """Reorder the players according to who won the last round
@@ -247,7 +434,8 @@ class Table:
         """
         if len(round_winners) == 1:
             idx = self.players.index(round_winners[0])
-            self.players = self.players[idx:] + self.players[:idx]
+            if idx:
+                self.players = self.players[idx:] + self.players[:idx]
 
     def get_winner(
         self,
@@ -269,17 +457,123 @@ class Table:
         """
         # TODO: test the unlikely cases
 
+        profiler = self.game.profiler
+        if profiler is not None and profiler.sample():
+            return self.get_winner_profiled(
+                profiler, players, team1, team2, table_value
+            )
+
+        self.players = players
+        self.table_value = table_value
+
+        self.distribute_cards(self.players)
+        self.next_players = self.players[1:] + [self.players[0]]
+
+        if self.game.outcome_cache is None:
+            winner = self.play_rounds(team1, team2)
+        else:
+            winner = self.play_rounds_cached(self.game.outcome_cache, team1, team2)
+
+        self.register_scores(winner)
+        self.setup_player_and_team(team1, team2)
+        return winner, self.next_players
+
+    def get_winner_profiled(
+        self,
+        profiler: Profiler,
+        players: List[Player],
+        team1: Team,
+        team2: Team,
+        table_value: int = 1,
+    ) -> Tuple[Union[Team, None], List[Player]]:
+        """Same as get_winner, recording phase timings and the table outcome.
+
+        Args:
+            profiler (Profiler): profile of the run
+            players (List[Player]): list of players
+            team1 (Team): team 1
+            team2 (Team): team 2
+            table_value (int, optional): The points that the winners get. Defaults to 1.
+
+        Returns:
+            Tuple[Union[Team, None], List[Player]]: winner(s) (None if draw)
+        """
+        start = perf_counter()
         self.players = players
         self.table_value = table_value
 
         self.distribute_cards(self.players)
         self.next_players = self.players[1:] + [self.players[0]]
-        winners: List[List[Player]] = []
+        manilhas = sum(
+            card.value > self.deck.max_value
+            for player in players
+            for card in player.hand
+        )
+        dealt = perf_counter()
+
+        self.round, self.profiled_round = self.profiled_round, self.round
+        if self.game.outcome_cache is None:
+            winner = self.play_rounds(team1, team2)
+        else:
+            winner = self.play_rounds_cached(self.game.outcome_cache, team1, team2)
+        self.round, self.profiled_round = self.profiled_round, self.round
+        played = perf_counter()
+
+        self.register_scores(winner)
+        self.setup_player_and_team(team1, team2)
+        stop = perf_counter()
+
+        profiler.add("deal", dealt - start)
+        profiler.add("rounds", played - dealt)
+        profiler.add("register", stop - played)
+        profiler.add("table", stop - start)
+        profiler.count_table(manilhas, len(self.table_plays) // 4, winner is None)
+        return winner, self.next_players
+
+    def play_rounds_cached(
+        self, cache: OutcomeCache, team1: Team, team2: Team
+    ) -> Union[Team, None]:
+        """Look the dealt table up in the cache before playing the rounds.
+
+        Args:
+            cache (OutcomeCache): cache of outcomes keyed by canonical deal
+            team1 (Team): team 1
+            team2 (Team): team 2
+
+        Returns:
+            Union[Team, None]: winner team (None if draw)
+        """
+        seats = self.players
+        key = cache.canonical_key([player.hand for player in seats])
+
+        outcome = cache.get(key)
+        if outcome is not None:
+            return None if outcome == DRAW else seats[outcome].team
 
-        for _ in range(3):
+        winner = self.play_rounds(team1, team2)
+        if winner is None:
+            cache.put(key, DRAW)
+        else:
+            cache.put(key, 0 if winner is seats[0].team else 1)
+        return winner
+
+    def play_rounds(self, team1: Team, team2: Team) -> Union[Team, None]:
+        """Play up to 3 rounds with the dealt cards.
+
+        Args:
+            team1 (Team): team 1
+            team2 (Team): team 2
+
+        Returns:
+            Union[Team, None]: winner team (None if draw)
+        """
+        first_round_team: Union[Team, None] = None
+
+        for round_idx in range(3):
 
-            round_winner = Round(team1, team2).get_winner(self.players, self)
-            winners.append(round_winner)
+            round_winner = self.round.get_winner(self.players, self)
+            if round_idx == 0 and len(round_winner) == 1:
+                first_round_team = round_winner[0].team
 
             self.reorder_players_after_round(round_winner)
 
@@ -294,20 +588,18 @@ class Table:
                     winner = team2
                 else:
                     # Case win - loss - draw, winner is who won the first round
-                    if len(winners[0]) == 1:
-                        winner = winners[0][0].team
+                    if first_round_team is not None:
+                        winner = first_round_team
                     else:
                         # Case draw-draw, one more round should be played
-                        if len(winners) == 2:
+                        if round_idx == 1:
                             continue
                         # Case draw-draw-draw (no winner lol)
                         winner = None
 
                 break
 
-        self.register_scores(winner)
-        self.setup_player_and_team(team1, team2)
-        return winner, self.next_players
+        return winner
 
 
 class Game:
@@ -319,45 +611,161 @@ class Game:
         players: List[Player],
         team1: Team,
         team2: Team,
+        seed: Optional[int] = None,
+        deck: Optional[Deck] = None,
+        outcome_cache: Optional[OutcomeCache] = None,
+        lazy: bool = False,
+        profiler: Optional[Profiler] = None,
+        deal_replays: int = 1,
+        first_deal: int = 0,
+        trace: Optional[TraceRecorder] = None,
     ) -> None:
 
-        self.deck: Deck = Deck()
+        self.deck: Deck = deck if deck is not None else Deck(Random(seed))
+
+        # optional memo of table outcomes (see Table.play_rounds_cached)
+        self.outcome_cache = outcome_cache
+
+        # optional profile of sampled tables (see Table.get_winner_profiled)
+        self.profiler = profiler
+
+        # optional record of every play (see iter_tables), cached tables are
+        # not played
+        if trace is not None and outcome_cache is not None:
+            raise ValueError("a traced game can not use an outcome cache")
+        self.trace = trace
 
         self.table_quantity = table_quantity
 
+        # consecutive tables playing each shuffled deal: 1, ROTATIONS (every
+        # seat rotation) or 2 * ROTATIONS (and the teams swapping hands)
+        if deal_replays not in (1, ROTATIONS, 2 * ROTATIONS):
+            raise ValueError(f"deal_replays must be 1, {ROTATIONS} or {2 * ROTATIONS}")
+        self.deal_replays = deal_replays
+        # rotation group of the current table (the deal index)
+        self.deal: int = first_deal
+
         self.players = players
         self.team1 = team1
         self.team2 = team2
+        if trace is not None:
+            trace.bind(self)
 
         self.table_value: int = 1
 
-        # highest_card: [int]
-        # middle_card: [int]
-        # lowest_card: [int]
-        # vitoria: [int] 1 for win, 0 for loss and 0.5 for draw
-        self.table_stats: Dict[str, List[int]] = {
-            "highest_card": [],
-            "middle_card": [],
-            "lowest_card": [],
-            "result": [],
-        }
+        # preallocated int8 columns, one row per player and table
+        # highest_card, middle_card, lowest_card: card values
+        # result: RESULT_WIN, RESULT_DRAW or RESULT_LOSS
+        self.table_stats: Dict[str, array] = self.empty_stats(
+            0 if lazy else table_quantity * len(players), deal_replays > 1
+        )
+        self.registered_rows: int = 0
 
-        for _ in range(self.table_quantity):
-            table = Table(self, self.table_value)
+        # lazy games only simulate through iter_tables/iter_chunks
+        if not lazy:
+            for table_stats in self.iter_tables():
+                self.regsiter_scores(table_stats)
+
+    @staticmethod
+    def empty_stats(rows: int = 0, grouped: bool = False) -> Dict[str, array]:
+        """Create zeroed table_stats columns.
+
+        Args:
+            rows (int, optional): preallocated rows. Defaults to 0.
+            grouped (bool, optional): add the int64 GROUP_COLUMN. Defaults to
+            False.
+
+        Returns:
+            Dict[str, array]: one int8 array per column
+        """
+        columns = {column: array("b", bytes(rows)) for column in STATS_COLUMNS}
+        if grouped:
+            columns[GROUP_COLUMN] = array("q", bytes(8 * rows))
+        return columns
+
+    def iter_tables(self) -> Iterator[Dict[str, Dict[str, int]]]:
+        """Simulate the tables one at a time.
+
+        Yields:
+            Iterator[Dict[str, Dict[str, int]]]: stats of each table (the rows
+            are reused by the next table)
+        """
+        table: Optional[Table] = None
+        trace = self.trace
+        start = perf_counter()
+        first_deal = self.deal
+        for table_idx in range(self.table_quantity):
+            deal, replay = divmod(table_idx, self.deal_replays)
+            self.deal = first_deal + deal
+            if table is None:
+                table = Table(self, self.table_value)
+            else:
+                table.reset(self.table_value, replay)
 
             _, self.players = table.get_winner(self.players, self.team1, self.team2)
+            if trace is not None:
+                trace.record(table)
+
+            yield table.stats
 
-            self.regsiter_scores(table.stats)
+        if self.profiler is not None:
+            self.profiler.add("game", perf_counter() - start)
 
-    def regsiter_scores(self, table_stats: Dict[str, Dict[str, int]]) -> None:
+    def iter_chunks(self, chunk_size: int) -> Iterator[Dict[str, array]]:
+        """Simulate the tables and group their rows in table_stats chunks.
+
+        Args:
+            chunk_size (int): number of tables per chunk
+
+        Yields:
+            Iterator[Dict[str, array]]: table_stats columns of each chunk
+        """
+        tables = self.iter_tables()
+        rows_per_table = len(self.players)
+
+        for start in range(0, self.table_quantity, chunk_size):
+            chunk_tables = min(chunk_size, self.table_quantity - start)
+            chunk = self.empty_stats(
+                chunk_tables * rows_per_table, self.deal_replays > 1
+            )
+
+            for table_idx, table_stats in enumerate(islice(tables, chunk_tables)):
+                self.regsiter_scores(table_stats, chunk, table_idx * rows_per_table)
+            yield chunk
+
+    def regsiter_scores(
+        self,
+        table_stats: Dict[str, Dict[str, int]],
+        columns: Optional[Dict[str, array]] = None,
+        row: int = 0,
+    ) -> None:
         """Register scores coming from Game class.
 
         Args:
             table_stats (Dict[str, Dict[str, int]]): Game (three rounds) scores.
+            columns (Optional[Dict[str, array]], optional): preallocated columns
+            to write into. Defaults to self.table_stats, after the rows already
+            registered.
+            row (int, optional): first row to write in columns. Defaults to 0.
         """
-        for _, stats in table_stats.items():
-            for k, v in stats.items():
-                self.table_stats[k].append(v)
+        if columns is None:
+            columns, row = self.table_stats, self.registered_rows
+            self.registered_rows += len(table_stats)
+
+        highest, middle = columns["highest_card"], columns["middle_card"]
+        lowest, result = columns["lowest_card"], columns["result"]
+        start = row
+        for stats in table_stats.values():
+            highest[row] = stats["highest_card"]
+            middle[row] = stats["middle_card"]
+            lowest[row] = stats["lowest_card"]
+            result[row] = stats["result"]
+            row += 1
+
+        if GROUP_COLUMN in columns:
+            group = columns[GROUP_COLUMN]
+            for group_row in range(start, row):
+                group[group_row] = self.deal
 
     def __str__(self) -> str:
         return (
@@ -0,0 +1,118 @@
+"""NumPy dealer that deals whole batches of tables at once."""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from modules.classes.deck import Deck
+
+# cards dealt per table: the vira plus three cards for each of the four seats
+CARDS_PER_TABLE = 13
+
+
+class BatchDealer:
+    """Deals many tables at array speed.
+
+    Cards are referenced by their index in Deck.bkp_cards. A dealt table is a row
+    of 13 card indexes: column 0 is the vira and columns 1 to 12 hold three cards
+    for each seat, in the same order Table.distribute_cards pops them.
+    """
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        deck: Optional[Deck] = None,
+        block_size: int = 1 << 16,
+    ) -> None:
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        self.deck: Deck = deck if deck is not None else Deck()
+        self.max_value: int = self.deck.max_value
+        self.block_size = block_size
+
+        self.card_suits = np.array(
+            [card.suit for card in self.deck.bkp_cards], dtype=np.int8
+        )
+        self.card_values = np.array(
+            [card.value for card in self.deck.bkp_cards], dtype=np.int8
+        )
+        self.manilha_lookup = self._build_manilha_lookup()
+
+    def _build_manilha_lookup(self) -> np.ndarray:
+        """Precompute the value of every card for every possible vira.
+
+        Returns:
+            np.ndarray: (max_value + 1, 40) int8 table indexed by [vira, card]
+        """
+        lookup = np.tile(self.card_values, (self.max_value + 1, 1))
+        for vira in range(1, self.max_value + 1):
+            manilha = 1 if vira == self.max_value else vira + 1
+            is_manilha = self.card_values == manilha
+            lookup[vira, is_manilha] = self.max_value + self.card_suits[is_manilha]
+
+        return lookup
+
+    def deal_indexes(self, table_quantity: int) -> np.ndarray:
+        """Shuffle and deal card indexes for many tables.
+
+        Args:
+            table_quantity (int): number of tables to deal
+
+        Returns:
+            np.ndarray: (N, 13) int8 card indexes (vira first, then the seats)
+        """
+        dealt = np.empty((table_quantity, CARDS_PER_TABLE), dtype=np.int8)
+        for start in range(0, table_quantity, self.block_size):
+            stop = min(start + self.block_size, table_quantity)
+            dealt[start:stop] = self._deal_block(stop - start)
+
+        return dealt
+
+    def _deal_block(self, table_quantity: int) -> np.ndarray:
+        """Partial Fisher-Yates shuffle of one block of decks.
+
+        Args:
+            table_quantity (int): number of tables in the block
+
+        Returns:
+            np.ndarray: (N, 13) int8 card indexes
+        """
+        deck_size = len(self.card_values)
+        decks = np.tile(np.arange(deck_size, dtype=np.int8), (table_quantity, 1))
+        rows = np.arange(table_quantity)
+
+        for position in range(CARDS_PER_TABLE):
+            picked = self.rng.integers(position, deck_size, size=table_quantity)
+            swapped = decks[rows, picked]
+            decks[rows, picked] = decks[:, position]
+            decks[:, position] = swapped
+
+        return decks[:, :CARDS_PER_TABLE]
+
+    def hands_from_indexes(self, dealt: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Apply the manilha remap and sort every hand.
+
+        Args:
+            dealt (np.ndarray): (N, 13) card indexes from deal_indexes
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (N, 4, 3) sorted hand values and
+            (N,) vira values
+        """
+        vira = self.card_values[dealt[:, 0]]
+        seats = dealt[:, 1:].reshape(-1, 4, 3)
+
+        hands = self.manilha_lookup[vira[:, None, None], seats]
+        hands.sort(axis=2)
+        return hands, vira
+
+    def deal(self, table_quantity: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Deal many tables and return their hand values.
+
+        Args:
+            table_quantity (int): number of tables to deal
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (N, 4, 3) sorted hand values and
+            (N,) vira values
+        """
+        return self.hands_from_indexes(self.deal_indexes(table_quantity))
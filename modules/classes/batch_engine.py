@@ -0,0 +1,257 @@
+"""Vectorized engine that plays PlayerImplementation1's strategy on many tables."""
+
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from modules.classes.base_classes import (
+    RESULT_DRAW,
+    RESULT_LOSS,
+    RESULT_WIN,
+)
+from modules.classes.batch_deck import BatchDealer
+from modules.classes.packed_hand import HAND_SIZE, HIGHEST, pack, remove, value_at
+
+# winner codes returned by resolve_tables (teams are seats 0/2 and seats 1/3)
+DRAW = -1
+NO_WINNER = -2
+
+# lookups of packed_hand, indexed by hand code
+_HAND_SIZE = np.frombuffer(HAND_SIZE, dtype=np.uint8)
+_HIGHEST = np.frombuffer(HIGHEST, dtype=np.uint8)
+
+
+class _RoundState:
+    """Running state of one round for every table of the batch."""
+
+    def __init__(self, table_quantity: int) -> None:
+        self.played = np.zeros((table_quantity, 4), dtype=np.int8)
+        self.max_value = np.zeros(table_quantity, dtype=np.int8)
+        self.first_seat = np.zeros(table_quantity, dtype=np.int8)
+        self.ties = np.zeros(table_quantity, dtype=np.int8)
+
+    def register(self, rows: np.ndarray, seat: np.ndarray, value: np.ndarray) -> None:
+        """Same rules as Round.get_winner for the max scorer list.
+
+        Args:
+            rows (np.ndarray): table indexes
+            seat (np.ndarray): seat that played on each table
+            value (np.ndarray): value played on each table
+        """
+        greater = value > self.max_value
+        # a tie only counts when the first max scorer is not the player's partner
+        tied = (value == self.max_value) & (self.first_seat != (seat + 2) % 4)
+
+        self.ties = np.where(greater, 0, self.ties + tied)
+        self.first_seat = np.where(greater, seat, self.first_seat)
+        self.max_value = np.maximum(value, self.max_value)
+        self.played[rows, seat] = value
+
+
+def pack_hands(hands: np.ndarray) -> np.ndarray:
+    """Pack sorted hands with packed_hand.pack, one card slot at a time.
+
+    Args:
+        hands (np.ndarray): (N, 4, 3) sorted hand values in seat order
+
+    Returns:
+        np.ndarray: (N, 4) uint16 hand codes
+    """
+    return pack(np.moveaxis(hands.astype(np.uint16), 2, 0))
+
+
+def _lowest_at_least(code: np.ndarray, value: np.ndarray) -> np.ndarray:
+    """Slot of the lowest card reaching a value, the lowest card if none does.
+
+    Args:
+        code (np.ndarray): (N,) hand codes
+        value (np.ndarray): (N,) values to be reached
+
+    Returns:
+        np.ndarray: (N,) slot of the chosen card
+    """
+    slot = np.zeros(len(code), dtype=np.int64)
+    # from the highest slot down, so the lowest reaching card wins
+    for card_slot in (2, 1, 0):
+        reaching = value_at(code, card_slot) >= value
+        slot = np.where(reaching, card_slot, slot)
+    return slot
+
+
+def _choose_cards(
+    turn: int,
+    code: np.ndarray,
+    seat: np.ndarray,
+    points: np.ndarray,
+    state: _RoundState,
+) -> np.ndarray:
+    """Masked version of Strategy.choose_best_card on packed hands.
+
+    Args:
+        turn (int): 0 based turn inside the round
+        code (np.ndarray): (N,) packed hand of the playing seat
+        seat (np.ndarray): (N,) playing seat
+        points (np.ndarray): (N, 2) table points of each team
+        state (_RoundState): running round state
+
+    Returns:
+        np.ndarray: (N,) slot of the chosen card (0 is the lowest)
+    """
+    rows = np.arange(len(code))
+    size = _HAND_SIZE[code]
+    lowest = np.zeros(len(code), dtype=np.int64)
+    highest = size.astype(np.int64) - 1
+
+    team = seat % 2
+    rival = points[rows, 1 - team]
+    own = points[rows, team]
+
+    if turn == 0:
+        return np.where(rival > 0, highest, lowest)
+
+    partner = (seat + 2) % 4
+    round_max = state.max_value
+    partner_has_max = state.first_seat == partner
+    is_draw = (state.played[rows, partner] == round_max) & (
+        (state.played == round_max[:, None]).sum(axis=1) > 1
+    )
+
+    if turn in (1, 2):
+        highest_value = _HIGHEST[code]
+        covering = np.where(highest_value <= round_max, lowest, highest)
+        draw_choice = np.where(rival > 0, covering, lowest)
+        normal_choice = np.where(
+            partner_has_max,
+            lowest,
+            np.where(round_max <= highest_value, highest, lowest),
+        )
+        chosen = np.where(is_draw, draw_choice, normal_choice)
+        chosen = np.where((rival == 1) & (own == 1), highest, chosen)
+    else:
+        value_to_be_reached = round_max + ((rival == 1) & (own != 1))
+        lowest_possible = _lowest_at_least(code, value_to_be_reached)
+        chosen = np.where(partner_has_max, lowest, lowest_possible)
+        chosen = np.where(is_draw, np.where(rival > 0, highest, lowest), chosen)
+
+    # a single card left is always played (highest is 0 too)
+    return chosen
+
+
+def resolve_tables(hands: np.ndarray) -> np.ndarray:
+    """Play three rounds on every table, like Table.get_winner.
+
+    Args:
+        hands (np.ndarray): (N, 4, 3) sorted hand values in seat order
+
+    Returns:
+        np.ndarray: (N,) winner team (0 for seats 0/2, 1 for seats 1/3, DRAW)
+    """
+    table_quantity = len(hands)
+    rows = np.arange(table_quantity)
+
+    # cards are taken out of the codes as they are played
+    codes = pack_hands(hands)
+    points = np.zeros((table_quantity, 2), dtype=np.int8)
+    leader = np.zeros(table_quantity, dtype=np.int8)
+    winner = np.full(table_quantity, NO_WINNER, dtype=np.int8)
+    active = np.ones(table_quantity, dtype=bool)
+
+    for round_idx in range(3):
+        state = _RoundState(table_quantity)
+
+        for turn in range(4):
+            seat = (leader + turn) % 4
+            code = codes[rows, seat]
+            chosen = _choose_cards(turn, code, seat, points, state)
+            codes[rows, seat] = remove(code, chosen)
+            state.register(rows, seat, value_at(code, chosen).astype(np.int8))
+
+        single = state.ties == 0
+        first_team = state.first_seat % 2
+        points[rows, first_team] += 1
+        points[rows, 1 - first_team] += state.ties
+        leader = np.where(single, state.first_seat, leader)
+
+        if round_idx == 0:
+            first_single, first_winner = single, first_team
+
+        team0, team1 = points[:, 0], points[:, 1]
+        tied = team0 == team1
+        decided = np.where(team0 > team1, 0, 1)
+        # win-loss-draw goes to the first round winner, draw-draw-draw to nobody
+        decided = np.where(tied, np.where(first_single, first_winner, DRAW), decided)
+
+        done = active & ((team0 > 1) | (team1 > 1))
+        if round_idx == 1:
+            # draw-draw: one more round should be played
+            done &= ~(tied & ~first_single)
+
+        winner[done] = decided[done]
+        active &= ~done
+
+    return winner
+
+
+def build_table_stats(hands: np.ndarray, winner: np.ndarray) -> Dict[str, np.ndarray]:
+    """Build Game.table_stats columns (one row per seat of every table).
+
+    Args:
+        hands (np.ndarray): (N, 4, 3) sorted hand values in seat order
+        winner (np.ndarray): (N,) winner team from resolve_tables
+
+    Returns:
+        Dict[str, np.ndarray]: int8 highest_card, middle_card, lowest_card and
+        result (RESULT_WIN, RESULT_DRAW or RESULT_LOSS)
+    """
+    seat_team = np.arange(4) % 2
+    result = np.where(winner[:, None] == seat_team, RESULT_WIN, RESULT_LOSS)
+    result = result.astype(np.int8)
+    result[winner == DRAW] = RESULT_DRAW
+
+    return {
+        "highest_card": hands[:, :, 2].ravel(),
+        "middle_card": hands[:, :, 1].ravel(),
+        "lowest_card": hands[:, :, 0].ravel(),
+        "result": result.ravel(),
+    }
+
+
+def simulate_tables(
+    table_quantity: int, seed: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """Deal and resolve tables with the vectorized engine.
+
+    Args:
+        table_quantity (int): number of tables to simulate
+        seed (Optional[int], optional): seed for the dealer. Defaults to None.
+
+    Returns:
+        Dict[str, np.ndarray]: table_stats columns
+    """
+    hands, _ = BatchDealer(seed).deal(table_quantity)
+    return build_table_stats(hands, resolve_tables(hands))
+
+
+def iter_chunks(
+    table_quantity: int,
+    seed: Optional[int] = None,
+    chunk_size: int = 1 << 16,
+    dealer: Optional[BatchDealer] = None,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Simulate tables in fixed-size chunks sharing one dealer.
+
+    Args:
+        table_quantity (int): number of tables to simulate
+        seed (Optional[int], optional): seed for the dealer. Defaults to None.
+        chunk_size (int, optional): tables per chunk. Defaults to 65536.
+        dealer (Optional[BatchDealer], optional): dealer to use instead of a new
+        one seeded with seed. Defaults to None.
+
+    Yields:
+        Iterator[Dict[str, np.ndarray]]: table_stats columns of each chunk
+    """
+    if dealer is None:
+        dealer = BatchDealer(seed)
+    for start in range(0, table_quantity, chunk_size):
+        hands, _ = dealer.deal(min(chunk_size, table_quantity - start))
+        yield build_table_stats(hands, resolve_tables(hands))
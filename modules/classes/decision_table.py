@@ -0,0 +1,413 @@
+"""Compiled lookup table of PlayerImplementation1's strategy.
+
+The table is built once, outside the simulation workers, with:
+
+    python -m modules.classes.decision_table [PATH] [--verify]
+
+or with build_decision_table, which generate_simulations calls before a run
+with the "table" engine. Players only load it.
+"""
+
+import argparse
+import hashlib
+import inspect
+import os
+from array import array
+from itertools import combinations_with_replacement
+from typing import List, Optional, Sequence
+
+from modules.classes.base_classes import Play, Player, Table, Team
+from modules.classes.deck import Card, Deck
+from modules.classes.packed_hand import CARD_BITS, HAND_LIMIT, pack, value_at
+from modules.classes.players import PlayerImplementation1, Strategy
+
+# a user cache directory, the package directory may be read-only
+DEFAULT_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join("~", ".cache"),
+    "truco_simulator",
+    "decision_table.bin",
+)
+MAGIC = b"TRDT"
+
+_deck = Deck()
+# card values go from 1 to the highest manilha, 0 means "no card played yet"
+VALUE_LIMIT = _deck.max_value + max(_deck.card_suits) + 1
+TABLE_POINTS = 3
+
+
+def _hand_codes() -> List[int]:
+    """Code of every sorted hand with two or three cards.
+
+    Returns:
+        List[int]: packed_hand codes
+    """
+    codes = []
+    for size in (3, 2):
+        for values in combinations_with_replacement(range(1, VALUE_LIMIT), size):
+            codes.append(pack(values))
+    return codes
+
+
+HAND_CODES = _hand_codes()
+HAND_INDEX = array("h", [-1]) * HAND_LIMIT
+for _idx, _code in enumerate(HAND_CODES):
+    HAND_INDEX[_code] = _idx
+del _idx, _code
+
+# strides of the flat table, the hand is the fastest changing part of the key
+OWN_STRIDE = len(HAND_CODES)
+RIVAL_STRIDE = OWN_STRIDE * TABLE_POINTS
+DRAW_STRIDE = RIVAL_STRIDE * TABLE_POINTS
+PARTNER_STRIDE = DRAW_STRIDE * 2
+HIGHEST_STRIDE = PARTNER_STRIDE * 2
+TURN_STRIDE = HIGHEST_STRIDE * VALUE_LIMIT
+TABLE_SIZE = TURN_STRIDE * 4
+
+
+def hand_code(hand: List[Card]) -> int:
+    """Pack the values of a sorted hand with two or three cards.
+
+    Args:
+        hand (List[Card]): sorted hand
+
+    Returns:
+        int: packed_hand code, as listed by HAND_CODES
+    """
+    # packed_hand.pack, without a list of values on every move
+    code = hand[0].value | hand[1].value << CARD_BITS
+    if len(hand) == 3:
+        return code | hand[2].value << (2 * CARD_BITS)
+    return code
+
+
+def state_key(
+    turn: int,
+    code: int,
+    highest_value: int,
+    partner_has_highest: bool,
+    is_draw: bool,
+    rival_points: int,
+    own_points: int,
+) -> int:
+    """Position of a game state in the flat table.
+
+    Args:
+        turn (int): 1 to 4, position of the player in the round
+        code (int): hand code from hand_code
+        highest_value (int): highest value played in the round (0 if none)
+        partner_has_highest (bool): the first highest play is the partner's
+        is_draw (bool): the partner is tied with the highest value
+        rival_points (int): enemy team table points
+        own_points (int): player team table points
+
+    Returns:
+        int: table index
+    """
+    return (
+        (turn - 1) * TURN_STRIDE
+        + highest_value * HIGHEST_STRIDE
+        + partner_has_highest * PARTNER_STRIDE
+        + is_draw * DRAW_STRIDE
+        + rival_points * RIVAL_STRIDE
+        + own_points * OWN_STRIDE
+        + HAND_INDEX[code]
+    )
+
+
+def strategy_digest() -> bytes:
+    """Hash of the strategy source, so stale tables are rebuilt.
+
+    Returns:
+        bytes: sha256 digest
+    """
+    source = inspect.getsource(Strategy) + inspect.getsource(PlayerImplementation1)
+    return hashlib.sha256(source.encode()).digest()
+
+
+class _StrategyProbe:
+    """Players and teams used to ask the live Strategy about any state."""
+
+    def __init__(self) -> None:
+        self.player = PlayerImplementation1("player")
+        self.partner = PlayerImplementation1("partner")
+        self.enemy = PlayerImplementation1("enemy")
+        self.team = Team("own", self.player, self.partner)
+        Team("rival", self.enemy, PlayerImplementation1("enemy partner"))
+
+    def choose(self, key: int) -> int:
+        """Hand index chosen by the live Strategy.
+
+        Args:
+            key (int): table index
+
+        Returns:
+            int: index of the chosen card in the sorted hand
+        """
+        turn, rest = divmod(key, TURN_STRIDE)
+        highest_value, rest = divmod(rest, HIGHEST_STRIDE)
+        partner_has_highest, rest = divmod(rest, PARTNER_STRIDE)
+        is_draw, rest = divmod(rest, DRAW_STRIDE)
+        rival_points, rest = divmod(rest, RIVAL_STRIDE)
+        own_points, hand_idx = divmod(rest, OWN_STRIDE)
+
+        code = HAND_CODES[hand_idx]
+        values = [value_at(code, slot) for slot in range(3)]
+        hand = [Card(0, value) for value in values if value]
+        self.player.hand = hand
+        self.team.table_points = own_points
+
+        highest_play = None
+        max_players: List[Player] = []
+        if turn > 0:
+            holder = self.partner if partner_has_highest else self.enemy
+            other = self.enemy if partner_has_highest else self.partner
+            highest_play = Play(holder, highest_value)
+            max_players = [holder, other] if is_draw else [holder]
+
+        strategy = self.player.strategy.update(
+            turn + 1, highest_play, rival_points, [], max_players
+        )
+        card = strategy.choose_best_card()
+        return next(idx for idx, held in enumerate(hand) if held is card)
+
+
+def compile_decision_table() -> bytes:
+    """Ask the live Strategy for the move of every state.
+
+    Returns:
+        bytes: hand index to play, for each table index
+    """
+    probe = _StrategyProbe()
+    return bytes(probe.choose(key) for key in range(TABLE_SIZE))
+
+
+def verify_decision_table(table: bytes) -> int:
+    """Check a table against the live Strategy code, state by state.
+
+    Args:
+        table (bytes): table from compile_decision_table or load_decision_table
+
+    Returns:
+        int: number of states where the table disagrees with Strategy
+    """
+    if len(table) != TABLE_SIZE:
+        return TABLE_SIZE
+
+    probe = _StrategyProbe()
+    return sum(probe.choose(key) != table[key] for key in range(TABLE_SIZE))
+
+
+def save_decision_table(table: bytes, path: str = DEFAULT_PATH) -> None:
+    """Atomically write the table, tagged with the strategy digest.
+
+    Args:
+        table (bytes): compiled table
+        path (str, optional): table path. Defaults to DEFAULT_PATH.
+    """
+    path = os.path.expanduser(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(MAGIC + strategy_digest() + table)
+    os.replace(tmp_path, path)
+
+
+def read_decision_table(path: str = DEFAULT_PATH) -> Optional[bytes]:
+    """Read a saved table if it matches the strategy code.
+
+    Args:
+        path (str, optional): table path. Defaults to DEFAULT_PATH.
+
+    Returns:
+        Optional[bytes]: compiled table, None if missing or stale
+    """
+    path = os.path.expanduser(path)
+    if not os.path.exists(path):
+        return None
+
+    header = MAGIC + strategy_digest()
+    with open(path, "rb") as file:
+        data = file.read()
+    start = len(header)
+    if data.startswith(header) and len(data) == start + TABLE_SIZE:
+        return data[start:]
+    return None
+
+
+def build_decision_table(path: str = DEFAULT_PATH) -> bytes:
+    """Compile and save the table, unless a current one is saved already.
+
+    Args:
+        path (str, optional): table path. Defaults to DEFAULT_PATH.
+
+    Returns:
+        bytes: compiled table
+    """
+    table = read_decision_table(path)
+    if table is None:
+        table = compile_decision_table()
+        save_decision_table(table, path)
+    return table
+
+
+def load_decision_table(path: str = DEFAULT_PATH) -> bytes:
+    """Load a table saved by build_decision_table.
+
+    Args:
+        path (str, optional): table path. Defaults to DEFAULT_PATH.
+
+    Raises:
+        FileNotFoundError: no table matching the strategy code at path
+
+    Returns:
+        bytes: compiled table
+    """
+    table = read_decision_table(path)
+    if table is None:
+        raise FileNotFoundError(
+            f"no current decision table at {path}, build it with "
+            "python -m modules.classes.decision_table"
+        )
+    return table
+
+
+_loaded_table: Optional[bytes] = None
+
+
+def shared_decision_table() -> bytes:
+    """Table loaded once per process and shared by every player.
+
+    Returns:
+        bytes: compiled table
+    """
+    global _loaded_table
+    if _loaded_table is None:
+        _loaded_table = load_decision_table()
+    return _loaded_table
+
+
+class DecisionTablePlayer(PlayerImplementation1):
+    """PlayerImplementation1 that looks its moves up in the compiled table.
+
+    With verify=True every move is also asked to the live Strategy and a
+    mismatch raises RuntimeError.
+    """
+
+    def __init__(
+        self, nome: str, table: Optional[bytes] = None, verify: bool = False
+    ) -> None:
+        super().__init__(nome)
+        self.table = table if table is not None else shared_decision_table()
+        self.verify = verify
+
+    def choose_play(
+        self, round_plays: List[Play], table: Table, enemy_team: Team
+    ) -> Play:
+        """Chooses the card with a table lookup.
+
+        Args:
+            round_plays (List[Play]): player moves that have been made already.
+            table (Table): three round data
+            enemy_team (Team): enemy team object
+
+        Returns:
+            Play: player move
+        """
+        hand = self.hand
+        if len(hand) == 1:
+            card = hand.pop()
+            return self.make_play(card.value)
+
+        key = (
+            len(round_plays) * TURN_STRIDE
+            + enemy_team.table_points * RIVAL_STRIDE
+            + self.team.table_points * OWN_STRIDE
+            + HAND_INDEX[hand_code(hand)]
+        )
+        current_round = table.round
+        highest_play = current_round.highest_play
+        if highest_play is not None:
+            partner = self.partner
+            max_players = current_round.max_players
+            key += highest_play.card_value * HIGHEST_STRIDE
+            if highest_play.player is partner:
+                key += PARTNER_STRIDE
+            if len(max_players) > 1 and partner in max_players:
+                key += DRAW_STRIDE
+
+        card_idx = self.table[key]
+        if self.verify:
+            self._verify_move(card_idx, round_plays, table, enemy_team)
+
+        card = hand[card_idx]
+        del hand[card_idx]
+        return self.make_play(card.value)
+
+    def _verify_move(
+        self, card_idx: int, round_plays: List[Play], table: Table, enemy_team: Team
+    ) -> None:
+        """Compare a table move with the move of the live Strategy.
+
+        Args:
+            card_idx (int): hand index from the table
+            round_plays (List[Play]): player moves that have been made already.
+            table (Table): three round data
+            enemy_team (Team): enemy team object
+        """
+        current_round = table.round
+        card = self.strategy.update(
+            len(round_plays) + 1,
+            current_round.highest_play,
+            enemy_team.table_points,
+            round_plays,
+            current_round.max_players,
+        ).choose_best_card()
+
+        if self.hand[card_idx] is not card:
+            raise RuntimeError(
+                f"decision table chose {self.hand[card_idx]} but Strategy chose "
+                f"{card} (hand={self.hand}, plays={round_plays})"
+            )
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line.
+
+    Args:
+        argv (Optional[Sequence[str]], optional): arguments. Defaults to
+        sys.argv.
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Build the decision table.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    parser.add_argument(
+        "--verify", action="store_true", help="check every state against Strategy"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Build (and verify) the decision table from the command line.
+
+    Args:
+        argv (Optional[Sequence[str]], optional): arguments. Defaults to
+        sys.argv.
+
+    Returns:
+        int: number of states where the table disagrees with Strategy
+    """
+    args = parse_args(argv)
+    table = build_decision_table(args.path)
+    print(f"Decision table saved to '{os.path.expanduser(args.path)}'")
+    if not args.verify:
+        return 0
+
+    mismatches = verify_decision_table(table)
+    print(f"States disagreeing with Strategy: {mismatches}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,53 @@
 """Classes related exclusively to the deck."""
 
+from collections import Counter
 from dataclasses import dataclass
-from itertools import product
-from random import shuffle
-from typing import List, Tuple
+from itertools import combinations, product
+from random import Random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# card names -> suit and value codes (manilhas are remapped above the values)
+CARD_SUITS = {
+    "diamonds": 1,
+    "spades": 2,
+    "hearts": 3,
+    "clubs": 4,
+}
+CARD_VALUES = {
+    "4": 1,
+    "5": 2,
+    "6": 3,
+    "7": 4,
+    "Q": 5,
+    "J": 6,
+    "K": 7,
+    "A": 8,
+    "2": 9,
+    "3": 10,
+}
 
 
 @dataclass
 class Card:
     """Card with type and value (num)."""
 
+    __slots__ = ("suit", "value")
+
     suit: int
     value: int
 
 
+# vira and the three cards of the constrained seat, before the manilha remap
+DealOption = Tuple[Card, Tuple[Card, ...]]
+
+
 class Deck:
     """Deck of cards."""
 
-    def __init__(self) -> None:
+    def __init__(self, rng: Optional[Random] = None) -> None:
+
+        # each deck owns its random stream, so parallel shards are independent
+        self.rng: Random = rng if rng is not None else Random()
 
         self.card_type: Card = Card
 
@@ -31,13 +61,98 @@ class Deck:
 
         self.max_value: int = max(self.cards, key=lambda card: card.value).value
 
+        # manilha version of each suit, shared by every table
+        self.manilha_cards: Dict[int, Card] = {
+            suit: Card(suit, self.max_value + suit) for suit in self.card_suits
+        }
+
+        # (position, bound, bits) of each swap made by shuffle_cards
+        self.shuffle_plan: List[Tuple[int, int, int]] = [
+            (idx, idx + 1, (idx + 1).bit_length())
+            for idx in reversed(range(1, len(self.cards)))
+        ]
+
     def collect_cards(self) -> None:
         """Reset the deck."""
-        self.cards = self.bkp_cards.copy()
+        self.cards[:] = self.bkp_cards
 
     def shuffle_cards(self) -> None:
-        """Shuffle the deck."""
-        shuffle(self.cards)
+        """Shuffle the deck.
+
+        Makes the same draws as Random.shuffle, with the bit lengths precomputed.
+        """
+        cards = self.cards
+        getrandbits = self.rng.getrandbits
+        for idx, bound, bits in self.shuffle_plan:
+            picked = getrandbits(bits)
+            while picked >= bound:
+                picked = getrandbits(bits)
+            cards[idx], cards[picked] = cards[picked], cards[idx]
+
+    def hand_options(
+        self,
+        cards: Optional[Sequence[Card]] = None,
+        values: Optional[Sequence[int]] = None,
+    ) -> List[DealOption]:
+        """List every vira and hand that deal a seat the wanted hand.
+
+        All pairs are equally likely in a fair deal, so picking one of them
+        uniformly gives the hand with its conditional distribution.
+
+        Args:
+            cards (Optional[Sequence[Card]], optional): exact cards of the hand
+            (suit and value before the remap). Defaults to None.
+            values (Optional[Sequence[int]], optional): card values after the
+            manilha remap, used when cards is None. Defaults to None.
+
+        Returns:
+            List[DealOption]: (vira, hand cards) pairs
+        """
+        if cards is not None:
+            hand = tuple(card for card in self.bkp_cards if card in cards)
+            return [(vira, hand) for vira in self.bkp_cards if vira not in hand]
+
+        options = []
+        for vira in self.bkp_cards:
+            manilha = 1 if vira.value == self.max_value else vira.value + 1
+            for hand in self._raw_hands(values, vira, manilha):
+                options.append((vira, hand))
+        return options
+
+    def _raw_hands(
+        self, values: Sequence[int], vira: Card, manilha: int
+    ) -> List[Tuple[Card, ...]]:
+        """Cards that become the wanted values for one vira.
+
+        Args:
+            values (Sequence[int]): card values after the manilha remap
+            vira (Card): turned card
+            manilha (int): value that becomes a manilha with this vira
+
+        Returns:
+            List[Tuple[Card, ...]]: every hand with these values
+        """
+        groups = []
+        for value, count in Counter(values).items():
+            if value == manilha:
+                # every card of this value is remapped
+                return []
+            if value > self.max_value:
+                suit = value - self.max_value
+                candidates = [
+                    card
+                    for card in self.bkp_cards
+                    if card.value == manilha and card.suit == suit
+                ]
+            else:
+                candidates = [
+                    card
+                    for card in self.bkp_cards
+                    if card.value == value and card is not vira
+                ]
+            groups.append(list(combinations(candidates, count)))
+
+        return [sum(choice, ()) for choice in product(*groups)]
 
     def _get_card_infos(self) -> Tuple[List[int], List[int]]:
         """Define the cards available and their values.
@@ -45,26 +160,56 @@ class Deck:
         Returns:
             Tuple[List[int], List[int]]: list of card values and card types values
         """
-        card_suits = {
-            "diamonds": 1,
-            "spades": 2,
-            "hearts": 3,
-            "clubs": 4,
-        }
-        card_values = {
-            "4": 1,
-            "5": 2,
-            "6": 3,
-            "7": 4,
-            "Q": 5,
-            "J": 6,
-            "K": 7,
-            "A": 8,
-            "2": 9,
-            "3": 10,
-        }
-
-        return (list(card_suits.values()), list(card_values.values()))
+        return (list(CARD_SUITS.values()), list(CARD_VALUES.values()))
 
     def __str__(self) -> str:
         return f"{self.bkp_cards}"
+
+
+class ConstrainedDeck(Deck):
+    """Deck that always deals a chosen hand to one seat.
+
+    The vira and the hand are drawn among Deck.hand_options and the other
+    cards are shuffled, so the rest of the deal follows the conditional
+    distribution. The constrained seat moves by one every table, like the
+    players, so every seat position is sampled evenly.
+
+    Raises ValueError unless the hand is three different cards of the deck, or
+    three values that some deal can give.
+    """
+
+    def __init__(
+        self,
+        cards: Optional[Sequence[Card]] = None,
+        values: Optional[Sequence[int]] = None,
+        rng: Optional[Random] = None,
+        seats: int = 4,
+    ) -> None:
+        super().__init__(rng)
+        hand = cards if cards is not None else values
+        if hand is None or len(hand) != 3:
+            raise ValueError(f"the constrained hand needs 3 cards, got {hand}")
+        if cards is not None and sum(card in cards for card in self.bkp_cards) != 3:
+            raise ValueError(f"{cards} are not 3 different cards of the deck")
+
+        self.options = self.hand_options(cards, values)
+        if not self.options:
+            raise ValueError(f"no deal gives the hand {hand}")
+
+        self.seats = seats
+        # deal position of the constrained hand in the last deal
+        self.seat: int = -1
+
+    def shuffle_cards(self) -> None:
+        """Deal the chosen hand, the vira and shuffled cards for the others."""
+        vira, hand = self.options[self.rng.randrange(len(self.options))]
+        rest = [
+            card for card in self.bkp_cards if card is not vira and card not in hand
+        ]
+        self.rng.shuffle(rest)
+
+        self.seat = (self.seat + 1) % self.seats
+        split = 3 * self.seat
+        dealt = [vira] + rest[:split] + list(hand) + rest[split:]
+        # cards are popped from the end
+        self.cards = dealt[::-1]
@@ -0,0 +1,95 @@
+"""Bounded cache of table outcomes keyed by a canonical deal."""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from modules.classes.deck import Card
+
+# outcome codes: index of the winning seat team (seats 0/2 or seats 1/3) or DRAW
+DRAW = -1
+
+
+class OutcomeCache:
+    """LRU cache in front of Table.get_winner.
+
+    Only valid for players whose choices depend on nothing but the hand values,
+    like PlayerImplementation1.
+
+    Library only (Game(outcome_cache=...)), main and the command line do not
+    offer it: shuffled deals almost never repeat, so the lookups cost more
+    than the hits save.
+    """
+
+    def __init__(self, maxsize: int = 1 << 20) -> None:
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[int, int]" = OrderedDict()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    @staticmethod
+    def canonical_key(hands: List[List[Card]]) -> int:
+        """Map a deal to a compact key.
+
+        Suits are dropped and the values are replaced by their rank among the
+        dealt values, since the strategy only compares values to each other.
+
+        Args:
+            hands (List[List[Card]]): sorted hands in seat order
+
+        Returns:
+            int: 4 bits per card, seat by seat
+        """
+        values = [card.value for hand in hands for card in hand]
+        ranks = {value: rank for rank, value in enumerate(sorted(set(values)))}
+
+        key = 0
+        for value in values:
+            key = (key << 4) | ranks[value]
+        return key
+
+    def get(self, key: int) -> Optional[int]:
+        """Return the cached outcome, if any.
+
+        Args:
+            key (int): canonical deal key
+
+        Returns:
+            Optional[int]: outcome code (None on a miss)
+        """
+        outcome = self.entries.get(key)
+        if outcome is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return outcome
+
+    def put(self, key: int, outcome: int) -> None:
+        """Store an outcome, evicting the least recently used entry if full.
+
+        Args:
+            key (int): canonical deal key
+            outcome (int): outcome code
+        """
+        self.entries[key] = outcome
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Counters used to size the cache.
+
+        Returns:
+            Dict[str, int]: size, hits, misses and evictions
+        """
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,80 @@
+"""Hands packed in a small integer, queried with bit operations and lookups.
+
+A sorted hand of up to three card values (after the manilha remap, 1 to 14)
+takes 4 bits per card, the lowest card in the lowest bits:
+
+    pack([2, 7, 12]) == 12 << 8 | 7 << 4 | 2
+
+Values are never 0, so the empty slots are the high zero nibbles. Removing a
+card shifts the cards above it down, which keeps the hand sorted: slot 0 is
+always the lowest card and slot HAND_SIZE[code] - 1 the highest. The slots
+are the indexes of the cards in the sorted Player.hand list.
+"""
+
+from typing import Sequence
+
+CARD_BITS = 4
+CARD_MASK = (1 << CARD_BITS) - 1
+# codes of every hand with up to three cards
+HAND_LIMIT = 1 << (3 * CARD_BITS)
+
+
+def pack(values: Sequence[int]) -> int:
+    """Pack sorted card values.
+
+    Args:
+        values (Sequence[int]): up to three values, lowest first
+
+    Returns:
+        int: hand code
+    """
+    code = 0
+    for slot, value in enumerate(values):
+        code |= value << (CARD_BITS * slot)
+    return code
+
+
+def value_at(code: int, slot: int) -> int:
+    """Value of the card in a slot.
+
+    Args:
+        code (int): hand code
+        slot (int): 0 for the lowest card
+
+    Returns:
+        int: card value (0 if the slot is empty)
+    """
+    return (code >> (CARD_BITS * slot)) & CARD_MASK
+
+
+def remove(code: int, slot: int) -> int:
+    """Take a card out of the hand.
+
+    Args:
+        code (int): hand code
+        slot (int): slot of the card
+
+    Returns:
+        int: code of the remaining cards, still sorted
+    """
+    shift = CARD_BITS * slot
+    return (code & ((1 << shift) - 1)) | ((code >> (shift + CARD_BITS)) << shift)
+
+
+def _hand_size(code: int) -> int:
+    """Number of cards of a hand code.
+
+    Args:
+        code (int): hand code
+
+    Returns:
+        int: 0 to 3
+    """
+    return (code.bit_length() + CARD_BITS - 1) // CARD_BITS
+
+
+# code -> number of cards and value of the highest card
+HAND_SIZE = bytes(_hand_size(code) for code in range(HAND_LIMIT))
+HIGHEST = bytes(
+    value_at(code, HAND_SIZE[code] - 1) if code else 0 for code in range(HAND_LIMIT)
+)
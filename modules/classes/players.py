@@ -16,19 +16,41 @@ class Strategy:
         rival_team_points: int,
         player: "PlayerImplementation1",
         round_plays: List[Play],
+        max_players: Optional[List[Player]] = None,
     ) -> None:
+        self.player = player
+        self.update(
+            turn, highest_round_card, rival_team_points, round_plays, max_players
+        )
+
+    def update(
+        self,
+        turn: int,
+        highest_round_card: Optional[Play],
+        rival_team_points: int,
+        round_plays: List[Play],
+        max_players: Optional[List[Player]] = None,
+    ) -> "Strategy":
+        """Reuse the strategy for a new move.
+
+        Args:
+            turn (int): 1 to 4, position of the player in the round
+            highest_round_card (Optional[Play]): first play with the highest value
+            rival_team_points (int): enemy team table points
+            round_plays (List[Play]): player moves that have been made already
+            max_players (Optional[List[Player]], optional): players who played the
+            highest value, as tracked by Round. Defaults to None (computed from
+            round_plays).
+
+        Returns:
+            Strategy: self
+        """
         self.turn = turn
         self.highest_round_card = highest_round_card
         self.rival_team_points = rival_team_points
-        self.player = player
         self.round_plays = round_plays
-
-        self.strategy_turn = {
-            1: self.first_turn,
-            2: self.second_third_turn,
-            3: self.second_third_turn,
-            4: self.fourth_turn,
-        }
+        self.max_players = max_players
+        return self
 
     def choose_best_card(self) -> Card:
         """Uses turn strategy to choose best card.
@@ -36,10 +58,16 @@ class Strategy:
         Returns:
             Card: chosen card
         """
-        if len(self.player.hand) == 1:
-            return self.player.get_lowest_hand_card()
+        hand = self.player.hand
+        if len(hand) == 1:
+            return hand[0]
 
-        return self.strategy_turn[self.turn]()
+        turn = self.turn
+        if turn == 1:
+            return self.first_turn()
+        if turn == 4:
+            return self.fourth_turn()
+        return self.second_third_turn()
 
     def first_turn(self) -> Card:
         """Strategy for the first turn.
@@ -49,10 +77,10 @@ class Strategy:
         """
         if self.rival_team_points > 0:
             # print("starting with highest card")
-            return self.player.get_highest_hand_card()
+            return self.player.hand[-1]
         else:
             # print("starting with lowest card")
-            return self.player.get_lowest_hand_card()
+            return self.player.hand[0]
 
     def second_third_turn(self) -> Card:
         """Strategy for the second and third turn.
@@ -60,8 +88,9 @@ class Strategy:
         Returns:
             Card: chosen card
         """
-        highest_hand_card = self.player.get_highest_hand_card()
-        lowest_hand_card = self.player.get_lowest_hand_card()
+        hand = self.player.hand
+        highest_hand_card = hand[-1]
+        lowest_hand_card = hand[0]
 
         if self.rival_team_points == 1 and self.player.team.table_points == 1:
             return highest_hand_card
@@ -123,11 +152,13 @@ class Strategy:
         Returns:
             bool: True if draw, False otherwise.
         """
-        highest_cards_among_plays = [
-            j.player
-            for j in self.round_plays
-            if j.card_value == self.highest_round_card.card_value
-        ]
+        highest_cards_among_plays = self.max_players
+        if highest_cards_among_plays is None:
+            highest_cards_among_plays = [
+                j.player
+                for j in self.round_plays
+                if j.card_value == self.highest_round_card.card_value
+            ]
         if (
             len(highest_cards_among_plays) > 1
             and self.player.partner in highest_cards_among_plays
@@ -146,6 +177,12 @@ class PlayerImplementation1(Player):
 
     # TODO: transfer generic methods to abstract class
 
+    def __init__(self, nome: str) -> None:
+        super().__init__(nome)
+
+        # reused for every move
+        self.strategy = Strategy(1, None, 0, self, [])
+
     def get_highest_hand_card(self) -> Card:
         """Returns highest available card.
 
@@ -168,7 +205,14 @@ class PlayerImplementation1(Player):
         Args:
             card (Card): card to be removed
         """
-        self.hand.remove(card)
+        # compares by identity, the card always comes from the hand
+        hand = self.hand
+        if hand[0] is card:
+            del hand[0]
+        elif hand[-1] is card:
+            hand.pop()
+        else:
+            del hand[1]
 
     def choose_lowest_possible(self, value_to_be_reached: int) -> Card:
         """Finds the next higher/equal card value from player hand.
@@ -179,16 +223,13 @@ class PlayerImplementation1(Player):
         Returns:
             Carta: best card possible.
         """
-        higher_or_equal_cards: List[bool] = [
-            c.value >= value_to_be_reached for c in self.hand
-        ]
+        for card in self.hand:
+            if card.value >= value_to_be_reached:
+                # get card high enough to win
+                return card
 
-        if any(higher_or_equal_cards):
-            # get card high enough to win
-            return self.hand[higher_or_equal_cards.index(True)]
-        else:
-            # discarding
-            return self.get_lowest_hand_card()
+        # discarding
+        return self.get_lowest_hand_card()
 
     def choose_play(
         self, round_plays: List[Play], table: Table, enemy_team: Team
@@ -203,22 +244,16 @@ class PlayerImplementation1(Player):
         Returns:
             Play: player move
         """
-        turn: int = len(round_plays) + 1
-
-        highest_round_card = (
-            max(round_plays, key=lambda x: x.card_value)
-            if len(round_plays) > 0
-            else None
-        )
+        # running highest play and draw status kept by the current round
+        current_round = table.round
 
-        card_played = Strategy(
-            turn,
-            highest_round_card,
-            enemy_team.table_points,
-            self,
-            round_plays,
-        ).choose_best_card()
+        strategy = self.strategy
+        strategy.turn = len(round_plays) + 1
+        strategy.highest_round_card = current_round.highest_play
+        strategy.rival_team_points = enemy_team.table_points
+        strategy.round_plays = round_plays
+        strategy.max_players = current_round.max_players
+        card_played = strategy.choose_best_card()
 
         self.remove_card_from_hand(card_played)
-        play = Play(self, card_played.value)
-        return play
+        return self.make_play(card_played.value)
@@ -0,0 +1,121 @@
+"""Opt-in profile of the object engine: phase timers, counters and outcomes."""
+
+import csv
+import json
+from typing import Dict, List, Union
+
+# highest number of manilhas in the hands of one table (one per suit)
+MAX_MANILHAS = 4
+
+ProfileValue = Union[int, float, Dict[str, float], Dict[str, int], List[int]]
+
+
+class Profiler:
+    """Collects timings and outcome counts of sampled tables.
+
+    Games only look at the profiler once per table, so a game without one runs
+    the normal code path. Sampling keeps the overhead low on large runs.
+    """
+
+    def __init__(self, sample_every: int = 1) -> None:
+        self.sample_every = sample_every
+
+        self.tables_seen: int = 0
+        self.tables_sampled: int = 0
+
+        # phase -> total seconds and number of timed calls
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+        # outcome -> number of sampled tables
+        self.outcomes: Dict[str, int] = {
+            "third_round": 0,
+            "draw_draw_draw": 0,
+        }
+        # manilhas dealt to the players -> number of sampled tables
+        self.manilhas: List[int] = [0] * (MAX_MANILHAS + 1)
+
+    def sample(self) -> bool:
+        """Count a table and tell if it should be profiled.
+
+        Returns:
+            bool: True for one table in every sample_every tables
+        """
+        self.tables_seen += 1
+        if (self.tables_seen - 1) % self.sample_every:
+            return False
+
+        self.tables_sampled += 1
+        return True
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Record one timed call of a phase.
+
+        Args:
+            phase (str): phase name
+            seconds (float): wall time of the call
+        """
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    def count_table(self, manilhas: int, rounds: int, draw: bool) -> None:
+        """Record the outcome of a sampled table.
+
+        Args:
+            manilhas (int): manilhas in the players hands
+            rounds (int): rounds played
+            draw (bool): True if nobody won the table
+        """
+        self.manilhas[manilhas] += 1
+        if rounds == 3:
+            self.outcomes["third_round"] += 1
+            if draw:
+                self.outcomes["draw_draw_draw"] += 1
+
+    def to_dict(self) -> Dict[str, ProfileValue]:
+        """Summary of the profile.
+
+        Returns:
+            Dict[str, ProfileValue]: counts, phase timings and outcome
+            frequencies over the sampled tables
+        """
+        sampled = max(self.tables_sampled, 1)
+        return {
+            "sample_every": self.sample_every,
+            "tables_seen": self.tables_seen,
+            "tables_sampled": self.tables_sampled,
+            "seconds": dict(self.seconds),
+            "calls": dict(self.calls),
+            "mean_us": {
+                phase: self.seconds[phase] / self.calls[phase] * 1e6
+                for phase in self.seconds
+            },
+            "outcomes": dict(self.outcomes),
+            "outcome_rates": {
+                outcome: count / sampled for outcome, count in self.outcomes.items()
+            },
+            "manilhas": list(self.manilhas),
+        }
+
+    def save(self, path: str) -> None:
+        """Write the profile as CSV (for a .csv path) or JSON.
+
+        Args:
+            path (str): output path
+        """
+        if not path.endswith(".csv"):
+            with open(path, "w") as file:
+                json.dump(self.to_dict(), file, indent=2)
+            return
+
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(("kind", "name", "count", "seconds"))
+            for phase, seconds in self.seconds.items():
+                writer.writerow(("phase", phase, self.calls[phase], seconds))
+            for outcome, count in self.outcomes.items():
+                writer.writerow(("outcome", outcome, count, ""))
+            for manilhas, count in enumerate(self.manilhas):
+                writer.writerow(("manilhas", manilhas, count, ""))
+            writer.writerow(("tables", "sampled", self.tables_sampled, ""))
+            writer.writerow(("tables", "seen", self.tables_seen, ""))
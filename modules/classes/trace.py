@@ -0,0 +1,186 @@
+"""Opt-in trace of every play, written as fixed-width round records.
+
+Each table gives three records (rows 3 * table to 3 * table + 2, the rounds
+that were not played hold -1 players and 0 cards):
+    vira, manilha: card values of the table
+    player1 to player4: code of each player, in play order
+    card1 to card4: value of each play
+    points1, points2: table points scored in the round by team1 and team2
+    (both score in a draw, see Round.get_winner)
+
+Players and card values are small integer codes, their names are saved in
+a JSON dictionary next to the trace. Tables are kept as raw bytes while
+playing, and NumPy turns them into columns once per flush.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from modules.classes.deck import CARD_SUITS, CARD_VALUES
+from modules.results_file import ResultsWriter
+
+if TYPE_CHECKING:
+    from modules.classes.base_classes import Game, Player, Table
+
+TRACE_COLUMNS = (
+    "vira",
+    "manilha",
+    "player1",
+    "player2",
+    "player3",
+    "player4",
+    "card1",
+    "card2",
+    "card3",
+    "card4",
+    "points1",
+    "points2",
+)
+ROUNDS = 3
+PLAYS = 4 * ROUNDS
+
+# raw bytes of a table: vira, manilha, then a (player, card) pair per play
+TABLE_BYTES = 2 + 2 * PLAYS
+# (player -1, card 0) pairs of the rounds that were not played, by plays made
+# (a first round tied by three players can end the table)
+_PADDING = {plays: b"\xff\x00" * (PLAYS - plays) for plays in (4, 8)}
+
+
+class TraceRecorder:
+    """Collects the plays of every table and appends them to a trace file.
+
+    Games only call record once per table, after the rounds, so a game
+    without a recorder runs the normal code path.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        seed: Optional[int] = None,
+        engine: str = "",
+        flush_tables: int = 1 << 14,
+    ) -> None:
+        self.path = path
+        self.flush_tables = flush_tables
+        self.writer = ResultsWriter(
+            path, seed=seed, engine=engine, columns=TRACE_COLUMNS
+        )
+
+        self.buffer = bytearray()
+        self.buffered: int = 0
+        self.tables: int = 0
+
+        # set by bind
+        self.codes: Dict[Player, int] = {}
+        self.names: List[str] = []
+        self.player_team: List[int] = []
+        self.teams: List[str] = []
+
+    def bind(self, game: Game) -> None:
+        """Code the players of a game by their seat at the start.
+
+        Args:
+            game (Game): game to be traced
+        """
+        self.codes = {player: code for code, player in enumerate(game.players)}
+        self.names = [player.name for player in game.players]
+        self.player_team = [
+            0 if player.team is game.team1 else 1 for player in game.players
+        ]
+        self.teams = [game.team1.name, game.team2.name]
+
+    def record(self, table: Table) -> None:
+        """Append the plays of a finished table.
+
+        Args:
+            table (Table): table after its rounds were played
+        """
+        buffer = self.buffer
+        buffer.append(table.vira)
+        buffer.append(table.manilha)
+        codes = self.codes
+        plays = table.table_plays
+        for play in plays:
+            buffer.append(codes[play.player])
+            buffer.append(play.card_value)
+        if len(plays) < PLAYS:
+            buffer += _PADDING[len(plays)]
+
+        self.buffered += 1
+        if self.buffered == self.flush_tables:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered tables as round records."""
+        if not self.buffered:
+            return
+
+        self.writer.write(self.round_records())
+        self.tables += self.buffered
+        self.buffer.clear()
+        self.buffered = 0
+
+    def round_records(self) -> Dict[str, object]:
+        """Turn the buffered tables into round record columns.
+
+        Returns:
+            Dict[str, object]: int8 NumPy column of each of TRACE_COLUMNS
+        """
+        import numpy as np
+
+        raw = np.frombuffer(self.buffer, dtype=np.int8).reshape(-1, TABLE_BYTES)
+        players = raw[:, 2::2].reshape(-1, ROUNDS, 4)
+        cards = raw[:, 3::2].reshape(-1, ROUNDS, 4)
+
+        # team of each play, -1 (the last item) for missing plays
+        teams = np.array(self.player_team + [-1], dtype=np.int8)[players]
+        highest = cards == cards.max(axis=2, keepdims=True)
+        # the first highest play scores, and every tie of the other team
+        first_team = np.take_along_axis(
+            teams, highest.argmax(axis=2)[:, :, None], axis=2
+        )[:, :, 0]
+        ties = (highest & (teams == 1 - first_team[:, :, None])).sum(axis=2)
+        played = players[:, :, 0] >= 0
+        points1 = np.where(first_team == 0, 1, ties) * played
+        points2 = np.where(first_team == 1, 1, ties) * played
+
+        columns = {
+            "vira": np.repeat(raw[:, 0], ROUNDS),
+            "manilha": np.repeat(raw[:, 1], ROUNDS),
+        }
+        for play in range(4):
+            columns[f"player{play + 1}"] = players[:, :, play].ravel()
+            columns[f"card{play + 1}"] = cards[:, :, play].ravel()
+        columns["points1"] = points1.astype(np.int8).ravel()
+        columns["points2"] = points2.astype(np.int8).ravel()
+        return columns
+
+    def dictionary(self) -> Dict[str, object]:
+        """Names of the codes used in the trace.
+
+        Returns:
+            Dict[str, object]: players, their teams and the card value names
+        """
+        max_value = max(CARD_VALUES.values())
+        card_values = {value: name for name, value in CARD_VALUES.items()}
+        for name, suit in CARD_SUITS.items():
+            card_values[max_value + suit] = f"manilha of {name}"
+
+        return {
+            "columns": list(TRACE_COLUMNS),
+            "rounds_per_table": ROUNDS,
+            "tables": self.tables,
+            "players": self.names,
+            "player_team": self.player_team,
+            "teams": self.teams,
+            "card_values": card_values,
+        }
+
+    def close(self) -> None:
+        """Write the last tables, close the trace and save its dictionary."""
+        self.flush()
+        self.writer.close()
+        with open(f"{self.path}.json", "w") as file:
+            json.dump(self.dictionary(), file, indent=2)
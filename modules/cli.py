@@ -0,0 +1,114 @@
+"""Non-interactive command line for scripted runs.
+
+    python -m modules.cli 400000 --seed 7 --formats results csv
+
+Only the object engine and the results and CSV writers are loaded at start,
+NumPy and pandas are imported when a selected feature needs them.
+"""
+
+import argparse
+from time import perf_counter
+from typing import List, Optional
+
+from modules.generate_simulations import CACHE_MAX_BYTES, ENGINES, OUTPUT_PATHS
+from modules.generate_simulations import main as simulate
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser of the command line.
+
+    Returns:
+        argparse.ArgumentParser: parser, also used to report invalid runs
+    """
+    parser = argparse.ArgumentParser(description="Simulate hands of Truco.")
+    parser.add_argument("hands", type=int, help="number of hands (rows)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--engine", choices=list(ENGINES), default="object")
+    parser.add_argument(
+        "--formats", nargs="*", choices=list(OUTPUT_PATHS), default=["results"]
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="write the rows in a single process"
+    )
+    parser.add_argument(
+        "--checkpoint", help="checkpoint file that makes a streaming run resumable"
+    )
+    parser.add_argument("--profile", help="save a JSON (or .csv) profile")
+    parser.add_argument("--profile-every", type=int, default=1)
+    parser.add_argument(
+        "--aggregate", action="store_true", help="only save the results per hand"
+    )
+    parser.add_argument(
+        "--deal-replays",
+        type=int,
+        choices=(1, 4, 8),
+        default=1,
+        help="tables per shuffled deal: 4 rotates the seats, 8 also swaps teams",
+    )
+    parser.add_argument(
+        "--trace", action="store_true", help="also save every play to data.trace"
+    )
+    parser.add_argument(
+        "--progress",
+        metavar="PATH",
+        help="append progress records to a JSON lines file (- for stderr)",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=10.0,
+        help="seconds between progress records",
+    )
+    parser.add_argument("--cache", help="directory of the run cache")
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=CACHE_MAX_BYTES >> 20,
+        help="size of the run cache",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run a simulation from command line arguments.
+
+    Args:
+        argv (Optional[List[str]], optional): arguments. Defaults to sys.argv.
+
+    Returns:
+        int: number of hands generated
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    start = perf_counter()
+    try:
+        hands = simulate(
+            args.hands,
+            args.workers,
+            args.seed,
+            args.engine,
+            args.stream,
+            args.checkpoint,
+            args.profile,
+            args.profile_every,
+            args.aggregate,
+            args.formats,
+            args.deal_replays,
+            args.trace,
+            args.progress,
+            args.progress_interval,
+            args.cache,
+            args.cache_max_mb << 20,
+        )
+    except ValueError as error:
+        # options that can not be combined, found by main
+        parser.error(str(error))
+    elapsed = perf_counter() - start
+    print(f"Elapsed time (seconds): {elapsed:.2f}")
+    return hands
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Precomputed win rates per hand and seat, stored in a memory-mapped file.
+
+Layout (little endian):
+    header: magic, version, value_limit, seats, results, padding, rows
+    counts: int64[seats][value_limit ** 3][results], in result code order
+    (loss, draw, win), indexed by (highest * value_limit + middle) *
+    value_limit + lowest
+"""
+
+import mmap
+import os
+import struct
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from modules.aggregates import HANDS, RESULTS, VALUE_LIMIT, hand_indexes
+
+MAGIC = b"TREQ"
+VERSION = 1
+SEATS = 4
+HEADER = struct.Struct("<4sHHHH4xq")
+COUNTS = struct.Struct(f"<{RESULTS}q")
+CACHE_SIZE = 1 << 16
+
+Query = Dict[str, Union[List[int], int, float, None]]
+
+
+def hand_bucket(hand: Sequence[int]) -> int:
+    """Bucket of a hand, in any card order.
+
+    Args:
+        hand (Sequence[int]): three card values after the manilha remap
+
+    Returns:
+        int: bucket index
+    """
+    lowest, middle, highest = sorted(hand)
+    if not 0 < lowest <= highest < VALUE_LIMIT:
+        raise ValueError(f"invalid hand {list(hand)}")
+    return (highest * VALUE_LIMIT + middle) * VALUE_LIMIT + lowest
+
+
+class EquityIndex:
+    """Read-only view of an equity index file.
+
+    Lookups unpack three counters straight from the mapped file and are
+    cached. refresh() remaps the file after it was rebuilt.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.cache: Dict[Tuple[int, Optional[int]], Tuple[int, int, int]] = {}
+        self.file: Optional[BinaryIO] = None
+        self.map: Optional[mmap.mmap] = None
+        self.stat: Optional[os.stat_result] = None
+        self.rows: int = 0
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Map the file again if it was replaced since the last call.
+
+        Returns:
+            bool: True if the index was (re)loaded
+        """
+        stat = os.stat(self.path)
+        if self.stat is not None and (stat.st_ino, stat.st_mtime_ns) == (
+            self.stat.st_ino,
+            self.stat.st_mtime_ns,
+        ):
+            return False
+
+        self.close()
+        self.file = open(self.path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.stat = stat
+        self.rows = read_header(self.map)
+        self.cache.clear()
+        return True
+
+    def counts(
+        self, hand: Sequence[int], seat: Optional[int] = None
+    ) -> Tuple[int, int, int]:
+        """Losses, draws and wins of a hand.
+
+        Args:
+            hand (Sequence[int]): three card values after the manilha remap
+            seat (Optional[int], optional): deal position (0 plays first in the
+            first round). Defaults to None (every seat).
+
+        Returns:
+            Tuple[int, int, int]: losses, draws and wins
+        """
+        key = (hand_bucket(hand), seat)
+        counts = self.cache.get(key)
+        if counts is not None:
+            return counts
+
+        if seat is not None and not 0 <= seat < SEATS:
+            raise ValueError(f"invalid seat {seat}")
+        seats = range(SEATS) if seat is None else (seat,)
+        totals = [0] * RESULTS
+        for idx in seats:
+            offset = HEADER.size + (idx * HANDS + key[0]) * COUNTS.size
+            for result, count in enumerate(COUNTS.unpack_from(self.map, offset)):
+                totals[result] += count
+        counts = (totals[0], totals[1], totals[2])
+
+        if len(self.cache) >= CACHE_SIZE:
+            self.cache.clear()
+        self.cache[key] = counts
+        return counts
+
+    def equity(self, hand: Sequence[int], seat: Optional[int] = None) -> float:
+        """Win probability of a hand (draws count as half a win).
+
+        Args:
+            hand (Sequence[int]): three card values after the manilha remap
+            seat (Optional[int], optional): deal position. Defaults to None
+            (every seat).
+
+        Returns:
+            float: mean result, NaN if the hand was never dealt
+        """
+        losses, draws, wins = self.counts(hand, seat)
+        games = losses + draws + wins
+        return (wins + draws / 2) / games if games else float("nan")
+
+    def query(self, queries: Iterable[Query]) -> List[Query]:
+        """Answer a batch of {"hand": [a, b, c], "seat": k} queries.
+
+        Args:
+            queries (Iterable[Query]): hands and optional seats
+
+        Returns:
+            List[Query]: the queries with games and equity added
+        """
+        answers = []
+        for item in queries:
+            hand, seat = item["hand"], item.get("seat")
+            losses, draws, wins = self.counts(hand, seat)
+            games = losses + draws + wins
+            answers.append(
+                {
+                    "hand": hand,
+                    "seat": seat,
+                    "games": games,
+                    "equity": (wins + draws / 2) / games if games else None,
+                }
+            )
+        return answers
+
+    def close(self) -> None:
+        """Unmap the file."""
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+            self.map = None
+
+
+def read_header(buffer: Union[bytes, mmap.mmap]) -> int:
+    """Check the header of an index.
+
+    Args:
+        buffer (Union[bytes, mmap.mmap]): index contents
+
+    Returns:
+        int: number of rows counted in the index
+    """
+    magic, version, value_limit, seats, results, rows = HEADER.unpack_from(buffer, 0)
+    if (magic, version, value_limit, seats, results) != (
+        MAGIC,
+        VERSION,
+        VALUE_LIMIT,
+        SEATS,
+        RESULTS,
+    ):
+        raise ValueError("not an equity index of this version and deck")
+    if len(buffer) != HEADER.size + SEATS * HANDS * COUNTS.size:
+        raise ValueError("truncated equity index")
+    return rows
+
+
+def update_index(path: str, chunks: Iterable[Dict[str, Sequence]]) -> int:
+    """Add simulation output to an index, creating it if needed.
+
+    The new index is written next to the old one and swapped in atomically,
+    so open EquityIndex readers keep a consistent view until they refresh.
+
+    Args:
+        path (str): index path
+        chunks (Iterable[Dict[str, Sequence]]): table_stats chunks, with whole
+        tables in seat order
+
+    Returns:
+        int: number of rows counted in the index
+    """
+    counts = np.zeros(SEATS * HANDS * RESULTS, dtype="<i8")
+    rows = 0
+    if os.path.exists(path):
+        with open(path, "rb") as file:
+            data = file.read()
+        rows = read_header(data)
+        counts += np.frombuffer(data, dtype="<i8", offset=HEADER.size)
+
+    for chunk in chunks:
+        hand, result = hand_indexes(chunk)
+        seat = np.arange(len(hand)) % SEATS
+        counts += np.bincount(
+            (seat * HANDS + hand) * RESULTS + result, minlength=counts.size
+        )
+        rows += len(hand)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, VALUE_LIMIT, SEATS, RESULTS, rows))
+        file.write(counts.tobytes())
+    os.replace(tmp_path, path)
+    return rows
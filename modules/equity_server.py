@@ -0,0 +1,117 @@
+"""Local HTTP server answering batched equity queries from an EquityIndex.
+
+    python -m modules.equity_server data.equity --port 8765
+
+GET /equity?hand=10,9,1&seat=0 answers one hand (seat is optional).
+POST /equity with a JSON list of {"hand": [a, b, c], "seat": k} answers a batch.
+The index is remapped automatically after update_index rebuilds it.
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from modules.equity_index import EquityIndex, Query
+
+
+class EquityHandler(BaseHTTPRequestHandler):
+    """Request handler bound to the server's index."""
+
+    server: "EquityServer"
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Answer a single hand query."""
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path != "/equity" or "hand" not in params:
+            self.send_error(404)
+            return
+
+        try:
+            query: Query = {
+                "hand": [int(value) for value in params["hand"][0].split(",")]
+            }
+            if "seat" in params:
+                query["seat"] = int(params["seat"][0])
+        except ValueError as error:
+            self.send_error(400, str(error))
+            return
+
+        self.answer([query], single=True)
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Answer a batch of queries."""
+        if urlparse(self.path).path != "/equity":
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            queries = json.loads(self.rfile.read(length))
+        except ValueError as error:
+            self.send_error(400, str(error))
+            return
+
+        self.answer(queries)
+
+    def answer(self, queries: List[Query], single: bool = False) -> None:
+        """Look the queries up and write the JSON response.
+
+        Args:
+            queries (List[Query]): hands and optional seats
+            single (bool, optional): answer with an object instead of a list.
+            Defaults to False.
+        """
+        index = self.server.index
+        try:
+            with self.server.lock:
+                index.refresh()
+                answers = index.query(queries)
+        except (KeyError, TypeError, ValueError) as error:
+            self.send_error(400, str(error))
+            return
+
+        body = json.dumps(answers[0] if single else answers).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Keep the console quiet, queries are too frequent to log."""
+
+
+class EquityServer(ThreadingHTTPServer):
+    """HTTP server sharing one EquityIndex between its threads."""
+
+    def __init__(
+        self, index_path: str, host: str = "127.0.0.1", port: int = 8765
+    ) -> None:
+        super().__init__((host, port), EquityHandler)
+        self.index = EquityIndex(index_path)
+        self.lock = threading.Lock()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Serve an index until interrupted.
+
+    Args:
+        argv (Optional[List[str]], optional): arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Serve hand equity queries.")
+    parser.add_argument("index", help="equity index built by update_index")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    with EquityServer(args.index, args.host, args.port) as server:
+        print(f"Serving '{args.index}' on http://{args.host}:{args.port}/equity")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,1270 @@
-"""Uses the players and game classes to simulate a given number of games."""
+"""Uses the players and game classes to simulate a given number of games.
 
-import os
+NumPy and pandas are only imported by the features that use them (batch
+engine, aggregates, pickle export...), so the object engine and the CSV and
+results writers start fast.
+"""
+
+from __future__ import annotations
 
-import pandas as pd
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import nullcontext
+from functools import partial
+from random import Random
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
 
-from modules.classes.base_classes import Game, Team
+from modules.checkpoint import (
+    Checkpoint,
+    CheckpointedWriter,
+    RngState,
+    state_from_json,
+    state_to_json,
+)
+from modules.classes.base_classes import (
+    GROUPED_COLUMNS,
+    STATS_COLUMNS,
+    Game,
+    Player,
+    Team,
+)
+from modules.classes.decision_table import DecisionTablePlayer, build_decision_table
+from modules.classes.deck import ConstrainedDeck
 from modules.classes.players import PlayerImplementation1
+from modules.classes.profiler import Profiler
+from modules.classes.trace import TraceRecorder
+from modules.pipeline import WriterFactory, WriterPipeline
+from modules.results_file import (
+    ResultsReader,
+    ResultsWriter,
+    convert_to_csv,
+    copy_rows,
+)
+from modules.writers import CsvStreamWriter, to_dataframe
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+    import numpy as np
 
+    from modules.aggregates import HandAggregate
+    from modules.progress import ProgressReporter
+    from modules.run_cache import CacheEntry, RunCache
 
-def main(hands_quantity: int) -> int:
-    """Simulate games and output data to dados.csv and dados.pickle.
+
+def build_players(
+    player_class: Type[Player] = PlayerImplementation1,
+) -> Tuple[List[Player], Team, Team]:
+    """Create the default players and teams.
 
     Args:
-        hands_quantity (int): number of rows to be generated
-        (each set of 3 rounds has 4 rows)
+        player_class (Type[Player], optional): class of the four players.
+        Defaults to PlayerImplementation1.
 
     Returns:
-        int: number of hands generated
+        Tuple[List[Player], Team, Team]: seat order, team 1 and team 2
     """
-    player1, player2 = PlayerImplementation1("Pedro"), PlayerImplementation1("Manu")
-    player3, player4 = PlayerImplementation1("Mari"), PlayerImplementation1("Ariel")
+    player1, player2 = player_class("Pedro"), player_class("Manu")
+    player3, player4 = player_class("Mari"), player_class("Ariel")
     team1 = Team("PENU", player1, player2)
     team2 = Team("ARIMA", player3, player4)
 
+    # TODO: only pass teams as parameters
+    return [player1, player3, player2, player4], team1, team2
+
+
+def simulate_shard(
+    table_quantity: int,
+    seed: Optional[int],
+    player_class: Type[Player] = PlayerImplementation1,
+    profiler: Optional[Profiler] = None,
+) -> Dict[str, List[int]]:
+    """Simulate one shard of tables with its own players and random stream.
+
+    Args:
+        table_quantity (int): number of tables in the shard
+        seed (Optional[int]): seed of the shard's deck (None for a random one)
+        player_class (Type[Player], optional): class of the four players.
+        Defaults to PlayerImplementation1.
+        profiler (Optional[Profiler], optional): profile of the run. Defaults to
+        None.
+
+    Returns:
+        Dict[str, List[int]]: the shard's table_stats columns
+    """
+    players, team1, team2 = build_players(player_class)
+    game = Game(table_quantity, players, team1, team2, seed=seed, profiler=profiler)
+    return game.table_stats
+
+
+def simulate_batch(table_quantity: int, seed: Optional[int]) -> Dict[str, np.ndarray]:
+    """Simulate one shard with the vectorized engine.
+
+    Args:
+        table_quantity (int): number of tables in the shard
+        seed (Optional[int]): seed of the shard's dealer
+
+    Returns:
+        Dict[str, np.ndarray]: the shard's table_stats columns
+    """
+    from modules.classes import batch_engine
+
+    return batch_engine.simulate_tables(table_quantity, seed)
+
+
+# engine name -> function simulating one shard (table_quantity, seed)
+ENGINES: Dict[str, Callable[[int, Optional[int]], Dict[str, Sequence]]] = {
+    "object": simulate_shard,
+    "table": partial(simulate_shard, player_class=DecisionTablePlayer),
+    "batch": simulate_batch,
+}
+
+# stored in results files, bump when the engines change their output
+ENGINE_VERSION = "1"
+
+# output files written by main, results is the binary format of results_file
+OUTPUT_PATHS = {
+    "results": os.path.join(".", "data.results"),
+    "csv": os.path.join(".", "data.csv"),
+    "pickle": os.path.join(".", "data.pickle"),
+}
+
+# default size of the run cache's results files (see RunCache)
+CACHE_MAX_BYTES = 2 << 30
+
+# play by play trace written next to the outputs (see TraceRecorder)
+TRACE_PATH = os.path.join(".", "data.trace")
+
+# player class of the engines that run the Game classes
+ENGINE_PLAYERS: Dict[str, Type[Player]] = {
+    "object": PlayerImplementation1,
+    "table": DecisionTablePlayer,
+}
+
+
+def prepare_engine(engine: str) -> None:
+    """Build the files an engine loads, before its workers start.
+
+    Args:
+        engine (str): key of ENGINES
+    """
+    if engine == "table":
+        build_decision_table()
+
+
+def engine_digest(engine: str) -> str:
+    """Hash of the source of the classes that decide an engine's rows.
+
+    Args:
+        engine (str): key of ENGINES
+
+    Returns:
+        str: sha256 hex digest
+    """
+    import hashlib
+    import inspect
+
+    from modules.classes import base_classes, deck, packed_hand, players
+
+    sources = [base_classes, deck, packed_hand, players]
+    if engine == "batch":
+        from modules.classes import batch_deck, batch_engine
+
+        sources += [batch_deck, batch_engine]
+    else:
+        sources.append(sys.modules[ENGINE_PLAYERS[engine].__module__])
+
+    digest = hashlib.sha256()
+    for module in sources:
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()
+
+
+def split_shards(
+    table_quantity: int, workers: int, seed: Optional[int] = None
+) -> Tuple[List[int], List[Optional[int]]]:
+    """Split the tables among workers and derive one seed per shard.
+
+    Args:
+        table_quantity (int): total number of tables
+        workers (int): number of shards
+        seed (Optional[int]): master seed (None for random shard seeds)
+
+    Returns:
+        Tuple[List[int], List[Optional[int]]]: shard sizes and shard seeds
+    """
+    sizes = [
+        table_quantity // workers + (idx < table_quantity % workers)
+        for idx in range(workers)
+    ]
+    if seed is None:
+        return sizes, [None] * workers
+
+    master = Random(seed)
+    return sizes, [master.getrandbits(64) for _ in range(workers)]
+
+
+def process_pool(
+    workers: int, reporter: Optional[ProgressReporter] = None
+) -> ProcessPoolExecutor:
+    """Start a process pool, sharing the progress counters with its workers.
+
+    Args:
+        workers (int): number of worker processes
+        reporter (Optional[ProgressReporter], optional): progress of the run.
+        Defaults to None.
+
+    Returns:
+        ProcessPoolExecutor: the pool
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if reporter is None:
+        return ProcessPoolExecutor(max_workers=workers)
+
+    from modules.progress import init_worker
+
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(reporter.counters,)
+    )
+
+
+def write_shard(
+    table_quantity: int,
+    seed: Optional[int],
+    engine: str,
+    path: str,
+    slot: Optional[int] = None,
+) -> str:
+    """Simulate one shard chunk by chunk into a results file.
+
+    Args:
+        table_quantity (int): number of tables in the shard
+        seed (Optional[int]): seed of the shard (None for a random one)
+        engine (str): key of ENGINES
+        path (str): results file of the shard
+        slot (Optional[int], optional): progress slot of the shard, reported
+        after every chunk. Defaults to None (no progress).
+
+    Returns:
+        str: path
+    """
+    chunks = iter_chunks(table_quantity, seed, engine)
+    if slot is not None:
+        from modules.progress import report_chunks
+
+        chunks = report_chunks(chunks, slot)
+
+    with ResultsWriter(
+        path, seed=seed, engine=engine, engine_version=ENGINE_VERSION
+    ) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return path
+
+
+def iter_shards(
+    table_quantity: int,
+    workers: int,
+    seed: Optional[int] = None,
+    engine: str = "object",
+    reporter: Optional[ProgressReporter] = None,
+    chunk_size: int = 10_000,
+) -> Iterator[Dict[str, Sequence]]:
+    """Simulate the tables in a process pool, yielding chunks in shard order.
+
+    Each worker writes its shard to a temporary results file, one chunk at a
+    time, and the shards are read back in chunks as soon as they and the ones
+    before them are done, so no process holds a whole shard in memory. The
+    files are removed at the end of the run.
+
+    Args:
+        table_quantity (int): total number of tables
+        workers (int): number of worker processes
+        seed (Optional[int]): master seed (None for random shard seeds)
+        engine (str, optional): key of ENGINES. Defaults to "object".
+        reporter (Optional[ProgressReporter], optional): progress of the run,
+        the shards then report their rows after every chunk. Defaults to None.
+        chunk_size (int, optional): tables per chunk read back. Defaults to
+        10_000.
+
+    Yields:
+        Iterator[Dict[str, Sequence]]: table_stats columns of each chunk
+    """
+    import numpy as np
+
+    sizes, seeds = split_shards(table_quantity, workers, seed)
+    slots = [None] * workers if reporter is None else list(range(workers))
+    directory = tempfile.mkdtemp(prefix="shards-")
+    paths = [os.path.join(directory, f"{idx}.results") for idx in range(workers)]
+
+    try:
+        with process_pool(workers, reporter) as executor:
+            shards = executor.map(
+                write_shard, sizes, seeds, [engine] * workers, paths, slots
+            )
+            for path in shards:
+                for chunk in ResultsReader(path).iter_chunks(chunk_size * 4):
+                    # copies, so the file is not mapped anymore once read
+                    yield {
+                        column: np.ascontiguousarray(values)
+                        for column, values in chunk.items()
+                    }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def resume_chunks(
+    progress: Checkpoint,
+    profiler: Optional[Profiler] = None,
+    trace: Optional[TraceRecorder] = None,
+) -> Tuple[Iterator[Dict[str, Sequence]], Callable[[], RngState]]:
+    """Continue a run from its checkpoint, one chunk of rows at a time.
+
+    Args:
+        progress (Checkpoint): run parameters and progress so far
+        profiler (Optional[Profiler], optional): profile of the run (object
+        engines only). Defaults to None.
+        trace (Optional[TraceRecorder], optional): records every play (object
+        engines only, not when resuming). Defaults to None.
+
+    Returns:
+        Tuple[Iterator[Dict[str, Sequence]], Callable[[], RngState]]: chunks of
+        table_stats columns and a function returning the current RNG state
+    """
+    remaining = progress.table_quantity - progress.tables_done
+    if progress.deal_replays > 1 and (
+        progress.engine not in ENGINE_PLAYERS
+        or progress.tables_done % progress.deal_replays
+    ):
+        raise ValueError("deal replays need an object engine and whole deals")
+    if trace is not None and (
+        progress.engine not in ENGINE_PLAYERS or progress.tables_done
+    ):
+        raise ValueError("traces need an object engine and can not be resumed")
+
+    if progress.engine == "batch":
+        from modules.classes import batch_engine
+        from modules.classes.batch_deck import BatchDealer
+
+        dealer = BatchDealer(progress.seed)
+        if progress.rng_state is not None:
+            dealer.rng.bit_generator.state = progress.rng_state
+        chunks = batch_engine.iter_chunks(
+            remaining, chunk_size=progress.chunk_size, dealer=dealer
+        )
+        return chunks, lambda: dealer.rng.bit_generator.state
+
+    players, team1, team2 = build_players(ENGINE_PLAYERS[progress.engine])
+    # seats rotate by one after every table
+    shift = progress.tables_done % len(players)
+    players = players[shift:] + players[:shift]
+
+    game = Game(
+        remaining,
+        players,
+        team1,
+        team2,
+        seed=progress.seed,
+        lazy=True,
+        profiler=profiler,
+        deal_replays=progress.deal_replays,
+        first_deal=progress.tables_done // progress.deal_replays,
+        trace=trace,
+    )
+    if progress.rng_state is not None:
+        game.deck.rng.setstate(state_from_json(progress.rng_state))
+
+    return game.iter_chunks(progress.chunk_size), lambda: state_to_json(
+        game.deck.rng.getstate()
+    )
+
+
+def iter_chunks(
+    table_quantity: int,
+    seed: Optional[int] = None,
+    engine: str = "object",
+    chunk_size: int = 10_000,
+    profiler: Optional[Profiler] = None,
+    deal_replays: int = 1,
+    trace: Optional[TraceRecorder] = None,
+) -> Iterator[Dict[str, Sequence]]:
+    """Simulate tables lazily, one chunk of table_stats columns at a time.
+
+    Args:
+        table_quantity (int): number of tables
+        seed (Optional[int], optional): seed for the run. Defaults to None.
+        engine (str, optional): key of ENGINES. Defaults to "object".
+        chunk_size (int, optional): tables per chunk. Defaults to 10_000.
+        profiler (Optional[Profiler], optional): profile of the run (object
+        engines only). Defaults to None.
+        deal_replays (int, optional): tables playing each deal, see
+        Game.deal_replays (object engines only). Defaults to 1.
+        trace (Optional[TraceRecorder], optional): records every play (object
+        engines only). Defaults to None.
+
+    Returns:
+        Iterator[Dict[str, Sequence]]: table_stats columns of each chunk
+    """
+    progress = Checkpoint(
+        seed, table_quantity, engine, chunk_size, deal_replays=deal_replays
+    )
+    chunks, _ = resume_chunks(progress, profiler, trace)
+    return chunks
+
+
+def open_writer(
+    path: str, progress: Checkpoint
+) -> Union[CsvStreamWriter, ResultsWriter]:
+    """Open the streaming writer of a path, continuing from a checkpoint.
+
+    Args:
+        path (str): output path (.csv for CSV, results file otherwise)
+        progress (Checkpoint): run parameters and progress so far
+
+    Returns:
+        Union[CsvStreamWriter, ResultsWriter]: writer positioned after the rows
+        already flushed
+    """
+    columns = GROUPED_COLUMNS if progress.deal_replays > 1 else STATS_COLUMNS
+    if path.endswith(".csv"):
+        return CsvStreamWriter(
+            path, progress.rows_flushed, progress.bytes_flushed, columns
+        )
+
+    return ResultsWriter(
+        path,
+        progress.rows_flushed,
+        progress.bytes_flushed,
+        progress.seed,
+        progress.engine,
+        ENGINE_VERSION,
+        columns,
+    )
+
+
+def open_checkpointed_writer(
+    path: str, progress: Checkpoint, checkpoint_path: Optional[str]
+) -> CheckpointedWriter:
+    """Open the streaming writer of a path, checkpointing every chunk.
+
+    Args:
+        path (str): output path (.csv for CSV, results file otherwise)
+        progress (Checkpoint): run parameters and progress so far
+        checkpoint_path (Optional[str]): where to keep the checkpoint (None for
+        no checkpoints)
+
+    Returns:
+        CheckpointedWriter: writer positioned after the rows already flushed
+    """
+    return CheckpointedWriter(open_writer(path, progress), progress, checkpoint_path)
+
+
+def stream_to_file(
+    table_quantity: int,
+    path: str,
+    seed: Optional[int] = None,
+    engine: str = "object",
+    chunk_size: int = 10_000,
+    checkpoint_path: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+    deal_replays: int = 1,
+    trace: Optional[TraceRecorder] = None,
+    reporter: Optional[ProgressReporter] = None,
+    formats: Optional[Sequence[str]] = None,
+) -> int:
+    """Simulate and write rows chunk by chunk, with constant memory.
+
+    With a checkpoint_path the progress is saved after every chunk, and a run
+    with the same parameters continues from the saved checkpoint. The resumed
+    output is byte-identical to an uninterrupted run.
+
+    The file and the checkpoint are written by a background process, while the
+    next chunks are simulated.
+
+    Args:
+        table_quantity (int): number of tables
+        path (str): output path (.csv for CSV, results file otherwise)
+        seed (Optional[int], optional): seed for the run. Defaults to None.
+        engine (str, optional): key of ENGINES. Defaults to "object".
+        chunk_size (int, optional): tables per chunk. Defaults to 10_000.
+        checkpoint_path (Optional[str], optional): where to keep the checkpoint.
+        Defaults to None (no checkpoints).
+        profiler (Optional[Profiler], optional): profile of the run (object
+        engines only). Defaults to None.
+        deal_replays (int, optional): tables playing each deal, see
+        Game.deal_replays (chunk_size must be a multiple). Defaults to 1.
+        trace (Optional[TraceRecorder], optional): records every play (object
+        engines only, not when resuming). Defaults to None.
+        reporter (Optional[ProgressReporter], optional): progress of the run.
+        Defaults to None.
+        formats (Optional[Sequence[str]], optional): outputs the caller converts
+        the file to, kept in the checkpoint so a resumed run asks for them
+        again. Defaults to None.
+
+    Returns:
+        int: number of rows written
+    """
+    if chunk_size % deal_replays:
+        raise ValueError("chunk_size must be a multiple of deal_replays")
+
+    progress = Checkpoint(seed, table_quantity, engine, chunk_size, path, deal_replays)
+    if formats is not None:
+        progress.formats = list(formats)
+    if checkpoint_path is not None:
+        saved = Checkpoint.load(checkpoint_path)
+        if saved is not None and saved.matches(progress):
+            progress = saved
+
+    chunks, rng_state = resume_chunks(progress, profiler, trace)
+    rows = progress.rows_flushed
+    if reporter is not None:
+        reporter.skip(rows)
+        chunks = reporter.track(chunks)
+    factory = partial(open_checkpointed_writer, path, progress, checkpoint_path)
+
+    with WriterPipeline([factory]) as pipeline:
+        for chunk in chunks:
+            rows += len(chunk["result"])
+            pipeline.write((chunk, None if checkpoint_path is None else rng_state()))
+
+    if checkpoint_path is not None:
+        os.remove(checkpoint_path)
+
+    return rows
+
+
+def aggregate_shard(
+    table_quantity: int,
+    seed: Optional[int],
+    engine: str = "object",
+    slot: int = 0,
+    reporter: Optional[ProgressReporter] = None,
+) -> HandAggregate:
+    """Count the results per hand of one shard, chunk by chunk.
+
+    Args:
+        table_quantity (int): number of tables in the shard
+        seed (Optional[int]): seed of the shard (None for a random one)
+        engine (str, optional): key of ENGINES. Defaults to "object".
+        slot (int, optional): progress slot of the shard. Defaults to 0.
+        reporter (Optional[ProgressReporter], optional): progress of the run,
+        when the shard runs in its process. Defaults to None (the counters
+        shared with a worker process, if any).
+
+    Returns:
+        HandAggregate: counts of the shard
+    """
+    from modules.aggregates import HandAggregate
+    from modules.progress import report_chunks
+
+    counters = None if reporter is None else reporter.counters
+    chunks = report_chunks(iter_chunks(table_quantity, seed, engine), slot, counters)
+    aggregate = HandAggregate()
+    for chunk in chunks:
+        aggregate.add_columns(chunk)
+    return aggregate
+
+
+def aggregate_tables(
+    table_quantity: int,
+    workers: int = 1,
+    seed: Optional[int] = None,
+    engine: str = "object",
+    reporter: Optional[ProgressReporter] = None,
+) -> HandAggregate:
+    """Simulate tables keeping only the counts per hand.
+
+    Args:
+        table_quantity (int): total number of tables
+        workers (int, optional): number of worker processes. Defaults to 1.
+        seed (Optional[int], optional): master seed. Defaults to None.
+        engine (str, optional): key of ENGINES. Defaults to "object".
+        reporter (Optional[ProgressReporter], optional): progress of the run.
+        Defaults to None.
+
+    Returns:
+        HandAggregate: merged counts of every shard
+    """
+    from modules.aggregates import HandAggregate
+
+    if workers == 1:
+        return aggregate_shard(table_quantity, seed, engine, reporter=reporter)
+
+    sizes, seeds = split_shards(table_quantity, workers, seed)
+    with process_pool(workers, reporter) as executor:
+        shards = executor.map(
+            aggregate_shard, sizes, seeds, [engine] * workers, range(workers)
+        )
+        aggregate = HandAggregate()
+        for shard in shards:
+            aggregate.merge(shard)
+
+    return aggregate
+
+
+def simulate_target_hands(
+    target_hands: Sequence[Sequence[int]],
+    tables_per_hand: int,
+    seed: Optional[int] = None,
+    engine: str = "object",
+) -> HandAggregate:
+    """Simulate only deals where one seat holds each of the target hands.
+
+    Args:
+        target_hands (Sequence[Sequence[int]]): card values of each hand, after
+        the manilha remap
+        tables_per_hand (int): tables simulated for each hand
+        seed (Optional[int], optional): master seed. Defaults to None.
+        engine (str, optional): key of ENGINE_PLAYERS. Defaults to "object".
+
+    Returns:
+        HandAggregate: results of the target hands only
+    """
+    import numpy as np
+
+    from modules.aggregates import HandAggregate
+
+    master = Random(seed)
+    aggregate = HandAggregate()
+
+    for values in target_hands:
+        players, team1, team2 = build_players(ENGINE_PLAYERS[engine])
+        deck = ConstrainedDeck(
+            values=values, rng=Random(master.getrandbits(64)), seats=len(players)
+        )
+        game = Game(tables_per_hand, players, team1, team2, deck=deck)
+
+        # rows are in deal order, and the constrained seat moves every table
+        tables = np.arange(tables_per_hand)
+        rows = tables * len(players) + tables % len(players)
+        aggregate.add_columns(
+            {
+                column: np.frombuffer(column_values, dtype=np.int8)[rows]
+                for column, column_values in game.table_stats.items()
+            }
+        )
+
+    return aggregate
+
+
+def main_target_hands(
+    target_hands: Sequence[Sequence[int]],
+    tables_per_hand: int,
+    seed: Optional[int] = None,
+    engine: str = "object",
+) -> int:
+    """Simulate the target hands and save their win rates to data_hands.csv.
+
+    Args:
+        target_hands (Sequence[Sequence[int]]): card values of each hand, after
+        the manilha remap
+        tables_per_hand (int): tables simulated for each hand
+        seed (Optional[int], optional): master seed. Defaults to None.
+        engine (str, optional): key of ENGINE_PLAYERS. Defaults to "object".
+
+    Returns:
+        int: number of hands generated
+    """
+    prepare_engine(engine)
+    aggregate = simulate_target_hands(target_hands, tables_per_hand, seed, engine)
+    aggregate.save_summary(os.path.join(".", "data_hands.csv"))
+    print(f"Number of hands generated: {aggregate.games}")
+    print("Win rates saved to 'data_hands.csv'")
+    return aggregate.games
+
+
+def build_equity_index(
+    path: str,
+    table_quantity: int,
+    seed: Optional[int] = None,
+    engine: str = "object",
+) -> int:
+    """Simulate tables and add their results to an equity index.
+
+    An existing index is updated, so runs with new seeds keep refining it.
+
+    Args:
+        path (str): index path
+        table_quantity (int): number of tables
+        seed (Optional[int], optional): seed for the run. Defaults to None.
+        engine (str, optional): key of ENGINES. Defaults to "object".
+
+    Returns:
+        int: number of rows counted in the index
+    """
+    from modules.equity_index import update_index
+
+    prepare_engine(engine)
+    return update_index(path, iter_chunks(table_quantity, seed, engine))
+
+
+def save_profile(profiler: Optional[Profiler], path: Optional[str]) -> None:
+    """Save the profile of a run, if it was profiled.
+
+    Args:
+        profiler (Optional[Profiler]): profile of the run
+        path (Optional[str]): output path (.csv for CSV, JSON otherwise)
+    """
+    if profiler is not None and path is not None:
+        profiler.save(path)
+        print(f"Profile saved to '{path}'")
+
+
+def output_writers(
+    formats: Sequence[str],
+    seed: Optional[int] = None,
+    engine: str = "object",
+    columns: Sequence[str] = STATS_COLUMNS,
+) -> List[WriterFactory]:
+    """Factories of the streaming writers of each requested format.
+
+    Args:
+        formats (Sequence[str]): keys of OUTPUT_PATHS written while simulating
+        ("results" and "csv")
+        seed (Optional[int], optional): seed of the run. Defaults to None.
+        engine (str, optional): engine of the run. Defaults to "object".
+        columns (Sequence[str], optional): table_stats columns. Defaults to
+        STATS_COLUMNS.
+
+    Returns:
+        List[WriterFactory]: one factory per format, for a WriterPipeline
+    """
+    factories: Dict[str, WriterFactory] = {
+        "results": partial(
+            ResultsWriter,
+            OUTPUT_PATHS["results"],
+            seed=seed,
+            engine=engine,
+            engine_version=ENGINE_VERSION,
+            columns=columns,
+        ),
+        # same layout as df.to_csv, written from the int8 buffers
+        "csv": partial(CsvStreamWriter, OUTPUT_PATHS["csv"], columns=columns),
+    }
+    return [factories[name] for name in formats]
+
+
+def save_outputs(
+    table_quantity: int,
+    workers: int = 1,
+    seed: Optional[int] = None,
+    engine: str = "object",
+    profiler: Optional[Profiler] = None,
+    formats: Sequence[str] = ("results",),
+    deal_replays: int = 1,
+    trace: Optional[TraceRecorder] = None,
+    reporter: Optional[ProgressReporter] = None,
+) -> int:
+    """Simulate and write every requested format while the simulation runs.
+
+    Chunks (read back from the shard files, with several workers) go through a
+    bounded queue to one background writer per format, so the run takes about
+    as long as its slowest part instead of the sum of all of them. A pickle
+    needs the whole DataFrame, so it is converted from data.results after the
+    run, which keeps the writers in constant memory.
+
+    Args:
+        table_quantity (int): number of tables
+        workers (int, optional): number of worker processes. Defaults to 1.
+        seed (Optional[int], optional): seed for the run. Defaults to None.
+        engine (str, optional): key of ENGINES. Defaults to "object".
+        profiler (Optional[Profiler], optional): profile of the run (single
+        process object engines only). Defaults to None.
+        formats (Sequence[str], optional): keys of OUTPUT_PATHS. Defaults to
+        ("results",).
+        deal_replays (int, optional): tables playing each deal, see
+        Game.deal_replays (single process only). Defaults to 1.
+        trace (Optional[TraceRecorder], optional): records every play (single
+        process object engines only). Defaults to None.
+        reporter (Optional[ProgressReporter], optional): progress of the run.
+        Defaults to None.
+
+    Returns:
+        int: number of rows written
+    """
+    if workers > 1:
+        chunks = iter_shards(table_quantity, workers, seed, engine, reporter)
+    else:
+        chunks = iter_chunks(
+            table_quantity,
+            seed,
+            engine,
+            profiler=profiler,
+            deal_replays=deal_replays,
+            trace=trace,
+        )
+        if reporter is not None:
+            chunks = reporter.track(chunks)
+
+    streamed = [name for name in formats if name != "pickle"]
+    if "pickle" in formats and "results" not in streamed:
+        streamed.append("results")
+
+    columns = GROUPED_COLUMNS if deal_replays > 1 else STATS_COLUMNS
+    factories = output_writers(streamed, seed, engine, columns)
+    rows = 0
+    with WriterPipeline(factories) as pipeline:
+        for chunk in chunks:
+            pipeline.write(chunk)
+            rows += len(chunk["result"])
+
+    if "pickle" in formats:
+        convert_outputs(OUTPUT_PATHS["results"], ["pickle"])
+        if "results" not in formats:
+            os.remove(OUTPUT_PATHS["results"])
+
+    return rows
+
+
+def convert_outputs(results_path: str, formats: Sequence[str]) -> None:
+    """Convert a results file to the other requested formats.
+
+    Args:
+        results_path (str): results file
+        formats (Sequence[str]): keys of OUTPUT_PATHS
+    """
+    if "csv" in formats:
+        convert_to_csv(results_path, OUTPUT_PATHS["csv"])
+    if "pickle" in formats:
+        table_stats = ResultsReader(results_path).table_stats()
+        to_dataframe(table_stats).to_pickle(OUTPUT_PATHS["pickle"])
+
+
+def main_stream(
+    table_quantity: int,
+    seed: Optional[int] = None,
+    engine: str = "object",
+    checkpoint_path: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+    formats: Sequence[str] = ("results",),
+    deal_replays: int = 1,
+    trace: Optional[TraceRecorder] = None,
+    reporter: Optional[ProgressReporter] = None,
+) -> int:
+    """Stream the run to data.results (or data.csv) and convert it afterwards.
+
+    Args:
+        table_quantity (int): number of tables
+        seed (Optional[int], optional): seed for the run. Defaults to None.
+        engine (str, optional): key of ENGINES. Defaults to "object".
+        checkpoint_path (Optional[str], optional): checkpoint file that makes the
+        run resumable. Defaults to None.
+        profiler (Optional[Profiler], optional): profile of the run (object
+        engines only). Defaults to None.
+        formats (Sequence[str], optional): keys of OUTPUT_PATHS. Defaults to
+        ("results",).
+        deal_replays (int, optional): tables playing each deal, see
+        Game.deal_replays. Defaults to 1.
+        trace (Optional[TraceRecorder], optional): records every play (object
+        engines only, without checkpoint). Defaults to None.
+        reporter (Optional[ProgressReporter], optional): progress of the run.
+        Defaults to None.
+
+    Returns:
+        int: number of hands generated
+    """
+    if seed is None and checkpoint_path is not None:
+        # a resumable run needs a seed that can be reused
+        seed = Random().getrandbits(63)
+        print(f"Seed: {seed}")
+
+    streamed = "results" if "results" in formats or "pickle" in formats else "csv"
+    rows = stream_to_file(
+        table_quantity,
+        OUTPUT_PATHS[streamed],
+        seed,
+        engine,
+        checkpoint_path=checkpoint_path,
+        profiler=profiler,
+        deal_replays=deal_replays,
+        trace=trace,
+        reporter=reporter,
+        formats=formats,
+    )
+    if streamed == "results":
+        convert_outputs(OUTPUT_PATHS["results"], formats)
+        if "results" not in formats:
+            os.remove(OUTPUT_PATHS["results"])
+
+    return rows
+
+
+def reusable_tables(cached: Optional[CacheEntry], progress: Checkpoint) -> int:
+    """Tables of a cached run that are also the first tables of a run.
+
+    The Game classes deal one table after the other, so a shorter run is
+    always a prefix, and a longer run continues after the last whole deal.
+    The batch engine deals a chunk at a time, so both need whole chunks.
+
+    Args:
+        cached (Optional[CacheEntry]): entry of the run
+        progress (Checkpoint): parameters of the run
+
+    Returns:
+        int: tables to copy from the cache
+    """
+    if cached is None:
+        return 0
+
+    table_quantity = progress.table_quantity
+    batch = progress.engine == "batch"
+    if cached.tables >= table_quantity:
+        if batch and cached.tables > table_quantity:
+            return 0 if table_quantity % progress.chunk_size else table_quantity
+        return table_quantity
+
+    block = progress.chunk_size if batch else progress.deal_replays
+    return 0 if cached.tables % block else cached.tables
+
+
+def simulate_cached(
+    table_quantity: int,
+    seed: int,
+    engine: str,
+    cache: RunCache,
+    deal_replays: int = 1,
+    reporter: Optional[ProgressReporter] = None,
+    chunk_size: int = 10_000,
+) -> int:
+    """Write data.results from the run cache, simulating the missing tables.
+
+    The cached rows of the same run are copied, then the tables after them
+    continue from the cached RNG state. A longer run replaces the entry.
+
+    Args:
+        table_quantity (int): number of tables
+        seed (int): seed for the run
+        engine (str): key of ENGINES
+        cache (RunCache): cache of finished runs
+        deal_replays (int, optional): tables playing each deal, see
+        Game.deal_replays (chunk_size must be a multiple). Defaults to 1.
+        reporter (Optional[ProgressReporter], optional): progress of the run.
+        Defaults to None.
+        chunk_size (int, optional): tables per chunk. Defaults to 10_000.
+
+    Raises:
+        ValueError: chunk_size is not a multiple of deal_replays
+
+    Returns:
+        int: number of hands generated
+    """
+    from modules.run_cache import CacheEntry
+
+    if chunk_size % deal_replays:
+        raise ValueError("chunk_size must be a multiple of deal_replays")
+
+    path = OUTPUT_PATHS["results"]
+    # the batch engine deals a chunk at a time, so its rows depend on the size
+    request = CacheEntry(
+        seed,
+        engine,
+        ENGINE_VERSION,
+        engine_digest(engine),
+        deal_replays,
+        chunk_size if engine == "batch" else 0,
+    )
+    progress = Checkpoint(seed, table_quantity, engine, chunk_size, path, deal_replays)
+
+    cached = cache.lookup(request)
+    progress.tables_done = reusable_tables(cached, progress)
+    if progress.tables_done:
+        progress.rows_flushed = progress.tables_done * 4
+        progress.bytes_flushed = copy_rows(
+            cache.results_path(request.key()), path, progress.rows_flushed
+        )
+        progress.rng_state = cached.rng_state
+        print(f"Hands reused from the run cache: {progress.rows_flushed}")
+    if progress.tables_done == table_quantity:
+        return progress.rows_flushed
+
+    chunks, rng_state = resume_chunks(progress)
+    if reporter is not None:
+        reporter.skip(progress.rows_flushed)
+        chunks = reporter.track(chunks)
+
+    with WriterPipeline([partial(open_writer, path, progress)]) as pipeline:
+        for chunk in chunks:
+            pipeline.write(chunk)
+
+    if cached is None or cached.tables < table_quantity:
+        request.tables = table_quantity
+        request.rng_state = rng_state()
+        cache.store(request, path)
+    return table_quantity * 4
+
+
+def main_cached(
+    table_quantity: int,
+    seed: int,
+    engine: str,
+    cache: RunCache,
+    formats: Sequence[str] = ("results",),
+    deal_replays: int = 1,
+    reporter: Optional[ProgressReporter] = None,
+    chunk_size: int = 10_000,
+) -> int:
+    """Serve the run from the run cache and convert it to the other formats.
+
+    Args:
+        table_quantity (int): number of tables
+        seed (int): seed for the run
+        engine (str): key of ENGINES
+        cache (RunCache): cache of finished runs
+        formats (Sequence[str], optional): keys of OUTPUT_PATHS. Defaults to
+        ("results",).
+        deal_replays (int, optional): tables playing each deal, see
+        Game.deal_replays. Defaults to 1.
+        reporter (Optional[ProgressReporter], optional): progress of the run.
+        Defaults to None.
+        chunk_size (int, optional): tables per chunk. Defaults to 10_000.
+
+    Returns:
+        int: number of hands generated
+    """
+    rows = simulate_cached(
+        table_quantity, seed, engine, cache, deal_replays, reporter, chunk_size
+    )
+    convert_outputs(OUTPUT_PATHS["results"], formats)
+    if "results" not in formats:
+        os.remove(OUTPUT_PATHS["results"])
+
+    return rows
+
+
+def open_progress(
+    path: Optional[str], interval: float, hands_quantity: int, workers: int
+) -> ContextManager[Optional[ProgressReporter]]:
+    """Reporter of a run's progress, used as a context manager around the run.
+
+    Args:
+        path (Optional[str]): JSON lines file, "-" for stderr (None for no
+        progress records)
+        interval (float): seconds between records
+        hands_quantity (int): rows of the whole run
+        workers (int): worker processes reporting their rows
+
+    Returns:
+        ContextManager[Optional[ProgressReporter]]: the reporter (None without
+        a path)
+    """
+    if path is None:
+        return nullcontext()
+
+    from modules.progress import ProgressReporter
+
+    return ProgressReporter(hands_quantity, path, interval, workers)
+
+
+def open_trace(
+    seed: Optional[int], engine: str, single: bool, checkpoint_path: Optional[str]
+) -> TraceRecorder:
+    """Trace recorder of a run, checking that the run can be traced.
+
+    Args:
+        seed (Optional[int]): seed of the run
+        engine (str): key of ENGINES
+        single (bool): the run is simulated in a single process
+        checkpoint_path (Optional[str]): checkpoint file of the run
+
+    Returns:
+        TraceRecorder: recorder writing to TRACE_PATH
+    """
+    if engine not in ENGINE_PLAYERS or not single:
+        raise ValueError("traces need a single process object engine")
+    if checkpoint_path is not None:
+        raise ValueError("traces can not be resumed, run without checkpoint")
+
+    return TraceRecorder(TRACE_PATH, seed, engine)
+
+
+def open_run_cache(
+    directory: Optional[str], max_bytes: int, seed: Optional[int], single: bool
+) -> Optional[RunCache]:
+    """Run cache of a run, when the run can use one.
+
+    Args:
+        directory (Optional[str]): cache directory (None for no cache)
+        max_bytes (int): size of the cached results files
+        seed (Optional[int]): seed of the run
+        single (bool): the rows are simulated in a single process, without
+        profile, trace or checkpoint
+
+    Returns:
+        Optional[RunCache]: the cache (None if not used)
+    """
+    if directory is None:
+        return None
+    if seed is None or not single:
+        print("Run cache not used: it needs a seed and a plain single process run")
+        return None
+
+    from modules.run_cache import RunCache
+
+    return RunCache(directory, max_bytes)
+
+
+def main(
+    hands_quantity: int,
+    workers: int = 1,
+    seed: Optional[int] = None,
+    engine: str = "object",
+    stream: bool = False,
+    checkpoint_path: Optional[str] = None,
+    profile_path: Optional[str] = None,
+    profile_every: int = 1,
+    aggregate: bool = False,
+    formats: Sequence[str] = ("results",),
+    deal_replays: int = 1,
+    trace_plays: bool = False,
+    progress_path: Optional[str] = None,
+    progress_interval: float = 10.0,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = CACHE_MAX_BYTES,
+) -> int:
+    """Simulate games and output data to data.results (and the other formats).
+
+    Args:
+        hands_quantity (int): number of rows to be generated
+        (each set of 3 rounds has 4 rows)
+        workers (int, optional): number of worker processes. Defaults to 1.
+        seed (Optional[int], optional): seed for the run. Defaults to None.
+        engine (str, optional): "object" for the Game classes, "table" for the
+        Game classes with DecisionTablePlayer or "batch" for the vectorized
+        engine. Defaults to
+        "object".
+        stream (bool, optional): write the rows while simulating, in a single
+        process. Defaults to False.
+        checkpoint_path (Optional[str], optional): checkpoint file that makes a
+        streaming run resumable. Defaults to None.
+        profile_path (Optional[str], optional): where to save a JSON (or .csv)
+        profile of the run, single process object engines only. Defaults to None.
+        profile_every (int, optional): profile one table in every profile_every.
+        Defaults to 1.
+        aggregate (bool, optional): only save the results per hand, to
+        data.aggregate.json and data_summary.csv. Defaults to False.
+        formats (Sequence[str], optional): outputs to write, among "results"
+        (data.results), "csv" (data.csv) and "pickle" (data.pickle). Defaults
+        to ("results",).
+        deal_replays (int, optional): tables playing each shuffled deal, 4 to
+        rotate the seats or 8 to also swap the teams' hands (single process
+        object engines only). Defaults to 1.
+        trace_plays (bool, optional): also save every play to data.trace, with
+        its dictionary in data.trace.json (single process object engines,
+        without checkpoint). Defaults to False.
+        progress_path (Optional[str], optional): JSON lines file (or "-" for
+        stderr) getting a progress record every progress_interval seconds.
+        Defaults to None.
+        progress_interval (float, optional): seconds between progress records.
+        Defaults to 10.0.
+        cache_dir (Optional[str], optional): run cache serving the rows of
+        earlier runs with the same seed, engine and code (single process runs
+        with a seed, see RunCache). Defaults to None.
+        cache_max_bytes (int, optional): size of the run cache. Defaults to
+        CACHE_MAX_BYTES.
+
+    Returns:
+        int: number of hands generated
+    """
     table_quantity = hands_quantity // 4
+    if deal_replays > 1 and (
+        engine not in ENGINE_PLAYERS or (workers > 1 and not stream) or aggregate
+    ):
+        raise ValueError("deal replays need a single process object engine")
+    prepare_engine(engine)
 
-    # TODO: only pass teams as parameters
-    game = Game(table_quantity, [player1, player3, player2, player4], team1, team2)
+    profiler = None
+    if profile_path is not None:
+        if engine not in ENGINE_PLAYERS or (workers > 1 and not stream):
+            raise ValueError("profiling needs a single process object engine")
+        profiler = Profiler(profile_every)
+
+    trace = None
+    if trace_plays:
+        trace = open_trace(
+            seed,
+            engine,
+            (workers == 1 or stream) and not aggregate,
+            checkpoint_path,
+        )
+
+    cache = open_run_cache(
+        cache_dir,
+        cache_max_bytes,
+        seed,
+        workers == 1
+        and not stream
+        and not aggregate
+        and profiler is None
+        and trace is None,
+    )
 
-    df = pd.DataFrame(game.table_stats)
-    print(f"Number of hands generated: {len(df)}")
+    # a streaming run counts its rows in this process
+    progress = open_progress(
+        progress_path,
+        progress_interval,
+        table_quantity * 4,
+        1 if stream and not aggregate else workers,
+    )
+    if aggregate:
+        with progress as reporter:
+            counts = aggregate_tables(table_quantity, workers, seed, engine, reporter)
+        counts.save(os.path.join(".", "data.aggregate.json"))
+        counts.save_summary(os.path.join(".", "data_summary.csv"))
+        print(f"Number of hands generated: {counts.games}")
+        print("Win rates saved to 'data_summary.csv'")
+        return counts.games
 
-    df.to_pickle(os.path.join(".", "data.pickle"))
-    df.to_csv(os.path.join(".", "data.csv"))
+    with progress as reporter:
+        if cache is not None:
+            rows = main_cached(
+                table_quantity, seed, engine, cache, formats, deal_replays, reporter
+            )
+        elif stream:
+            rows = main_stream(
+                table_quantity,
+                seed,
+                engine,
+                checkpoint_path,
+                profiler,
+                formats,
+                deal_replays,
+                trace,
+                reporter,
+            )
+        else:
+            rows = save_outputs(
+                table_quantity,
+                workers,
+                seed,
+                engine,
+                profiler,
+                formats,
+                deal_replays,
+                trace,
+                reporter,
+            )
 
-    print("Hands data saved to 'data.csv' and 'data.pickle'")
+    save_profile(profiler, profile_path)
+    print(f"Number of hands generated: {rows}")
+    saved = ", ".join(f"'{os.path.basename(OUTPUT_PATHS[name])}'" for name in formats)
+    print(f"Hands data saved to {saved}")
+    if trace is not None:
+        trace.close()
+        print(f"Plays saved to '{os.path.basename(TRACE_PATH)}'")
 
-    return len(df)
+    return rows
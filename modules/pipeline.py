@@ -0,0 +1,188 @@
+"""Background writers, so the simulation does not wait for the exports."""
+
+import multiprocessing
+import multiprocessing.queues
+import multiprocessing.synchronize
+import queue
+import signal
+import threading
+from traceback import format_exc
+from types import TracebackType
+from typing import Callable, Iterator, List, Optional, Type, Union
+
+# seconds between liveness checks while a queue is full or empty
+POLL_SECONDS = 1.0
+
+# creates a writer (anything with write(chunk) and close()) inside its worker
+WriterFactory = Callable[[], object]
+Worker = Union[threading.Thread, multiprocessing.Process]
+Event = Union[threading.Event, multiprocessing.synchronize.Event]
+
+
+def _iter_queue(
+    items: queue.Queue,
+    stop: Event,
+    parent: Optional[multiprocessing.process.BaseProcess],
+) -> Iterator[object]:
+    """Yield queued chunks until the end marker, an abort or the producer's exit.
+
+    Args:
+        items (queue.Queue): chunks to write, then None
+        stop (Event): set when the run is aborted
+        parent (Optional[multiprocessing.process.BaseProcess]): producer
+        process, for process workers
+
+    Yields:
+        Iterator[object]: queued chunks
+    """
+    while not stop.is_set():
+        try:
+            chunk = items.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            if parent is not None and not parent.is_alive():
+                return
+            continue
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _drain(
+    factory: WriterFactory, items: queue.Queue, errors: queue.Queue, stop: Event
+) -> None:
+    """Write every queued chunk, then close the writer.
+
+    Args:
+        factory (WriterFactory): creates the writer
+        items (queue.Queue): chunks to write, then None
+        errors (queue.Queue): where to report a failure
+        stop (Event): set when the run is aborted
+    """
+    parent = None
+    if threading.current_thread() is threading.main_thread():
+        # a process worker: Ctrl+C reaches the whole process group and the
+        # producer handles it
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        parent = multiprocessing.parent_process()
+
+    writer = None
+    try:
+        writer = factory()
+        for chunk in _iter_queue(items, stop, parent):
+            writer.write(chunk)
+    except Exception:
+        errors.put(format_exc())
+        # keep consuming, so the producer never blocks on a full queue
+        for _ in _iter_queue(items, stop, parent):
+            pass
+
+    if writer is not None:
+        try:
+            writer.close()
+        except Exception:
+            errors.put(format_exc())
+
+
+class WriterPipeline:
+    """Hands chunks to writers running in background threads or processes.
+
+    Every writer has its own bounded queue, so all outputs are written at the
+    same time and write blocks when the slowest one falls behind. Memory stays
+    under queue_size chunks per writer.
+
+    Writers are created inside their worker, from a factory such as a partial
+    of the writer class. Threads suit writers that mostly wait on the disk;
+    writers that format rows (CSV) need processes to run alongside a
+    simulation that holds the GIL.
+    """
+
+    def __init__(
+        self,
+        factories: List[WriterFactory],
+        queue_size: int = 4,
+        processes: bool = True,
+    ) -> None:
+        module = multiprocessing if processes else queue
+        self.stop: Event = multiprocessing.Event() if processes else threading.Event()
+        self.errors: queue.Queue = module.Queue()
+        self.queues: List[queue.Queue] = []
+        self.workers: List[Worker] = []
+
+        worker_class = multiprocessing.Process if processes else threading.Thread
+        for factory in factories:
+            items = module.Queue(queue_size)
+            worker = worker_class(
+                target=_drain,
+                args=(factory, items, self.errors, self.stop),
+                daemon=True,
+            )
+            worker.start()
+            self.queues.append(items)
+            self.workers.append(worker)
+
+    def write(self, chunk: object) -> None:
+        """Queue a chunk for every writer, waiting while a queue is full.
+
+        Args:
+            chunk (object): passed to each writer's write method (table_stats
+            columns for the export writers)
+        """
+        for items, worker in zip(self.queues, self.workers):
+            self._put(items, worker, chunk)
+        self.check()
+
+    def _put(self, items: queue.Queue, worker: Worker, chunk: object) -> None:
+        """Put a chunk on a queue, failing if its worker died.
+
+        Args:
+            items (queue.Queue): worker queue
+            worker (Worker): worker reading the queue
+            chunk (object): chunk to queue
+        """
+        while True:
+            try:
+                items.put(chunk, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                if not worker.is_alive():
+                    self.check()
+                    raise RuntimeError("background writer stopped unexpectedly")
+
+    def check(self) -> None:
+        """Raise the first error reported by a writer, if any."""
+        try:
+            error = self.errors.get_nowait()
+        except queue.Empty:
+            return
+        raise RuntimeError(f"background writer failed:\n{error}")
+
+    def close(self) -> None:
+        """Wait until every queued chunk is written and the writers are closed."""
+        for items, worker in zip(self.queues, self.workers):
+            self._put(items, worker, None)
+        for worker in self.workers:
+            worker.join()
+        self.check()
+
+    def abort(self) -> None:
+        """Stop the writers without writing the chunks still queued."""
+        self.stop.set()
+        for items, worker in zip(self.queues, self.workers):
+            worker.join()
+            if isinstance(items, multiprocessing.queues.Queue):
+                # the chunks left in the pipe are dropped
+                items.cancel_join_thread()
+
+    def __enter__(self) -> "WriterPipeline":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,260 @@
+"""Periodic progress records of long runs, as JSON lines.
+
+A ProgressReporter thread wakes up every interval and writes one record to a
+file (or stderr) with the hands done, the current and rolling hands per
+second, the ETA and the resident memory, plus the same per worker in parallel
+runs. The simulation only adds the rows of each chunk to a counter, shared
+with the worker processes, so the table loop does not change.
+
+    {"elapsed": 60.0, "hands": 2640000, "tables": 660000, "hands_per_sec":
+    44210.5, "rolling_hands_per_sec": 44003.2, "eta": 180.3, "rss_mb": 41.2,
+    "done": false}
+"""
+
+import json
+import os
+import sys
+import threading
+from collections import deque
+from time import monotonic
+from types import TracebackType
+from typing import (
+    IO,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableSequence,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+# rows done and resident memory of each worker slot, set by init_worker in
+# the worker processes (two items per slot)
+_worker_counters: Optional[MutableSequence[int]] = None
+
+
+def rss_bytes() -> int:
+    """Resident memory of the current process.
+
+    Returns:
+        int: bytes (0 where /proc is not available)
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def init_worker(counters: Optional[MutableSequence[int]]) -> None:
+    """Process pool initializer sharing the progress counters with a worker.
+
+    Args:
+        counters (Optional[MutableSequence[int]]): ProgressReporter.counters
+    """
+    global _worker_counters
+    _worker_counters = counters
+
+
+def report_chunks(
+    chunks: Iterable[Dict[str, Sequence]],
+    slot: int = 0,
+    counters: Optional[MutableSequence[int]] = None,
+) -> Iterator[Dict[str, Sequence]]:
+    """Add the rows of each chunk to the counters of a worker slot.
+
+    Args:
+        chunks (Iterable[Dict[str, Sequence]]): table_stats chunks
+        slot (int, optional): worker slot. Defaults to 0.
+        counters (Optional[MutableSequence[int]], optional): counters of a
+        ProgressReporter. Defaults to the ones shared by init_worker.
+
+    Yields:
+        Iterator[Dict[str, Sequence]]: the same chunks
+    """
+    if counters is None:
+        counters = _worker_counters
+    if counters is None:
+        yield from chunks
+        return
+
+    for chunk in chunks:
+        counters[2 * slot] += len(chunk["result"])
+        counters[2 * slot + 1] = rss_bytes()
+        yield chunk
+
+
+def _rate(rows: int, seconds: float) -> float:
+    """Rows per second, rounded for the records.
+
+    Args:
+        rows (int): rows done in the period
+        seconds (float): length of the period
+
+    Returns:
+        float: rate (0 for an empty period)
+    """
+    return round(rows / seconds, 1) if seconds > 0 else 0.0
+
+
+def _megabytes(size: int) -> float:
+    """Round a size in bytes to MB.
+
+    Args:
+        size (int): bytes
+
+    Returns:
+        float: MB with one decimal
+    """
+    return round(size / (1 << 20), 1)
+
+
+class ProgressReporter:
+    """Writes a progress record every interval while a run goes on.
+
+    Args:
+        hands_quantity (int): rows of the whole run
+        path (str, optional): JSON lines file, "-" for stderr. Defaults to "-".
+        interval (float, optional): seconds between records. Defaults to 10.0.
+        workers (int, optional): worker processes reporting their rows (1 when
+        the rows are counted in this process). Defaults to 1.
+        window (float, optional): seconds of the rolling rate. Defaults to 60.0.
+    """
+
+    def __init__(
+        self,
+        hands_quantity: int,
+        path: str = "-",
+        interval: float = 10.0,
+        workers: int = 1,
+        window: float = 60.0,
+    ) -> None:
+        self.hands_quantity = hands_quantity
+        self.path = path
+        self.interval = interval
+        self.workers = workers
+        self.window = window
+
+        self.counters: MutableSequence[int] = [0, 0]
+        if workers > 1:
+            import multiprocessing
+
+            self.counters = multiprocessing.RawArray("q", 2 * workers)
+        # rows of a resumed run, done before this process started
+        self.resumed: int = 0
+
+        self.start: float = 0.0
+        # (time, rows of each slot) of the last record, and the rolling window
+        self.last: Tuple[float, List[int]] = (0.0, [0] * workers)
+        self.samples: Deque[Tuple[float, int]] = deque()
+
+        self.file: IO[str] = sys.stderr
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.report, daemon=True)
+
+    def track(
+        self, chunks: Iterable[Dict[str, Sequence]]
+    ) -> Iterator[Dict[str, Sequence]]:
+        """Count the rows of chunks simulated in this process.
+
+        Args:
+            chunks (Iterable[Dict[str, Sequence]]): table_stats chunks
+
+        Returns:
+            Iterator[Dict[str, Sequence]]: the same chunks
+        """
+        return report_chunks(chunks, counters=self.counters)
+
+    def skip(self, rows: int) -> None:
+        """Count rows that were done before the run resumed, without a rate.
+
+        Args:
+            rows (int): rows already done
+        """
+        self.resumed = rows
+
+    def record(self, now: float) -> Dict[str, object]:
+        """Progress since the start and since the last record.
+
+        Args:
+            now (float): monotonic time of the record
+
+        Returns:
+            Dict[str, object]: JSON record
+        """
+        counters = self.counters[:]
+        slot_rows = counters[0::2]
+        rows = sum(slot_rows)
+        last_time, last_rows = self.last
+        self.last = (now, slot_rows)
+
+        samples = self.samples
+        samples.append((now, rows))
+        while now - samples[0][0] > self.window:
+            samples.popleft()
+        rolling = _rate(rows - samples[0][1], now - samples[0][0])
+
+        hands = self.resumed + rows
+        remaining = max(self.hands_quantity - hands, 0)
+        record: Dict[str, object] = {
+            "elapsed": round(now - self.start, 1),
+            "hands": hands,
+            "tables": hands // 4,
+            "hands_per_sec": _rate(rows - sum(last_rows), now - last_time),
+            "rolling_hands_per_sec": rolling,
+            "eta": round(remaining / rolling, 1) if rolling else None,
+            "rss_mb": _megabytes(rss_bytes()),
+            "done": not remaining,
+        }
+        if self.workers > 1:
+            record["workers"] = [
+                {
+                    "hands": slot_rows[slot],
+                    "hands_per_sec": _rate(
+                        slot_rows[slot] - last_rows[slot], now - last_time
+                    ),
+                    "rss_mb": _megabytes(counters[2 * slot + 1]),
+                }
+                for slot in range(self.workers)
+            ]
+        return record
+
+    def write(self, now: float) -> None:
+        """Write the record of a time as one JSON line.
+
+        Args:
+            now (float): monotonic time of the record
+        """
+        self.file.write(json.dumps(self.record(now)) + "\n")
+        self.file.flush()
+
+    def report(self) -> None:
+        """Write a record every interval until stopped."""
+        while not self.stop.wait(self.interval):
+            self.write(monotonic())
+
+    def __enter__(self) -> "ProgressReporter":
+        if self.path != "-":
+            self.file = open(self.path, "a")
+        self.start = monotonic()
+        self.last = (self.start, [0] * self.workers)
+        self.samples.append((self.start, 0))
+        self.thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.stop.set()
+        self.thread.join()
+        # last record, at the end of the run
+        self.write(monotonic())
+        if self.file is not sys.stderr:
+            self.file.close()
@@ -0,0 +1,355 @@
+"""Append-only binary results file, read through memory-mapped NumPy views.
+
+Layout (little endian):
+    header: magic, version, record size, flags, seed, rows, engine,
+    engine version and the comma separated schema (HEADER, 144 bytes)
+    records: one record per row, in table_stats order. Fields are int8
+    unless the schema gives an array typecode ("rotation_group:q" is int64),
+    see record_dtype
+
+Writing only needs the standard library, NumPy is imported by the reader.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import sys
+from array import array
+from types import TracebackType
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Sequence, Type
+
+from modules.classes.base_classes import STATS_COLUMNS, TYPECODES
+from modules.writers import CsvStreamWriter
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MAGIC = b"TRRS"
+VERSION = 1
+# bytes left for the schema at the end of the header
+SCHEMA_SIZE = 84
+HEADER = struct.Struct(f"<4sHHH2xQq16s16s{SCHEMA_SIZE}s")
+# rows is rewritten in place on every flush
+ROWS = struct.Struct("<q")
+ROWS_OFFSET = 20
+# flags
+HAS_SEED = 1
+NEGATIVE_SEED = 2
+
+# bytes read at a time by copy_rows
+COPY_BLOCK = 1 << 20
+
+# array typecode -> NumPy type of the field
+FIELD_TYPES = {"b": "i1", "q": "<i8"}
+
+
+def schema(columns: Sequence[str]) -> str:
+    """Schema written in the header.
+
+    Args:
+        columns (Sequence[str]): table_stats columns
+
+    Returns:
+        str: comma separated names, with the typecode of non int8 columns
+    """
+    return ",".join(
+        f"{column}:{TYPECODES[column]}" if column in TYPECODES else column
+        for column in columns
+    )
+
+
+def parse_schema(text: str) -> Dict[str, str]:
+    """Read a schema back.
+
+    Args:
+        text (str): schema from the header
+
+    Returns:
+        Dict[str, str]: array typecode of each column, in record order
+    """
+    fields = {}
+    for field in text.split(","):
+        column, _, typecode = field.partition(":")
+        fields[column] = typecode or "b"
+    return fields
+
+
+def record_size(typecodes: Sequence[str]) -> int:
+    """Bytes of one record.
+
+    Args:
+        typecodes (Sequence[str]): array typecode of each field
+
+    Returns:
+        int: record size
+    """
+    return sum(array(typecode).itemsize for typecode in typecodes)
+
+
+def record_dtype(fields: Dict[str, str]) -> np.dtype:
+    """Record layout as a NumPy dtype.
+
+    Args:
+        fields (Dict[str, str]): array typecode of each column, in record order
+
+    Returns:
+        np.dtype: one packed field per column
+    """
+    import numpy as np
+
+    return np.dtype(
+        [(column, FIELD_TYPES[typecode]) for column, typecode in fields.items()]
+    )
+
+
+class ResultsWriter:
+    """Appends table_stats chunks as packed records.
+
+    Same interface as CsvStreamWriter, so streaming runs and checkpoints can
+    use either of them.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        rows: int = 0,
+        offset: Optional[int] = None,
+        seed: Optional[int] = None,
+        engine: str = "",
+        engine_version: str = "",
+        columns: Sequence[str] = STATS_COLUMNS,
+    ) -> None:
+        if len(schema(columns)) > SCHEMA_SIZE:
+            raise ValueError(f"the schema of {columns} is too long")
+
+        self.path = path
+        self.rows: int = rows
+        self.fields = parse_schema(schema(columns))
+        self.record_size = record_size(list(self.fields.values()))
+
+        if offset is None:
+            flags = 0
+            if seed is not None:
+                flags = HAS_SEED | (NEGATIVE_SEED if seed < 0 else 0)
+            self.file = open(path, "wb")
+            self.file.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    self.record_size,
+                    flags,
+                    abs(seed or 0),
+                    rows,
+                    engine.encode(),
+                    engine_version.encode(),
+                    schema(columns).encode(),
+                )
+            )
+        else:
+            # resuming: drop whatever was written after the last checkpoint
+            self.file = open(path, "r+b")
+            self.file.truncate(offset)
+            self.file.seek(offset)
+
+    def write(self, chunk: Dict[str, Sequence]) -> None:
+        """Append one chunk of rows.
+
+        Args:
+            chunk (Dict[str, Sequence]): table_stats columns
+        """
+        rows = len(chunk[next(iter(self.fields))])
+        size = self.record_size
+        records = bytearray(rows * size)
+        offset = 0
+        for column, typecode in self.fields.items():
+            values = _field_bytes(chunk[column], typecode)
+            itemsize = len(values) // rows if rows else 1
+            # every byte of the field, interleaved with the other fields
+            for byte in range(itemsize):
+                start = offset + byte
+                records[start::size] = values[byte::itemsize]
+            offset += itemsize
+
+        self.file.write(records)
+        self.rows += rows
+
+    def flush(self) -> int:
+        """Update the row count in the header and force the file to disk.
+
+        Returns:
+            int: size of the file in bytes
+        """
+        end = self.file.tell()
+        self.file.seek(ROWS_OFFSET)
+        self.file.write(ROWS.pack(self.rows))
+        self.file.seek(end)
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return end
+
+    def close(self) -> None:
+        """Write the final row count and close the file."""
+        self.flush()
+        self.file.close()
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class ResultsReader:
+    """Memory-mapped view of a results file.
+
+    Columns, slices and chunks are views of the mapped records, nothing is
+    copied until it is used.
+    """
+
+    def __init__(self, path: str) -> None:
+        import numpy as np
+
+        self.path = path
+        with open(path, "rb") as file:
+            header = HEADER.unpack(file.read(HEADER.size))
+
+        magic, version, size, flags, seed, rows = header[:6]
+        fields = parse_schema(header[8].rstrip(b"\0").decode())
+        if (magic, version) != (MAGIC, VERSION) or size != record_size(
+            list(fields.values())
+        ):
+            raise ValueError(f"{path} is not a results file of this version")
+
+        self.seed: Optional[int] = None
+        if flags & HAS_SEED:
+            self.seed = -seed if flags & NEGATIVE_SEED else seed
+        self.rows: int = rows
+        self.engine: str = header[6].rstrip(b"\0").decode()
+        self.engine_version: str = header[7].rstrip(b"\0").decode()
+        self.columns = tuple(fields)
+
+        # rows written after the last flush are not part of the file yet
+        dtype = record_dtype(fields)
+        self.records: np.ndarray = np.empty(0, dtype=dtype)
+        if rows:
+            self.records = np.memmap(
+                path, dtype=dtype, mode="r", offset=HEADER.size, shape=(rows,)
+            )
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, rows: slice) -> np.ndarray:
+        return self.records[rows]
+
+    def column(self, name: str) -> np.ndarray:
+        """View of one column.
+
+        Args:
+            name (str): column name
+
+        Returns:
+            np.ndarray: int8 strided view (result holds codes 0/1/2)
+        """
+        return self.records[name]
+
+    def iter_chunks(self, chunk_size: int = 1 << 20) -> Iterator[Dict[str, np.ndarray]]:
+        """Iterate over the rows as table_stats chunks.
+
+        Args:
+            chunk_size (int, optional): rows per chunk. Defaults to 1 << 20.
+
+        Yields:
+            Iterator[Dict[str, np.ndarray]]: views of each chunk's columns
+        """
+        for start in range(0, self.rows, chunk_size):
+            stop = start + chunk_size
+            records = self.records[start:stop]
+            yield {column: records[column] for column in self.columns}
+
+    def table_stats(self) -> Dict[str, np.ndarray]:
+        """Contiguous copy of every column, like Game.table_stats.
+
+        Returns:
+            Dict[str, np.ndarray]: int8 columns
+        """
+        import numpy as np
+
+        return {
+            column: np.ascontiguousarray(self.records[column])
+            for column in self.columns
+        }
+
+
+def _field_bytes(values: Sequence, typecode: str) -> bytes:
+    """Little endian bytes of a column.
+
+    Args:
+        values (Sequence): array, NumPy or list column
+        typecode (str): array typecode of the field
+
+    Returns:
+        bytes: packed values
+    """
+    if hasattr(values, "astype"):
+        return values.astype(FIELD_TYPES[typecode], copy=False).tobytes()
+
+    packed = values
+    if getattr(values, "typecode", None) != typecode:
+        packed = array(typecode, values)
+    if sys.byteorder == "big" and packed.itemsize > 1:
+        packed = array(typecode, packed)
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def copy_rows(source: str, path: str, rows: int) -> int:
+    """Copy the first rows of a results file, as if only they were written.
+
+    Args:
+        source (str): results file
+        path (str): copy
+        rows (int): rows to copy
+
+    Returns:
+        int: size of the copy in bytes
+    """
+    with open(source, "rb") as src, open(path, "wb") as dst:
+        header = list(HEADER.unpack(src.read(HEADER.size)))
+        if header[5] < rows:
+            raise ValueError(f"{source} has less than {rows} rows")
+
+        header[5] = rows
+        dst.write(HEADER.pack(*header))
+        remaining = rows * header[2]
+        while remaining:
+            block = src.read(min(remaining, COPY_BLOCK))
+            if not block:
+                raise ValueError(f"{source} is truncated")
+            dst.write(block)
+            remaining -= len(block)
+        return dst.tell()
+
+
+def convert_to_csv(results_path: str, csv_path: str) -> int:
+    """Write a results file as the CSV layout of DataFrame.to_csv.
+
+    Args:
+        results_path (str): results file
+        csv_path (str): output CSV path
+
+    Returns:
+        int: number of rows written
+    """
+    reader = ResultsReader(results_path)
+    with CsvStreamWriter(csv_path, columns=reader.columns) as writer:
+        for chunk in reader.iter_chunks():
+            writer.write(chunk)
+    return writer.rows
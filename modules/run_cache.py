@@ -0,0 +1,318 @@
+"""Content-addressed cache of finished runs, reused by later runs.
+
+A run is addressed by the parameters that decide its rows: seed, engine,
+engine version, deal replays, chunk size (batch engine only) and a hash of the
+engine's source. Each entry keeps the rows of the longest run simulated for
+its key:
+
+    <key>.results   results file of the run
+    <key>.json      CacheEntry, with the sha256 of the results file and the
+                    RNG state after its last table
+
+Rows only depend on the tables before them, so a run with at most as many
+tables is a prefix copy of the entry, and a longer one continues the RNG from
+the saved state. The sha256 is taken when an entry is stored and checked by
+RunCache.verify (python -m modules.run_cache DIR), lookups only compare the
+size and mtime of the file. The least recently used entries are evicted above
+max_bytes.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from modules.checkpoint import RngState
+
+COPY_BLOCK = 1 << 20
+
+
+@dataclass
+class CacheEntry:
+    """Run parameters of a cache entry, and what the entry holds."""
+
+    seed: int
+    engine: str
+    engine_version: str
+    code_digest: str
+    deal_replays: int = 1
+    # tables per chunk, for the engines whose rows depend on it (else 0)
+    chunk_size: int = 0
+
+    tables: int = 0
+    size: int = 0
+    mtime: float = 0.0
+    sha256: str = ""
+    rng_state: RngState = None
+    last_used: float = 0.0
+
+    def key(self) -> str:
+        """Address of the entry.
+
+        Returns:
+            str: hash of the run parameters
+        """
+        params = [
+            self.seed,
+            self.engine,
+            self.engine_version,
+            self.code_digest,
+            self.deal_replays,
+            self.chunk_size,
+        ]
+        return hashlib.sha256(json.dumps(params).encode()).hexdigest()[:32]
+
+
+def _copy_digest(source: str, path: str) -> Tuple[int, str]:
+    """Copy a file, hashing it on the way.
+
+    Args:
+        source (str): file to copy
+        path (str): destination
+
+    Returns:
+        Tuple[int, str]: size and sha256 of the copy
+    """
+    digest = hashlib.sha256()
+    with open(source, "rb") as src, open(path, "wb") as dst:
+        for block in iter(lambda: src.read(COPY_BLOCK), b""):
+            digest.update(block)
+            dst.write(block)
+        return dst.tell(), digest.hexdigest()
+
+
+def _file_digest(path: str) -> str:
+    """Sha256 of a file.
+
+    Args:
+        path (str): file to hash
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(COPY_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RunCache:
+    """Directory of cached runs, evicted by size.
+
+    Args:
+        directory (str): cache directory (created if missing)
+        max_bytes (int): size of the results files kept (main uses
+        CACHE_MAX_BYTES)
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def results_path(self, key: str) -> str:
+        """Results file of an entry.
+
+        Args:
+            key (str): CacheEntry.key
+
+        Returns:
+            str: path in the cache directory
+        """
+        return os.path.join(self.directory, f"{key}.results")
+
+    def entry_path(self, key: str) -> str:
+        """Description of an entry.
+
+        Args:
+            key (str): CacheEntry.key
+
+        Returns:
+            str: path in the cache directory
+        """
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> Optional[CacheEntry]:
+        """Read the description of an entry.
+
+        Args:
+            key (str): CacheEntry.key
+
+        Returns:
+            Optional[CacheEntry]: the entry (None if missing or unreadable)
+        """
+        try:
+            with open(self.entry_path(key)) as file:
+                return CacheEntry(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, entry: CacheEntry) -> None:
+        """Atomically write the description of an entry.
+
+        Args:
+            entry (CacheEntry): entry to save
+        """
+        path = self.entry_path(entry.key())
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(asdict(entry), file)
+        os.replace(tmp_path, path)
+
+    def lookup(self, request: CacheEntry) -> Optional[CacheEntry]:
+        """Find the entry of a run, checking its results file.
+
+        An entry whose file does not match its size and mtime is discarded.
+
+        Args:
+            request (CacheEntry): run parameters
+
+        Returns:
+            Optional[CacheEntry]: the valid entry (None for a miss)
+        """
+        key = request.key()
+        entry = self.load(key)
+        if entry is None:
+            return None
+
+        if entry.key() != key or not self._is_unchanged(entry):
+            self.discard(key)
+            return None
+
+        entry.last_used = time.time()
+        self.save(entry)
+        return entry
+
+    def store(self, entry: CacheEntry, results_path: str) -> None:
+        """Copy a finished run into the cache, replacing its key's entry.
+
+        Args:
+            entry (CacheEntry): run parameters, tables and final RNG state
+            results_path (str): results file of the run
+        """
+        if os.path.getsize(results_path) > self.max_bytes:
+            return
+
+        key = entry.key()
+        path = self.results_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        entry.size, entry.sha256 = _copy_digest(results_path, tmp_path)
+        entry.last_used = time.time()
+        os.replace(tmp_path, path)
+        entry.mtime = os.path.getmtime(path)
+        self.save(entry)
+        self.evict(key)
+
+    def _is_unchanged(self, entry: CacheEntry) -> bool:
+        """Check the results file of an entry against its size and mtime.
+
+        Args:
+            entry (CacheEntry): entry to check
+
+        Returns:
+            bool: True if the file was not changed since it was stored
+        """
+        try:
+            stat = os.stat(self.results_path(entry.key()))
+        except OSError:
+            return False
+        return stat.st_size == entry.size and stat.st_mtime == entry.mtime
+
+    def verify(self) -> List[str]:
+        """Hash every results file, discarding the entries that do not match.
+
+        Returns:
+            List[str]: keys of the discarded entries
+        """
+        discarded = []
+        for entry in self.entries():
+            key = entry.key()
+            if (
+                not self._is_unchanged(entry)
+                or _file_digest(self.results_path(key)) != entry.sha256
+            ):
+                self.discard(key)
+                discarded.append(key)
+        return discarded
+
+    def entries(self) -> List[CacheEntry]:
+        """Every readable entry of the cache.
+
+        Returns:
+            List[CacheEntry]: entries, least recently used first
+        """
+        keys = [
+            name[: -len(".json")]
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+        entries = [entry for entry in map(self.load, keys) if entry is not None]
+        return sorted(entries, key=lambda entry: entry.last_used)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Discard the least recently used entries above max_bytes.
+
+        Args:
+            keep (Optional[str], optional): key never evicted (the entry just
+            stored). Defaults to None.
+        """
+        entries = self.entries()
+        total = sum(entry.size for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.key() != keep:
+                self.discard(entry.key())
+                total -= entry.size
+
+    def discard(self, key: str) -> None:
+        """Remove an entry.
+
+        Args:
+            key (str): CacheEntry.key
+        """
+        for path in (self.entry_path(key), self.results_path(key)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line.
+
+    Args:
+        argv (Optional[Sequence[str]], optional): arguments. Defaults to
+        sys.argv.
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Check every entry of a run cache against its sha256."
+    )
+    parser.add_argument("directory")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> List[str]:
+    """Verify a run cache from the command line.
+
+    Args:
+        argv (Optional[Sequence[str]], optional): arguments. Defaults to
+        sys.argv.
+
+    Returns:
+        List[str]: keys of the discarded entries
+    """
+    args = parse_args(argv)
+    # max_bytes only matters when storing
+    discarded = RunCache(args.directory, 0).verify()
+    print(f"Entries discarded: {len(discarded)}")
+    return discarded
+
+
+if __name__ == "__main__":
+    main()
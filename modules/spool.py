@@ -0,0 +1,585 @@
+"""Runs split in work units, shared with workers through a spool directory.
+
+The spool directory can live on a filesystem shared by several hosts:
+
+    python -m modules.spool submit /shared/run 40000000 --units 200 --seed 7
+    python -m modules.spool work /shared/run --processes 8     # on every host
+    python -m modules.spool merge /shared/run --wait --formats results csv
+
+Layout of a spool directory:
+    job.json                    run parameters (Job)
+    pending/unit-00003.json     units waiting for a worker (WorkUnit)
+    claimed/unit-00003@host-pid units being simulated, the file's modification
+                                time is the worker's heartbeat
+    done/unit-00003.json        simulated units
+    shards/unit-00003.results   results file of each simulated unit
+
+A worker claims a unit by renaming it from pending to claimed, which only one
+worker can do. Units are seeded like the shards of a multi-process run
+(split_shards), so the merged data is the same as main(..., workers=units)
+and a unit simulated twice gives the same shard.
+"""
+
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass
+from multiprocessing import Process
+from random import Random
+from types import TracebackType
+from typing import Dict, List, Optional, Sequence, Type
+
+from modules.generate_simulations import (
+    ENGINE_VERSION,
+    ENGINES,
+    OUTPUT_PATHS,
+    convert_outputs,
+    iter_chunks,
+    prepare_engine,
+    split_shards,
+)
+from modules.results_file import ResultsReader, ResultsWriter
+
+# seconds without a heartbeat after which a claimed unit is re-queued
+DEFAULT_LEASE = 60.0
+POLL_SECONDS = 1.0
+
+JOB_FILE = "job.json"
+QUEUES = ("pending", "claimed", "done", "shards")
+
+
+@dataclass
+class Job:
+    """Parameters of a spooled run."""
+
+    seed: int
+    table_quantity: int
+    engine: str
+    units: int
+    engine_version: str = ENGINE_VERSION
+
+
+@dataclass
+class WorkUnit:
+    """A shard of the run, simulated by a single worker."""
+
+    index: int
+    tables: int
+    seed: int
+
+    @property
+    def name(self) -> str:
+        """File name of the unit, without extension."""
+        return unit_name(self.index)
+
+
+def unit_name(index: int) -> str:
+    """File name of a unit, without extension.
+
+    Args:
+        index (int): unit index
+
+    Returns:
+        str: unit name
+    """
+    return f"unit-{index:05d}"
+
+
+def _write_json(path: str, data: Dict[str, object]) -> None:
+    """Atomically write a JSON file.
+
+    Args:
+        path (str): destination
+        data (Dict[str, object]): JSON serializable content
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_unit(path: str) -> WorkUnit:
+    """Read a unit file.
+
+    Args:
+        path (str): pending, claimed or done unit
+
+    Returns:
+        WorkUnit: the unit
+    """
+    with open(path) as file:
+        return WorkUnit(**json.load(file))
+
+
+def load_job(spool_dir: str) -> Job:
+    """Read the parameters of a spooled run.
+
+    Args:
+        spool_dir (str): spool directory
+
+    Returns:
+        Job: run parameters
+    """
+    with open(os.path.join(spool_dir, JOB_FILE)) as file:
+        return Job(**json.load(file))
+
+
+def submit(
+    spool_dir: str,
+    table_quantity: int,
+    units: int,
+    seed: Optional[int] = None,
+    engine: str = "object",
+) -> Job:
+    """Split a run in work units and queue them in a new spool directory.
+
+    Args:
+        spool_dir (str): spool directory, created if missing (must not hold
+        another job)
+        table_quantity (int): number of tables of the run
+        units (int): number of work units
+        seed (Optional[int], optional): master seed, drawn at random if None so
+        that re-queued units give the same shards. Defaults to None.
+        engine (str, optional): key of ENGINES. Defaults to "object".
+
+    Returns:
+        Job: run parameters
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine}")
+    if seed is None:
+        seed = Random().getrandbits(63)
+
+    for queue in QUEUES:
+        os.makedirs(os.path.join(spool_dir, queue), exist_ok=True)
+    job_path = os.path.join(spool_dir, JOB_FILE)
+    if os.path.exists(job_path):
+        raise FileExistsError(f"{spool_dir} already holds a job")
+
+    job = Job(seed, table_quantity, engine, units)
+    sizes, seeds = split_shards(table_quantity, units, seed)
+    for index, (tables, unit_seed) in enumerate(zip(sizes, seeds)):
+        unit = WorkUnit(index, tables, unit_seed)
+        _write_json(_unit_path(spool_dir, "pending", unit.name), asdict(unit))
+    # written last: workers only start on complete jobs
+    _write_json(job_path, asdict(job))
+    return job
+
+
+def _unit_path(spool_dir: str, queue: str, name: str) -> str:
+    """Path of a unit file in one of the queues.
+
+    Args:
+        spool_dir (str): spool directory
+        queue (str): "pending" or "done"
+        name (str): unit name
+
+    Returns:
+        str: path of the unit's JSON file
+    """
+    return os.path.join(spool_dir, queue, f"{name}.json")
+
+
+def _shard_path(spool_dir: str, name: str) -> str:
+    """Path of the results file of a unit.
+
+    Args:
+        spool_dir (str): spool directory
+        name (str): unit name
+
+    Returns:
+        str: shard path
+    """
+    return os.path.join(spool_dir, "shards", f"{name}.results")
+
+
+def _list(spool_dir: str, queue: str) -> List[str]:
+    """Sorted file names of a queue, without temporary files.
+
+    Args:
+        spool_dir (str): spool directory
+        queue (str): one of QUEUES
+
+    Returns:
+        List[str]: file names
+    """
+    names = os.listdir(os.path.join(spool_dir, queue))
+    return sorted(name for name in names if not name.endswith(".tmp"))
+
+
+def worker_id() -> str:
+    """Identify this worker process in claim file names.
+
+    Returns:
+        str: host name and process id
+    """
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def claim(spool_dir: str) -> Optional[str]:
+    """Take the first pending unit.
+
+    Args:
+        spool_dir (str): spool directory
+
+    Returns:
+        Optional[str]: path of the claim file (None if nothing is pending)
+    """
+    for name in _list(spool_dir, "pending"):
+        stem = os.path.splitext(name)[0]
+        claim_path = os.path.join(spool_dir, "claimed", f"{stem}@{worker_id()}")
+        pending_path = os.path.join(spool_dir, "pending", name)
+        try:
+            # renaming keeps the modification time, the first heartbeat
+            os.utime(pending_path)
+            os.rename(pending_path, claim_path)
+        except FileNotFoundError:
+            # another worker was faster
+            continue
+        return claim_path
+
+    return None
+
+
+def _is_dead(owner: str, lease: float, mtime: float) -> bool:
+    """Check if the worker holding a claim is gone.
+
+    Args:
+        owner (str): host name and process id of the worker
+        lease (float): seconds a claim stays valid without a heartbeat
+        mtime (float): last heartbeat
+
+    Returns:
+        bool: True if the heartbeat is too old or the local process exited
+    """
+    if time.time() - mtime > lease:
+        return True
+
+    host, _, pid = owner.rpartition("-")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def requeue_stale(spool_dir: str, lease: float = DEFAULT_LEASE) -> List[str]:
+    """Put back the units of workers that died.
+
+    Args:
+        spool_dir (str): spool directory
+        lease (float, optional): seconds a claim stays valid without a
+        heartbeat. Defaults to DEFAULT_LEASE.
+
+    Returns:
+        List[str]: names of the re-queued units
+    """
+    requeued = []
+    for name in _list(spool_dir, "claimed"):
+        stem, _, owner = name.partition("@")
+        claim_path = os.path.join(spool_dir, "claimed", name)
+        try:
+            if not _is_dead(owner, lease, os.path.getmtime(claim_path)):
+                continue
+            os.rename(claim_path, _unit_path(spool_dir, "pending", stem))
+        except FileNotFoundError:
+            # finished (or re-queued by someone else) in the meantime
+            continue
+        requeued.append(stem)
+
+    return requeued
+
+
+class Heartbeat:
+    """Touches a claim file in a background thread while its unit runs."""
+
+    def __init__(self, path: str, interval: float) -> None:
+        self.path = path
+        self.interval = interval
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.beat, daemon=True)
+
+    def beat(self) -> None:
+        """Update the modification time until stopped or the claim is lost."""
+        while not self.stop.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                return
+
+    def __enter__(self) -> "Heartbeat":
+        self.thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.stop.set()
+        self.thread.join()
+
+
+def run_unit(spool_dir: str, job: Job, claim_path: str, lease: float) -> None:
+    """Simulate a claimed unit and write its shard.
+
+    Args:
+        spool_dir (str): spool directory
+        job (Job): run parameters
+        claim_path (str): claim file of the unit
+        lease (float): seconds a claim stays valid without a heartbeat
+    """
+    unit = _read_unit(claim_path)
+    shard_path = _shard_path(spool_dir, unit.name)
+    tmp_path = f"{shard_path}.{worker_id()}.tmp"
+
+    with Heartbeat(claim_path, lease / 4):
+        with ResultsWriter(
+            tmp_path,
+            seed=unit.seed,
+            engine=job.engine,
+            engine_version=job.engine_version,
+        ) as writer:
+            for chunk in iter_chunks(unit.tables, unit.seed, job.engine):
+                writer.write(chunk)
+
+    os.replace(tmp_path, shard_path)
+    try:
+        os.rename(claim_path, _unit_path(spool_dir, "done", unit.name))
+    except FileNotFoundError:
+        # re-queued while running: the shard is the same, whoever wrote it
+        pass
+
+
+def work(
+    spool_dir: str, lease: float = DEFAULT_LEASE, poll_seconds: float = POLL_SECONDS
+) -> int:
+    """Simulate units until none is pending or claimed.
+
+    Idle workers re-queue the units of dead workers, so the run finishes as
+    long as one worker is alive.
+
+    Args:
+        spool_dir (str): spool directory
+        lease (float, optional): seconds a claim stays valid without a
+        heartbeat. Defaults to DEFAULT_LEASE.
+        poll_seconds (float, optional): wait between checks while other
+        workers finish. Defaults to POLL_SECONDS.
+
+    Returns:
+        int: number of units simulated by this worker
+    """
+    job = load_job(spool_dir)
+    units = 0
+    while True:
+        claim_path = claim(spool_dir)
+        if claim_path is not None:
+            run_unit(spool_dir, job, claim_path, lease)
+            units += 1
+            continue
+
+        if requeue_stale(spool_dir, lease):
+            continue
+        if not _list(spool_dir, "claimed"):
+            return units
+        time.sleep(poll_seconds)
+
+
+def work_locally(spool_dir: str, processes: int, lease: float = DEFAULT_LEASE) -> None:
+    """Run several workers on this host and wait for them.
+
+    Every worker is independent: the others keep going if one of them dies.
+
+    Args:
+        spool_dir (str): spool directory
+        processes (int): number of worker processes (1 works in this process)
+        lease (float, optional): seconds a claim stays valid without a
+        heartbeat. Defaults to DEFAULT_LEASE.
+    """
+    prepare_engine(load_job(spool_dir).engine)
+    if processes == 1:
+        work(spool_dir, lease)
+        return
+
+    workers = [Process(target=work, args=(spool_dir, lease)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def status(spool_dir: str) -> Dict[str, int]:
+    """Count the units in each queue.
+
+    Args:
+        spool_dir (str): spool directory
+
+    Returns:
+        Dict[str, int]: number of pending, claimed and done units
+    """
+    return {queue: len(_list(spool_dir, queue)) for queue in QUEUES[:3]}
+
+
+def _check_shard(spool_dir: str, job: Job, unit: WorkUnit) -> bool:
+    """Validate the shard of a done unit.
+
+    Args:
+        spool_dir (str): spool directory
+        job (Job): run parameters
+        unit (WorkUnit): done unit
+
+    Returns:
+        bool: True if the shard is complete and belongs to the unit
+    """
+    try:
+        reader = ResultsReader(_shard_path(spool_dir, unit.name))
+    except (OSError, ValueError):
+        return False
+    return (reader.seed, reader.engine, reader.engine_version, reader.rows) == (
+        unit.seed,
+        job.engine,
+        job.engine_version,
+        unit.tables * 4,
+    )
+
+
+def validate(spool_dir: str, lease: float = DEFAULT_LEASE) -> List[str]:
+    """Re-queue dead workers' units and done units with a broken shard.
+
+    Args:
+        spool_dir (str): spool directory
+        lease (float, optional): seconds a claim stays valid without a
+        heartbeat. Defaults to DEFAULT_LEASE.
+
+    Returns:
+        List[str]: names of the units that are not done yet
+    """
+    job = load_job(spool_dir)
+    requeue_stale(spool_dir, lease)
+
+    done = set()
+    for name in _list(spool_dir, "done"):
+        path = os.path.join(spool_dir, "done", name)
+        unit = _read_unit(path)
+        if _check_shard(spool_dir, job, unit):
+            done.add(unit.name)
+        else:
+            os.rename(path, _unit_path(spool_dir, "pending", unit.name))
+
+    names = [unit_name(index) for index in range(job.units)]
+    return [name for name in names if name not in done]
+
+
+def merge(
+    spool_dir: str,
+    output: str = OUTPUT_PATHS["results"],
+    lease: float = DEFAULT_LEASE,
+    wait: bool = False,
+    poll_seconds: float = POLL_SECONDS,
+) -> int:
+    """Combine the shards of every unit, in order, into one results file.
+
+    Args:
+        spool_dir (str): spool directory
+        output (str, optional): merged results file. Defaults to data.results.
+        lease (float, optional): seconds a claim stays valid without a
+        heartbeat. Defaults to DEFAULT_LEASE.
+        wait (bool, optional): wait for the missing units instead of failing.
+        Defaults to False.
+        poll_seconds (float, optional): wait between checks. Defaults to
+        POLL_SECONDS.
+
+    Returns:
+        int: number of rows merged
+    """
+    missing = validate(spool_dir, lease)
+    while missing and wait:
+        time.sleep(poll_seconds)
+        missing = validate(spool_dir, lease)
+    if missing:
+        raise RuntimeError(f"{len(missing)} units are not done: {missing[:10]}")
+
+    job = load_job(spool_dir)
+    with ResultsWriter(
+        output, seed=job.seed, engine=job.engine, engine_version=job.engine_version
+    ) as writer:
+        for index in range(job.units):
+            reader = ResultsReader(_shard_path(spool_dir, unit_name(index)))
+            for chunk in reader.iter_chunks():
+                writer.write(chunk)
+
+    return writer.rows
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line.
+
+    Args:
+        argv (Optional[Sequence[str]], optional): arguments. Defaults to
+        sys.argv.
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Spread a run over many hosts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = commands.add_parser("submit", help="queue the units of a run")
+    work_parser = commands.add_parser("work", help="simulate queued units")
+    merge_parser = commands.add_parser("merge", help="combine the shards")
+    commands.add_parser("status", help="count the units in each queue")
+    for command in commands.choices.values():
+        command.add_argument("spool_dir")
+        command.add_argument("--lease", type=float, default=DEFAULT_LEASE)
+
+    submit_parser.add_argument("hands", type=int, help="number of hands (rows)")
+    submit_parser.add_argument("--units", type=int, required=True)
+    submit_parser.add_argument("--seed", type=int)
+    submit_parser.add_argument("--engine", choices=list(ENGINES), default="object")
+
+    work_parser.add_argument("--processes", type=int, default=1)
+
+    merge_parser.add_argument("--wait", action="store_true")
+    merge_parser.add_argument(
+        "--formats", nargs="*", choices=list(OUTPUT_PATHS), default=["results"]
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Run a spool command from the command line.
+
+    Args:
+        argv (Optional[Sequence[str]], optional): arguments. Defaults to
+        sys.argv.
+    """
+    args = parse_args(argv)
+    if args.command == "submit":
+        job = submit(
+            args.spool_dir, args.hands // 4, args.units, args.seed, args.engine
+        )
+        print(f"Queued {job.units} units of job with seed {job.seed}")
+    elif args.command == "work":
+        work_locally(args.spool_dir, args.processes, args.lease)
+    elif args.command == "merge":
+        rows = merge(args.spool_dir, lease=args.lease, wait=args.wait)
+        convert_outputs(OUTPUT_PATHS["results"], args.formats)
+        if "results" not in args.formats:
+            os.remove(OUTPUT_PATHS["results"])
+        print(f"Number of hands merged: {rows}")
+    else:
+        print(status(args.spool_dir))
+
+
+if __name__ == "__main__":
+    main()
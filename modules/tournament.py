@@ -0,0 +1,311 @@
+"""Tournament between Player subclasses, played on common random deals.
+
+Every pairing plays each deal twice, once in each seating: the team of the
+first player sits in the first and third seats, then the teams swap seats and
+hands. The deal stream is the same for every pairing, so most of the luck of
+the cards cancels out and win rate differences are measured with paired
+confidence intervals.
+"""
+
+import argparse
+import csv
+import importlib
+import math
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from random import Random
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from modules.classes.base_classes import Game, Player, Team
+from modules.generate_simulations import split_shards
+
+REPORT_COLUMNS = (
+    "player",
+    "opponent",
+    "tables",
+    "win_rate",
+    "difference",
+    "ci_low",
+    "ci_high",
+    "independent_margin",
+    "variance_reduction",
+)
+
+Pairing = Tuple[int, int]
+Report = Dict[str, object]
+
+
+class PairedScore:
+    """Running sums of the results of one pairing, deal by deal.
+
+    The paired score of a deal is the first player's mean result over both
+    seatings (draws count as half a win). The single results are kept too, to
+    compare with what independent deals would give.
+    """
+
+    def __init__(self) -> None:
+        self.tables: int = 0
+        self.paired: float = 0.0
+        self.paired_squared: float = 0.0
+        self.single: float = 0.0
+        self.single_squared: float = 0.0
+
+    def add(self, first: float, second: float) -> None:
+        """Count one deal.
+
+        Args:
+            first (float): result of the first player in the first seating
+            second (float): result of the first player in the swapped seating
+        """
+        paired = (first + second) / 2
+        self.tables += 1
+        self.paired += paired
+        self.paired_squared += paired * paired
+        self.single += first + second
+        self.single_squared += first * first + second * second
+
+    def merge(self, other: "PairedScore") -> "PairedScore":
+        """Add the sums of another shard.
+
+        Args:
+            other (PairedScore): sums of the same pairing on other deals
+
+        Returns:
+            PairedScore: self
+        """
+        self.tables += other.tables
+        self.paired += other.paired
+        self.paired_squared += other.paired_squared
+        self.single += other.single
+        self.single_squared += other.single_squared
+        return self
+
+    def summary(self, z: float = 1.96) -> Dict[str, float]:
+        """Win rate difference and its paired confidence interval.
+
+        Args:
+            z (float, optional): z score of the interval. Defaults to 1.96 (95%).
+
+        Returns:
+            Dict[str, float]: win_rate of the first player, difference with the
+            opponent's win rate, its interval, the margin 2 * tables independent
+            games would give and how many times more tables they would need
+        """
+        tables = self.tables
+        win_rate = self.paired / tables
+        variance = max(self.paired_squared / tables - win_rate**2, 0.0)
+        # the opponent wins 1 - win_rate, so the difference is 2 * win_rate - 1
+        margin = 2 * z * math.sqrt(variance / tables)
+
+        games = 2 * tables
+        single_variance = max(
+            self.single_squared / games - (self.single / games) ** 2, 0.0
+        )
+        independent_margin = 2 * z * math.sqrt(single_variance / games)
+
+        difference = 2 * win_rate - 1
+        return {
+            "tables": tables,
+            "win_rate": win_rate,
+            "difference": difference,
+            "ci_low": difference - margin,
+            "ci_high": difference + margin,
+            "independent_margin": independent_margin,
+            "variance_reduction": (
+                (independent_margin / margin) ** 2 if margin else math.inf
+            ),
+        }
+
+
+def seat_players(
+    player_class: Type[Player], opponent_class: Type[Player], swapped: bool
+) -> Tuple[List[Player], Team, Team]:
+    """Create the players of one seating.
+
+    Args:
+        player_class (Type[Player]): first player of the pairing
+        opponent_class (Type[Player]): second player of the pairing
+        swapped (bool): seat the opponent's team first
+
+    Returns:
+        Tuple[List[Player], Team, Team]: seat order, the team sitting first and
+        the other team
+    """
+    player1, player2 = player_class("player1"), player_class("player2")
+    opponent1, opponent2 = opponent_class("opponent1"), opponent_class("opponent2")
+    team = Team("PLAYER", player1, player2)
+    opponents = Team("OPPONENT", opponent1, opponent2)
+
+    if swapped:
+        return [opponent1, player1, opponent2, player2], opponents, team
+    return [player1, opponent1, player2, opponent2], team, opponents
+
+
+def iter_seating(
+    player_class: Type[Player],
+    opponent_class: Type[Player],
+    swapped: bool,
+    table_quantity: int,
+    seed: int,
+) -> Iterator[float]:
+    """Play a pairing in one seating.
+
+    Args:
+        player_class (Type[Player]): first player of the pairing
+        opponent_class (Type[Player]): second player of the pairing
+        swapped (bool): seat the opponent's team first
+        table_quantity (int): number of deals
+        seed (int): seed of the deal stream
+
+    Yields:
+        Iterator[float]: result of the first player's team at every table
+    """
+    players, team1, team2 = seat_players(player_class, opponent_class, swapped)
+    game = Game(table_quantity, players, team1, team2, seed=seed, lazy=True)
+    for stats in game.iter_tables():
+        yield stats["player1"]["result"] / 2
+
+
+def play_pairing(
+    player_class: Type[Player],
+    opponent_class: Type[Player],
+    table_quantity: int,
+    seed: int,
+) -> PairedScore:
+    """Play both seatings of a pairing on the same deals.
+
+    Args:
+        player_class (Type[Player]): first player of the pairing
+        opponent_class (Type[Player]): second player of the pairing
+        table_quantity (int): number of deals
+        seed (int): seed of the deal stream
+
+    Returns:
+        PairedScore: sums of the pairing
+    """
+    score = PairedScore()
+    for first, second in zip(
+        iter_seating(player_class, opponent_class, False, table_quantity, seed),
+        iter_seating(player_class, opponent_class, True, table_quantity, seed),
+    ):
+        score.add(first, second)
+    return score
+
+
+def run_tournament(
+    player_classes: Sequence[Type[Player]],
+    table_quantity: int,
+    workers: int = 1,
+    seed: Optional[int] = None,
+    z: float = 1.96,
+) -> List[Report]:
+    """Play every pairing of Player subclasses on common random deals.
+
+    The deals are split in one shard per worker, and every pairing plays the
+    same shards. The pool runs one task per pairing and shard.
+
+    Args:
+        player_classes (Sequence[Type[Player]]): Player subclasses, at least two
+        table_quantity (int): deals per pairing
+        workers (int, optional): number of worker processes. Defaults to 1.
+        seed (Optional[int], optional): master seed. Defaults to None.
+        z (float, optional): z score of the intervals. Defaults to 1.96 (95%).
+
+    Returns:
+        List[Report]: one row per pairing, keyed by REPORT_COLUMNS
+    """
+    if seed is None:
+        seed = Random().getrandbits(63)
+    sizes, seeds = split_shards(table_quantity, workers, seed)
+
+    pairings: List[Pairing] = list(combinations(range(len(player_classes)), 2))
+    tasks = [
+        (player_classes[first], player_classes[second], size, shard_seed)
+        for first, second in pairings
+        for size, shard_seed in zip(sizes, seeds)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shards = list(executor.map(play_pairing, *zip(*tasks)))
+
+    names = [player_class.__name__ for player_class in player_classes]
+    report = []
+    for idx, (first, second) in enumerate(pairings):
+        score = PairedScore()
+        start, stop = idx * workers, (idx + 1) * workers
+        for shard in shards[start:stop]:
+            score.merge(shard)
+        report.append(
+            {"player": names[first], "opponent": names[second], **score.summary(z)}
+        )
+
+    return report
+
+
+def save_report(report: List[Report], path: str) -> None:
+    """Write a tournament report as CSV.
+
+    Args:
+        report (List[Report]): rows of run_tournament
+        path (str): output path
+    """
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, REPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(report)
+
+
+def load_player(path: str) -> Type[Player]:
+    """Import a Player subclass from "module:Class".
+
+    Args:
+        path (str): module path and class name
+
+    Returns:
+        Type[Player]: the class
+    """
+    module_name, _, class_name = path.partition(":")
+    player_class = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(player_class, type) and issubclass(player_class, Player)):
+        raise ValueError(f"{path} is not a Player subclass")
+    return player_class
+
+
+def main(argv: Optional[List[str]] = None) -> List[Report]:
+    """Run a tournament from the command line and save data_tournament.csv.
+
+    Args:
+        argv (Optional[List[str]], optional): arguments. Defaults to sys.argv.
+
+    Returns:
+        List[Report]: one row per pairing
+    """
+    parser = argparse.ArgumentParser(description="Compare Player subclasses.")
+    parser.add_argument(
+        "players", nargs="+", help="module:Class of each Player subclass"
+    )
+    parser.add_argument("--tables", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", default="data_tournament.csv")
+    args = parser.parse_args(argv)
+    if len(args.players) < 2:
+        parser.error("a tournament needs at least two players")
+
+    report = run_tournament(
+        [load_player(path) for path in args.players],
+        args.tables,
+        args.workers,
+        args.seed,
+    )
+    save_report(report, args.output)
+    for row in report:
+        print(
+            f"{row['player']} vs {row['opponent']}: "
+            + f"{row['difference']:+.4f} [{row['ci_low']:+.4f}, {row['ci_high']:+.4f}]"
+        )
+    print(f"Report saved to '{args.output}'")
+    return report
+
+
+if __name__ == "__main__":
+    main()
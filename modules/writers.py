@@ -0,0 +1,122 @@
+"""Writers that flush table_stats chunks to disk while the simulation runs.
+
+The CSV writer only needs the standard library, pandas and NumPy are imported
+when a DataFrame is built.
+"""
+
+from __future__ import annotations
+
+import os
+from types import TracebackType
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Type
+
+from modules.classes.base_classes import STATS_COLUMNS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# result codes as written by the pandas export
+RESULT_TEXT = ("0.0", "0.5", "1.0")
+
+
+class CsvStreamWriter:
+    """Appends table_stats chunks to a CSV laid out like DataFrame.to_csv."""
+
+    def __init__(
+        self,
+        path: str,
+        rows: int = 0,
+        offset: Optional[int] = None,
+        columns: Sequence[str] = STATS_COLUMNS,
+    ) -> None:
+        self.path = path
+        self.rows: int = rows
+        self.columns = tuple(columns)
+        self.row_format = ",".join(["{}"] * (len(columns) + 1)) + "\n"
+
+        if offset is None:
+            self.file = open(path, "w", newline="")
+            self.file.write(",".join(("",) + self.columns) + "\n")
+        else:
+            # resuming: drop whatever was written after the last checkpoint
+            self.file = open(path, "r+", newline="")
+            self.file.truncate(offset)
+            self.file.seek(offset)
+
+    def write(self, chunk: Dict[str, Sequence]) -> None:
+        """Append one chunk of rows, continuing the index column.
+
+        Args:
+            chunk (Dict[str, Sequence]): table_stats columns
+        """
+        columns = [
+            (
+                [RESULT_TEXT[code] for code in _as_list(chunk[column])]
+                if column == "result"
+                else _as_list(chunk[column])
+            )
+            for column in self.columns
+        ]
+
+        stop = self.rows + len(columns[0])
+        self.file.write(
+            "".join(map(self.row_format.format, range(self.rows, stop), *columns))
+        )
+        self.rows = stop
+
+    def flush(self) -> int:
+        """Force the written rows to disk.
+
+        Returns:
+            int: size of the file in bytes
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        self.file.close()
+
+    def __enter__(self) -> "CsvStreamWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+def to_dataframe(table_stats: Dict[str, Sequence]) -> pd.DataFrame:
+    """Build the exported DataFrame on top of the int8 table_stats buffers.
+
+    Args:
+        table_stats (Dict[str, Sequence]): int8 columns, and the int64 group
+        column if there is one (array or NumPy)
+
+    Returns:
+        pd.DataFrame: card columns viewing the buffers and the decoded result
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = {column: np.asarray(values) for column, values in table_stats.items()}
+    # result codes 0/1/2 become 0/0.5/1
+    columns["result"] = columns["result"] / 2
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def _as_list(values: Sequence) -> list:
+    """Turn arrays into plain Python values so they format like ints.
+
+    Args:
+        values (Sequence): list, array.array or NumPy column
+
+    Returns:
+        list: column values
+    """
+    return values.tolist() if hasattr(values, "tolist") else list(values)
@@ -0,0 +1,33 @@
+"""Differential tests of the vectorized engine against the Game classes."""
+
+import numpy as np
+import pytest
+
+from benchmarks.verify_batch_engine import ReplayDeck
+from modules.classes import batch_engine
+from modules.classes.base_classes import STATS_COLUMNS, Game
+from modules.classes.batch_deck import BatchDealer
+from modules.generate_simulations import build_players
+
+TABLES = 3_000
+CHUNK_SIZE = 1_000
+
+
+@pytest.mark.parametrize("seed", [0, 7, 2022])
+def test_batch_engine_matches_object_engine(seed: int) -> None:
+    """Both engines give the same columns for the same seeded deals."""
+    chunks = list(batch_engine.iter_chunks(TABLES, seed, chunk_size=CHUNK_SIZE))
+
+    # iter_chunks deals chunk by chunk from one dealer, replay the same draws
+    dealer = BatchDealer(seed)
+    dealt = np.concatenate(
+        [dealer.deal_indexes(CHUNK_SIZE) for _ in range(TABLES // CHUNK_SIZE)]
+    )
+    players, team1, team2 = build_players()
+    game = Game(TABLES, players, team1, team2, deck=ReplayDeck(dealt))
+
+    for column in STATS_COLUMNS:
+        batch_column = np.concatenate([chunk[column] for chunk in chunks])
+        np.testing.assert_array_equal(
+            np.asarray(game.table_stats[column]), batch_column, err_msg=column
+        )
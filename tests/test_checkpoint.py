@@ -0,0 +1,115 @@
+"""Interrupted streaming runs resume into the same bytes as a full run."""
+
+import os
+from pathlib import Path
+from time import monotonic, sleep
+from typing import Callable, Dict, Iterator, Sequence, Tuple
+
+import pytest
+
+from modules import generate_simulations
+from modules.checkpoint import Checkpoint, RngState
+
+TABLES = 1_000
+CHUNK_SIZE = 200
+SEED = 11
+# chunks flushed before the run is interrupted
+DONE_CHUNKS = 2
+TIMEOUT_SECONDS = 30.0
+
+
+class Interrupted(Exception):
+    """Raised in place of the crash of a streaming run."""
+
+
+def wait_for_chunks(checkpoint_path: str, chunks: int) -> None:
+    """Wait until the background writer checkpointed some chunks.
+
+    Args:
+        checkpoint_path (str): checkpoint of the run
+        chunks (int): chunks that must be flushed
+    """
+    deadline = monotonic() + TIMEOUT_SECONDS
+    while monotonic() < deadline:
+        saved = Checkpoint.load(checkpoint_path)
+        if saved is not None and saved.tables_done >= chunks * CHUNK_SIZE:
+            return
+        sleep(0.01)
+    raise TimeoutError(f"{chunks} chunks were not checkpointed")
+
+
+@pytest.fixture
+def interrupt_after_chunks(monkeypatch: pytest.MonkeyPatch) -> Callable[[str], None]:
+    """Make the next streaming run stop once DONE_CHUNKS are checkpointed.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): patches resume_chunks
+
+    Returns:
+        Callable[[str], None]: sets the checkpoint path to watch
+    """
+    resume_chunks = generate_simulations.resume_chunks
+    watched = {}
+
+    def interrupted_chunks(
+        progress: Checkpoint, *args: object, **kwargs: object
+    ) -> Tuple[Iterator[Dict[str, Sequence]], Callable[[], RngState]]:
+        chunks, rng_state = resume_chunks(progress, *args, **kwargs)
+
+        def limited() -> Iterator[Dict[str, Sequence]]:
+            for idx, chunk in enumerate(chunks):
+                if idx == DONE_CHUNKS:
+                    wait_for_chunks(watched["path"], DONE_CHUNKS)
+                    raise Interrupted
+                yield chunk
+
+        monkeypatch.setattr(generate_simulations, "resume_chunks", resume_chunks)
+        return limited(), rng_state
+
+    monkeypatch.setattr(generate_simulations, "resume_chunks", interrupted_chunks)
+    return lambda path: watched.update(path=path)
+
+
+@pytest.mark.parametrize(
+    "engine, name, deal_replays",
+    [
+        ("object", "data.results", 1),
+        ("object", "data.csv", 4),
+        ("object", "data.results", 8),
+        ("batch", "data.results", 1),
+    ],
+)
+def test_resumed_run_is_byte_identical(
+    tmp_path: Path,
+    interrupt_after_chunks: Callable[[str], None],
+    engine: str,
+    name: str,
+    deal_replays: int,
+) -> None:
+    """A run interrupted after some chunks resumes into the uninterrupted bytes."""
+    full_path = str(tmp_path / "full" / name)
+    resumed_path = str(tmp_path / "resumed" / name)
+    checkpoint_path = str(tmp_path / "resumed" / "checkpoint.json")
+    os.makedirs(os.path.dirname(full_path))
+    os.makedirs(os.path.dirname(resumed_path))
+    run = dict(
+        seed=SEED, engine=engine, chunk_size=CHUNK_SIZE, deal_replays=deal_replays
+    )
+
+    interrupt_after_chunks(checkpoint_path)
+    with pytest.raises(Interrupted):
+        generate_simulations.stream_to_file(
+            TABLES, resumed_path, checkpoint_path=checkpoint_path, **run
+        )
+    saved = Checkpoint.load(checkpoint_path)
+    assert saved.tables_done == DONE_CHUNKS * CHUNK_SIZE
+
+    rows = generate_simulations.stream_to_file(
+        TABLES, resumed_path, checkpoint_path=checkpoint_path, **run
+    )
+    generate_simulations.stream_to_file(TABLES, full_path, **run)
+
+    assert rows == TABLES * 4
+    assert not os.path.exists(checkpoint_path)
+    with open(full_path, "rb") as full, open(resumed_path, "rb") as resumed:
+        assert resumed.read() == full.read()
@@ -0,0 +1,72 @@
+"""Seeded decks keep their rows, and constrained decks deal the chosen hand."""
+
+import hashlib
+from random import Random
+from typing import Optional, Sequence
+
+import pytest
+
+from modules.classes.base_classes import STATS_COLUMNS
+from modules.classes.deck import Card, ConstrainedDeck, Deck
+from modules.generate_simulations import simulate_shard
+
+# sha256 of the table_stats columns of 1000 tables with seed 3
+PINNED_ROWS = "1c877f0b4a6bf57022bced49383aa415ea7fb42b0fff66332ebfe08a721a1083"
+
+
+@pytest.mark.parametrize("seed", [0, 3, 2022])
+def test_shuffle_makes_the_draws_of_random_shuffle(seed: int) -> None:
+    """Deck.shuffle_cards mirrors Random.shuffle, draw for draw."""
+    deck = Deck(Random(seed))
+    rng = Random(seed)
+    cards = deck.cards.copy()
+    for _ in range(100):
+        deck.shuffle_cards()
+        rng.shuffle(cards)
+        assert deck.cards == cards
+    assert deck.rng.getstate() == rng.getstate()
+
+
+def test_seeded_rows_are_pinned() -> None:
+    """A change of the random stream or of the game shows up as other rows."""
+    table_stats = simulate_shard(1000, 3)
+    digest = hashlib.sha256()
+    for column in STATS_COLUMNS:
+        digest.update(bytes(table_stats[column]))
+    assert digest.hexdigest() == PINNED_ROWS
+
+
+@pytest.mark.parametrize(
+    "cards, values",
+    [
+        (None, None),
+        (None, [1, 2]),
+        (None, [1, 2, 3, 4]),
+        (None, [0, 2, 3]),
+        (None, [1, 2, 99]),
+        # there is one manilha of each suit
+        (None, [11, 11, 2]),
+        ([Card(1, 1), Card(2, 1)], None),
+        ([Card(1, 1), Card(1, 1), Card(2, 1)], None),
+        ([Card(1, 1), Card(2, 1), Card(9, 1)], None),
+        ([Card(1, 1), Card(2, 1), Card(3, 1), Card(4, 1)], None),
+    ],
+)
+def test_impossible_hands_are_rejected(
+    cards: Optional[Sequence[Card]], values: Optional[Sequence[int]]
+) -> None:
+    """Anything but three available cards raises ValueError."""
+    with pytest.raises(ValueError):
+        ConstrainedDeck(cards, values)
+
+
+def test_chosen_cards_are_dealt_to_the_moving_seat() -> None:
+    """The chosen cards go to one seat, which moves by one every deal."""
+    hand = [Card(1, 1), Card(2, 5), Card(4, 10)]
+    deck = ConstrainedDeck(hand, rng=Random(0))
+    for seat in range(8):
+        deck.shuffle_cards()
+        # after the vira, three cards per seat (cards are popped from the end)
+        start = 1 + 3 * (seat % 4)
+        seat_cards = deck.cards[::-1][start:][:3]
+        assert sorted(seat_cards, key=lambda card: (card.suit, card.value)) == hand
@@ -0,0 +1,120 @@
+"""The run cache serves the same rows as a fresh run and drops changed files."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from modules import run_cache
+from modules.generate_simulations import OUTPUT_PATHS, simulate_cached
+from modules.run_cache import RunCache
+
+SEED = 3
+TABLES = 600
+CHUNK_SIZE = 200
+
+
+def fresh_rows(tmp_path: Path, tables: int, engine: str = "object") -> bytes:
+    """Rows of a run simulated without a usable cache entry.
+
+    Args:
+        tmp_path (Path): directory of the throwaway cache
+        tables (int): number of tables
+        engine (str, optional): key of ENGINES. Defaults to "object".
+
+    Returns:
+        bytes: the run's results file
+    """
+    cache = RunCache(str(tmp_path / f"fresh-{tables}-{engine}"), 1 << 30)
+    simulate_cached(tables, SEED, engine, cache, chunk_size=CHUNK_SIZE)
+    return Path(OUTPUT_PATHS["results"]).read_bytes()
+
+
+@pytest.fixture
+def cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> RunCache:
+    """Cache holding the run of TABLES tables, in a temporary working dir.
+
+    Args:
+        tmp_path (Path): pytest temporary directory
+        monkeypatch (pytest.MonkeyPatch): pytest monkeypatch
+
+    Returns:
+        RunCache: the cache
+    """
+    monkeypatch.chdir(tmp_path)
+    cache = RunCache(str(tmp_path / "cache"), 1 << 30)
+    simulate_cached(TABLES, SEED, "object", cache, chunk_size=CHUNK_SIZE)
+    return cache
+
+
+def only_entry(cache: RunCache) -> str:
+    """Results file of the single entry of a cache.
+
+    Args:
+        cache (RunCache): cache with one entry
+
+    Returns:
+        str: path of the results file
+    """
+    (entry,) = cache.entries()
+    return cache.results_path(entry.key())
+
+
+@pytest.mark.parametrize("tables", [TABLES // 2, TABLES * 2])
+def test_cached_rows_match_a_fresh_run(
+    cache: RunCache, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, tables: int
+) -> None:
+    """Prefixes and extensions of a cached run, without hashing on lookup."""
+
+    def no_hashing(path: str) -> str:
+        raise AssertionError(f"{path} was hashed on lookup")
+
+    monkeypatch.setattr(run_cache, "_file_digest", no_hashing)
+    simulate_cached(tables, SEED, "object", cache, chunk_size=CHUNK_SIZE)
+    served = Path(OUTPUT_PATHS["results"]).read_bytes()
+
+    assert served == fresh_rows(tmp_path, tables)
+    assert cache.entries()[0].tables == max(tables, TABLES)
+
+
+def test_changed_file_is_discarded_on_lookup(cache: RunCache) -> None:
+    """A results file with another mtime is not served."""
+    path = only_entry(cache)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    (entry,) = cache.entries()
+    assert cache.lookup(entry) is None
+    assert cache.entries() == []
+
+
+def test_verify_discards_corrupted_file(cache: RunCache) -> None:
+    """RunCache.verify finds a changed byte that lookups do not see."""
+    path = only_entry(cache)
+    key = cache.entries()[0].key()
+    stat = os.stat(path)
+    with open(path, "r+b") as file:
+        file.seek(-1, os.SEEK_END)
+        last = file.read(1)
+        file.seek(-1, os.SEEK_END)
+        file.write(bytes([last[0] ^ 1]))
+    # same size and mtime, only the hash tells the file changed
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert cache.verify() == [key]
+    assert cache.entries() == []
+
+
+def test_batch_entries_are_keyed_by_chunk_size(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Batch runs with other chunk sizes deal other rows, so get other keys."""
+    monkeypatch.chdir(tmp_path)
+    cache = RunCache(str(tmp_path / "cache"), 1 << 30)
+    simulate_cached(TABLES, SEED, "batch", cache, chunk_size=CHUNK_SIZE)
+    simulate_cached(TABLES, SEED, "batch", cache, chunk_size=CHUNK_SIZE * 3)
+
+    assert sorted(entry.chunk_size for entry in cache.entries()) == [
+        CHUNK_SIZE,
+        CHUNK_SIZE * 3,
+    ]
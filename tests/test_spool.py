@@ -0,0 +1,108 @@
+"""Spooled runs with several local workers, one of them killed mid-unit."""
+
+import os
+import signal
+from multiprocessing import Process
+from pathlib import Path
+from time import monotonic, sleep
+from typing import List
+
+import numpy as np
+
+from modules import spool
+from modules.classes.base_classes import STATS_COLUMNS
+from modules.generate_simulations import ENGINES, split_shards
+from modules.results_file import ResultsReader
+
+# units long enough (about half a second each) to be killed while running
+UNITS = 4
+TABLES = UNITS * 25_000
+SEED = 5
+LEASE = 30.0
+POLL_SECONDS = 0.05
+TIMEOUT_SECONDS = 60.0
+
+
+def start_worker(spool_dir: str) -> Process:
+    """Start a local worker process.
+
+    Args:
+        spool_dir (str): spool directory
+
+    Returns:
+        Process: the running worker
+    """
+    worker = Process(target=spool.work, args=(spool_dir, LEASE, POLL_SECONDS))
+    worker.start()
+    return worker
+
+
+def claims_of(spool_dir: str, worker: Process) -> List[str]:
+    """Claim files held by a worker.
+
+    Args:
+        spool_dir (str): spool directory
+        worker (Process): local worker
+
+    Returns:
+        List[str]: names of its claim files
+    """
+    owner = f"@{spool.worker_id().rpartition('-')[0]}-{worker.pid}"
+    return [
+        name
+        for name in os.listdir(os.path.join(spool_dir, "claimed"))
+        if name.endswith(owner)
+    ]
+
+
+def wait_for_claim(spool_dir: str, worker: Process) -> str:
+    """Wait until a worker claims a unit.
+
+    Args:
+        spool_dir (str): spool directory
+        worker (Process): local worker
+
+    Returns:
+        str: name of its claim file
+    """
+    deadline = monotonic() + TIMEOUT_SECONDS
+    while monotonic() < deadline:
+        claims = claims_of(spool_dir, worker)
+        if claims:
+            return claims[0]
+        sleep(0.001)
+    raise TimeoutError("the worker claimed no unit")
+
+
+def test_dead_worker_unit_is_requeued_and_merged(tmp_path: Path) -> None:
+    """A unit whose worker died is simulated again and the merge is exact."""
+    spool_dir = str(tmp_path / "spool")
+    spool.submit(spool_dir, TABLES, UNITS, SEED)
+
+    doomed = start_worker(spool_dir)
+    claim_name = wait_for_claim(spool_dir, doomed)
+    os.kill(doomed.pid, signal.SIGKILL)
+    doomed.join()
+    # killed in the middle of its unit: the claim is left behind
+    assert os.listdir(os.path.join(spool_dir, "claimed")) == [claim_name]
+    assert spool.status(spool_dir) == {"pending": UNITS - 1, "claimed": 1, "done": 0}
+
+    workers = [start_worker(spool_dir) for _ in range(2)]
+    for worker in workers:
+        worker.join(TIMEOUT_SECONDS)
+        assert worker.exitcode == 0
+
+    stem = claim_name.partition("@")[0]
+    assert spool.status(spool_dir) == {"pending": 0, "claimed": 0, "done": UNITS}
+    assert os.path.exists(os.path.join(spool_dir, "done", f"{stem}.json"))
+
+    output = str(tmp_path / "data.results")
+    assert spool.merge(spool_dir, output) == TABLES * 4
+
+    # the same units simulated one after the other in this process
+    sizes, seeds = split_shards(TABLES, UNITS, SEED)
+    shards = [ENGINES["object"](size, seed) for size, seed in zip(sizes, seeds)]
+    merged = ResultsReader(output)
+    for column in STATS_COLUMNS:
+        expected = np.concatenate([np.asarray(shard[column]) for shard in shards])
+        np.testing.assert_array_equal(merged.column(column), expected, err_msg=column)
@@ -0,0 +1,85 @@
+"""Cold start of the command line, in fresh interpreters."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import List, Tuple
+
+from benchmarks.bench_startup import HEAVY_MODULES
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+# seconds allowed above a bare interpreter: bench_startup keeps 0.08s on a
+# quiet machine, the test leaves room for loaded CI runners
+STARTUP_BUDGET = 0.25
+REPEAT = 5
+
+LOADED_HEAVY = (
+    "import json, sys; "
+    + f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+)
+
+
+def run_python(code: str, cwd: str) -> Tuple[float, str]:
+    """Best wall time and output of a fresh interpreter running some code.
+
+    Args:
+        code (str): code passed to python -c
+        cwd (str): working directory of the runs
+
+    Returns:
+        Tuple[float, str]: seconds of the fastest run and its stdout
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    best, output = float("inf"), ""
+    for _ in range(REPEAT):
+        start = perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.PIPE,
+            check=True,
+            universal_newlines=True,
+        )
+        best = min(best, perf_counter() - start)
+        output = process.stdout
+    return best, output
+
+
+def loaded_heavy_modules(output: str) -> List[str]:
+    """Heavy modules listed by the last line of LOADED_HEAVY.
+
+    Args:
+        output (str): stdout of the run
+
+    Returns:
+        List[str]: names of the heavy modules that were imported
+    """
+    return json.loads(output.splitlines()[-1])
+
+
+def test_cli_import_loads_no_heavy_module(tmp_path: Path) -> None:
+    """Importing modules.cli pulls neither NumPy nor pandas."""
+    _, output = run_python("import modules.cli; " + LOADED_HEAVY, str(tmp_path))
+    assert loaded_heavy_modules(output) == []
+
+
+def test_small_run_loads_no_heavy_module(tmp_path: Path) -> None:
+    """A run with the results and CSV writers stays NumPy and pandas free."""
+    code = (
+        "import modules.cli; "
+        + "modules.cli.main(['4', '--seed', '1', '--formats', 'results', 'csv']); "
+        + LOADED_HEAVY
+    )
+    _, output = run_python(code, str(tmp_path))
+    assert loaded_heavy_modules(output) == []
+
+
+def test_cli_import_within_budget(tmp_path: Path) -> None:
+    """Importing modules.cli stays within STARTUP_BUDGET of a bare interpreter."""
+    bare, _ = run_python("pass", str(tmp_path))
+    startup, _ = run_python("import modules.cli", str(tmp_path))
+    assert startup - bare < STARTUP_BUDGET